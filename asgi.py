@@ -0,0 +1,274 @@
+"""Modo de execução assíncrono (ASGI) com as rotas principais do `main.py`.
+
+    uvicorn asgi:app --workers 1
+
+Serve o CRUD de professores, /login, /refresh, o CRUD de agendamentos,
+/agendamentos/stream, /laboratorios/<id>/disponibilidade e /pool/stats.
+Ficam só no `main.py`: /agendamentos/lote, /agendamentos/changes, as demais
+rotas de /laboratorios, /relatorios/*, as rotas de métricas e estatísticas,
+o cabeçalho Idempotency-Key e as respostas condicionais (ETag/304).
+
+Usa asyncpg no lugar do psycopg2 e as variantes assíncronas dos serviços, que
+compartilham as validações com a versão WSGI.
+"""
+import hmac
+import math
+import os
+
+from dotenv import load_dotenv
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from src.auth.jwt_tokens import criar_token, identidade_do_header
+from src.auth.limitador import BaldesMemoria, LimitadorLogin
+from src.auth.senha_hasher import SenhaHasher
+from src.exceptions.custom_exception import CustomException
+from src.repository.async_agendamento_repository import AsyncAgendamentoRepository
+from src.repository.async_database import AsyncDatabase
+from src.repository.async_professor_repository import AsyncProfessorRepository
+from src.repository.ouvinte_notificacoes import OuvinteNotificacoesAsync
+from src.secret.credentials import credentials_provider_from_env
+from src.service.async_agendamento_service import AsyncAgendamentoService
+from src.service.async_professor_service import AsyncProfessorService
+from src.service.disponibilidade_index import DisponibilidadeIndex
+from src.service.eventos import SSE_HEARTBEAT, AssinaturaAsync, DistribuidorEventos, mensagem_sse
+from src.utils.utils import json_dumps
+
+load_dotenv()
+
+JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY')
+
+database = AsyncDatabase(
+    credenciais=credentials_provider_from_env(),
+    minconn=int(os.getenv('DB_POOL_MIN', '1')),
+    maxconn=int(os.getenv('DB_POOL_MAX', '10')),
+    timeout=float(os.getenv('DB_POOL_TIMEOUT', '30')),
+    max_uses=int(os.getenv('DB_POOL_MAX_USES', '1000')),
+    max_age=float(os.getenv('DB_POOL_MAX_AGE', '3600'))
+)
+
+senha_hasher = SenhaHasher(
+    rounds=int(os.getenv('BCRYPT_ROUNDS', '12')),
+    workers=int(os.getenv('BCRYPT_WORKERS', '0')) or None,
+    max_pendentes=int(os.getenv('BCRYPT_MAX_PENDENTES', '0')) or None
+)
+
+professor_service = AsyncProfessorService(AsyncProfessorRepository(database), senha_hasher)
+# Em memória: as operações são curtas e não bloqueiam o loop (atrás de proxy, use uvicorn --proxy-headers)
+limitador_login = LimitadorLogin(
+    BaldesMemoria(max_chaves=int(os.getenv('LOGIN_LIMITE_MAX_CHAVES', '100000'))),
+    por_ip=(int(os.getenv('LOGIN_LIMITE_IP', '20')), float(os.getenv('LOGIN_JANELA_IP', '60'))),
+    por_email=(int(os.getenv('LOGIN_LIMITE_EMAIL', '5')), float(os.getenv('LOGIN_JANELA_EMAIL', '300')))
+)
+agendamento_repository = AsyncAgendamentoRepository(database)
+disponibilidade = DisponibilidadeIndex(validade=float(os.getenv('DISPONIBILIDADE_VALIDADE', '60')))
+agendamento_service = AsyncAgendamentoService(agendamento_repository, disponibilidade)
+
+eventos = DistribuidorEventos(max_assinantes=int(os.getenv('SSE_MAX_ASSINANTES', '1000')),
+                              max_pendentes=int(os.getenv('SSE_MAX_PENDENTES', '100')))
+eventos.observar(disponibilidade.aplicar_evento)
+ouvinte = OuvinteNotificacoesAsync(database, eventos)
+
+
+def usuario_atual(request, tipo='access'):
+    return identidade_do_header(request.headers.get('Authorization'), JWT_SECRET_KEY, tipo)
+
+
+async def handle_custom_exception(request, error):
+    return JSONResponse({'message': error.message, 'error_type': error.error_type.value},
+                        status_code=error.http_status_code())
+
+
+# Professores
+async def create_professor(request: Request):
+    data = await request.json()
+    professor_id = await professor_service.criar_professor(data['nome'], data['email'], data['senha'])
+    return JSONResponse({'message': 'Professor criado com sucesso!', 'id': professor_id})
+
+
+async def get_professores(request: Request):
+    professores = await professor_service.listar_professores()
+    return JSONResponse([p.to_dict() for p in professores])
+
+
+async def get_id_professor(request: Request):
+    return JSONResponse(await professor_service.busca_professor_id(request.path_params['id']))
+
+
+async def update_professor(request: Request):
+    data = await request.json()
+    await professor_service.atualizar_professor(request.path_params['id'], data['nome'], data['email'], data['senha'])
+    return JSONResponse({'message': 'Professor atualizado com sucesso!'})
+
+
+async def delete_professor(request: Request):
+    await professor_service.deletar_professor(request.path_params['id'])
+    return JSONResponse({'message': 'Professor deletado com sucesso!'})
+
+
+# Autenticação
+async def login_professor(request: Request):
+    data = await request.json()
+    espera = limitador_login.tentar(data['email'], request.client.host if request.client else None)
+    if espera:
+        return JSONResponse({'message': 'Muitas tentativas de login, tente novamente mais tarde',
+                             'type': 'TOO_MANY_REQUESTS'},
+                            status_code=429, headers={'Retry-After': str(math.ceil(espera))})
+    professor = await professor_service.login_professor(data['email'], data['senha'])
+    if professor is None:
+        return JSONResponse({'message': 'Credenciais inválidas'}, status_code=401)
+    return JSONResponse({
+        'access_token': criar_token(professor.id, JWT_SECRET_KEY, 'access'),
+        'refresh_token': criar_token(professor.id, JWT_SECRET_KEY, 'refresh')
+    })
+
+
+async def refresh(request: Request):
+    current_user = usuario_atual(request, 'refresh')
+    return JSONResponse({'access_token': criar_token(current_user, JWT_SECRET_KEY, 'access')})
+
+
+# Agendamentos
+async def create_agendamento(request: Request):
+    current_user = usuario_atual(request)
+    if request.headers.get('content-type', '').split(';')[0] != 'application/json':
+        return JSONResponse({'message': 'Content-Type deve ser application/json'}, status_code=415)
+    data = await request.json()
+    resultado = await agendamento_service.create_agendamento(
+        data.get('id_laboratorio'), current_user, data.get('data'), data.get('hora_inicio'), data.get('hora_fim'))
+    return JSONResponse(resultado, status_code=201)
+
+
+async def get_all_agendamentos(request: Request):
+    current_user = usuario_atual(request)
+    args = request.query_params
+    id_professor = current_user if args.get('mine', '').lower() == 'true' else args.get('id_professor')
+    agendamentos = agendamento_service.listar_agendamentos(
+        id_professor=id_professor,
+        id_laboratorio=args.get('id_laboratorio'),
+        data_inicio=args.get('data_inicio'),
+        data_fim=args.get('data_fim'),
+        after_id=args.get('after_id'),
+        limit=args.get('limit')
+    )
+
+    # Busca o primeiro item antes de responder, para que erros de banco virem status HTTP
+    try:
+        primeiro = await agendamentos.__anext__()
+    except StopAsyncIteration:
+        return JSONResponse([])
+
+    async def gerar():
+        yield '[' + json_dumps(primeiro.to_dict())
+        async for agendamento in agendamentos:
+            yield ',' + json_dumps(agendamento.to_dict())
+        yield ']'
+
+    return StreamingResponse(gerar(), media_type='application/json')
+
+
+async def get_agendamento_by_id(request: Request):
+    usuario_atual(request)
+    agendamento = await agendamento_service.get_agendamento_by_id(request.path_params['agendamento_id'])
+    return JSONResponse(agendamento.to_dict())
+
+
+async def stream_agendamentos(request: Request):
+    usuario_atual(request)
+    id_laboratorio, data = agendamento_service.filtros_eventos(request.query_params.get('id_laboratorio'),
+                                                               request.query_params.get('data'))
+
+    assinatura = eventos.assinar(id_laboratorio, data, classe=AssinaturaAsync)
+
+    async def gerar():
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                novos = await assinatura.aguardar(SSE_HEARTBEAT)
+                for evento in novos:
+                    yield mensagem_sse(evento)
+                if assinatura.encerrada:
+                    yield 'event: overflow\ndata: {}\n\n'
+                    return
+                if not novos:
+                    yield ': keepalive\n\n'
+        finally:
+            eventos.cancelar(assinatura)
+
+    return StreamingResponse(gerar(), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+async def update_agendamento(request: Request):
+    current_user = usuario_atual(request)
+    data = await request.json()
+    await agendamento_service.update_agendamento(
+        request.path_params['agendamento_id'], data.get('id_laboratorio'), current_user,
+        data.get('data'), data.get('hora_inicio'), data.get('hora_fim'))
+    return JSONResponse({'message': 'Agendamento atualizado com sucesso'})
+
+
+async def delete_agendamento(request: Request):
+    usuario_atual(request)
+    await agendamento_service.delete_agendamento(request.path_params['agendamento_id'])
+    return JSONResponse({'message': 'Agendamento deletado com sucesso'})
+
+
+async def get_disponibilidade_laboratorio(request: Request):
+    usuario_atual(request)
+    id_laboratorio = request.path_params['id_laboratorio']
+    data = request.query_params.get('data')
+    janelas = await agendamento_service.horarios_livres(id_laboratorio, data)
+    return JSONResponse({'id_laboratorio': id_laboratorio, 'data': data, 'janelas': janelas})
+
+
+async def get_pool_stats(request: Request):
+    # Mesma regra das rotas de operação do main.py: access token ou OPERACAO_TOKEN
+    token = os.getenv('OPERACAO_TOKEN')
+    if not token or not hmac.compare_digest(request.headers.get('Authorization', '').encode('utf-8'),
+                                            f'Bearer {token}'.encode('utf-8')):
+        usuario_atual(request)
+    return JSONResponse(database.pool_stats())
+
+
+async def startup():
+    await database.open()
+    await agendamento_repository.garantir_particoes(int(os.getenv('AGENDAMENTOS_MESES_A_FRENTE', '12')))
+    # Ouvindo antes do aquecimento: as escritas de outros processos também chegam ao índice
+    ouvinte.iniciar()
+    await agendamento_service.aquecer_disponibilidade()
+
+
+async def shutdown():
+    eventos.encerrar_todas()
+    await ouvinte.parar()
+    await database.close()
+
+
+app = Starlette(
+    routes=[
+        Route('/professores', create_professor, methods=['POST']),
+        Route('/professores', get_professores, methods=['GET']),
+        Route('/professores/{id:int}', get_id_professor, methods=['GET']),
+        Route('/professores/{id:int}', update_professor, methods=['PUT']),
+        Route('/professores/{id:int}', delete_professor, methods=['DELETE']),
+        Route('/login', login_professor, methods=['POST']),
+        Route('/refresh', refresh, methods=['POST']),
+        Route('/agendamentos', create_agendamento, methods=['POST']),
+        Route('/agendamentos', get_all_agendamentos, methods=['GET']),
+        Route('/agendamentos/stream', stream_agendamentos, methods=['GET']),
+        Route('/agendamentos/{agendamento_id:int}', get_agendamento_by_id, methods=['GET']),
+        Route('/agendamentos/{agendamento_id:int}', update_agendamento, methods=['PUT']),
+        Route('/agendamentos/{agendamento_id:int}', delete_agendamento, methods=['DELETE']),
+        Route('/laboratorios/{id_laboratorio:int}/disponibilidade', get_disponibilidade_laboratorio, methods=['GET']),
+        Route('/pool/stats', get_pool_stats, methods=['GET']),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    exception_handlers={CustomException: handle_custom_exception},
+    on_startup=[startup],
+    on_shutdown=[shutdown],
+)
@@ -0,0 +1,46 @@
+"""Mede a vazão de verificações bcrypt (o custo de um login) por número de workers.
+
+Uso:
+
+    python -m benchmarks.bcrypt_login --rounds 12 --logins 64 --workers 1 2 4 8
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+from src.auth.senha_hasher import SenhaHasher
+
+
+def medir(workers, rounds, logins, senha, senha_hash):
+    hasher = SenhaHasher(rounds=rounds, workers=workers, max_pendentes=logins)
+    # Simula requisições concorrentes do Flask chegando ao mesmo tempo
+    with ThreadPoolExecutor(max_workers=logins) as requisicoes:
+        inicio = time.perf_counter()
+        resultados = list(requisicoes.map(lambda _: hasher.verificar(senha, senha_hash), range(logins)))
+        duracao = time.perf_counter() - inicio
+    hasher.close()
+    assert all(resultados)
+    return duracao
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rounds', type=int, default=12)
+    parser.add_argument('--logins', type=int, default=64)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    senha = 'senha-de-teste'
+    senha_hash = bcrypt.hashpw(senha.encode('utf-8'), bcrypt.gensalt(rounds=args.rounds)).decode('utf-8')
+
+    print(f"rounds={args.rounds} logins={args.logins}")
+    print(f"{'workers':>8} {'segundos':>10} {'logins/s':>10}")
+    for workers in args.workers:
+        duracao = medir(workers, args.rounds, args.logins, senha, senha_hash)
+        print(f"{workers:>8} {duracao:>10.3f} {args.logins / duracao:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
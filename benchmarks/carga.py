@@ -0,0 +1,132 @@
+"""Teste de carga com cargas mistas contra um PostgreSQL local.
+
+Sobe o banco (existente ou `--efemero`), carrega infra/db/schema.SQL, gera os
+dados, inicia o app em uma thread e executa os cenários:
+
+- login: tempestade de logins de professores distintos
+- disputa: muitas reservas simultâneas para poucos horários
+- navegacao: listagens e leituras (agendamentos, professores, laboratórios)
+
+    python -m benchmarks.carga --efemero --agendamentos 500000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import threading
+from datetime import date, timedelta
+
+from benchmarks.http_cliente import medir
+from benchmarks.postgres_local import (aguardar_porta, criar_banco, exportar_para_app, postgres_efemero,
+                                       postgres_existente)
+from benchmarks.resultados import salvar
+from benchmarks.seed import SENHA_PADRAO, semear
+
+
+def iniciar_app(porta):
+    from werkzeug.serving import make_server
+    import main
+
+    app = main.create_app()
+    servidor = make_server('127.0.0.1', porta, app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    aguardar_porta('127.0.0.1', porta)
+    return app, servidor
+
+
+def tokens(app, ids):
+    from flask_jwt_extended import create_access_token
+    with app.app_context():
+        return {i: create_access_token(identity=str(i)) for i in ids}
+
+
+def cenario_login(professores, total):
+    rnd = random.Random(1)
+    return [{'metodo': 'POST', 'caminho': '/login', 'rota': 'POST /login',
+             'corpo': {'email': f'professor{rnd.randint(1, professores)}@fecaf.com.br', 'senha': SENHA_PADRAO}}
+            for _ in range(total)]
+
+
+def cenario_disputa(tokens_por_prof, laboratorios, total):
+    # Poucos horários "quentes" depois do período semeado; conflitos (400) são esperados
+    rnd = random.Random(2)
+    dia = (date.today() + timedelta(days=400)).isoformat()
+    quentes = [(rnd.randint(1, laboratorios), h) for h in ('08:00', '10:00', '14:00') for _ in range(3)]
+    ids = list(tokens_por_prof)
+    requisicoes = []
+    for _ in range(total):
+        id_lab, hora = rnd.choice(quentes)
+        fim = f'{int(hora[:2]) + 1:02d}{hora[2:]}'
+        requisicoes.append({'metodo': 'POST', 'caminho': '/agendamentos', 'rota': 'POST /agendamentos',
+                            'token': tokens_por_prof[rnd.choice(ids)], 'esperado': (201, 400),
+                            'corpo': {'id_laboratorio': id_lab, 'data': dia, 'hora_inicio': hora, 'hora_fim': fim}})
+    return requisicoes
+
+
+def cenario_navegacao(tokens_por_prof, professores, laboratorios, total):
+    rnd = random.Random(3)
+    ids = list(tokens_por_prof)
+    hoje = date.today().isoformat()
+    requisicoes = []
+    for _ in range(total):
+        token = tokens_por_prof[rnd.choice(ids)]
+        opcoes = [
+            ('GET /agendamentos?mine=true', f'/agendamentos?mine=true&limit=50'),
+            ('GET /agendamentos?id_laboratorio', f'/agendamentos?id_laboratorio={rnd.randint(1, laboratorios)}&limit=50'),
+            ('GET /professores/<id>', f'/professores/{rnd.randint(1, professores)}'),
+            ('GET /laboratorios', '/laboratorios'),
+            ('GET /laboratorios/<id>/disponibilidade',
+             f'/laboratorios/{rnd.randint(1, laboratorios)}/disponibilidade?data={hoje}'),
+        ]
+        rota, caminho = rnd.choice(opcoes)
+        requisicoes.append({'metodo': 'GET', 'caminho': caminho, 'rota': rota, 'token': token})
+    return requisicoes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--efemero', action='store_true', help='cria um cluster PostgreSQL temporário')
+    parser.add_argument('--banco', default='bench_agendamentos')
+    parser.add_argument('--professores', type=int, default=2000)
+    parser.add_argument('--laboratorios', type=int, default=200)
+    parser.add_argument('--agendamentos', type=int, default=200000)
+    parser.add_argument('--bcrypt-rounds', type=int, default=10)
+    parser.add_argument('--concorrencia', type=int, default=64)
+    parser.add_argument('--requisicoes', type=int, default=2000, help='requisições por cenário')
+    parser.add_argument('--porta', type=int, default=5055)
+    args = parser.parse_args()
+
+    servidor_pg = postgres_efemero() if args.efemero else postgres_existente()
+    with servidor_pg as servidor:
+        credenciais = criar_banco(servidor, args.banco)
+        import psycopg2
+        conn = psycopg2.connect(dbname=credenciais['dbname'], user=credenciais['username'],
+                                password=credenciais['password'], host=credenciais['host'], port=credenciais['port'])
+        tempos_seed = semear(conn, args.professores, args.laboratorios, args.agendamentos, rounds=args.bcrypt_rounds)
+        conn.close()
+
+        exportar_para_app(credenciais)
+        os.environ.setdefault('JWT_SECRET_KEY', 'benchmark')
+        os.environ['BCRYPT_ROUNDS'] = str(args.bcrypt_rounds)
+        os.environ.setdefault('DB_POOL_MAX', str(min(args.concorrencia, 50)))
+
+        app, servidor_http = iniciar_app(args.porta)
+        tokens_por_prof = tokens(app, range(1, min(args.professores, 200) + 1))
+
+        cenarios = {
+            'login': cenario_login(args.professores, args.requisicoes),
+            'disputa': cenario_disputa(tokens_por_prof, args.laboratorios, args.requisicoes),
+            'navegacao': cenario_navegacao(tokens_por_prof, args.professores, args.laboratorios, args.requisicoes),
+        }
+        resultados = {'seed_s': {k: round(v, 2) for k, v in tempos_seed.items()}}
+        for nome, requisicoes in cenarios.items():
+            resultados[nome] = asyncio.run(medir('127.0.0.1', args.porta, args.concorrencia, requisicoes))
+        servidor_http.shutdown()
+
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    print('salvo em', salvar('carga', resultados))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Mede o tempo de inicialização a frio do `main.py` com `python -X importtime`.
+
+Falha (código de saída 1) se a importação passar do orçamento ou se módulos
+pesados que deveriam ser carregados sob demanda aparecerem na inicialização:
+
+    python -m benchmarks.cold_start --orcamento-ms 800
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+# Módulos que só devem ser importados no primeiro uso
+PREGUICOSOS = ('boto3', 'botocore', 'bcrypt', 'redis')
+
+LINHA = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def medir(modulo, repeticoes):
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ambiente = dict(os.environ, PYTHONDONTWRITEBYTECODE='0')
+    amostras = []
+    importados = set()
+    for _ in range(repeticoes):
+        resultado = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {modulo}'],
+            cwd=raiz, env=ambiente, capture_output=True, text=True
+        )
+        if resultado.returncode != 0:
+            raise SystemExit(resultado.stderr)
+        total = 0
+        for linha in resultado.stderr.splitlines():
+            casamento = LINHA.match(linha)
+            if not casamento:
+                continue
+            _, cumulativo, indentacao, nome = casamento.groups()
+            importados.add(nome)
+            # Linhas de nível superior (indentação de um espaço) somam o total
+            if len(indentacao) == 1:
+                total += int(cumulativo)
+        amostras.append(total / 1000)
+    return sorted(amostras)[len(amostras) // 2], importados
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--modulo', default='main')
+    parser.add_argument('--orcamento-ms', type=float, default=800)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    mediana_ms, importados = medir(args.modulo, args.repeticoes)
+    indevidos = sorted(m for m in importados if m.split('.')[0] in PREGUICOSOS)
+
+    print(f"import {args.modulo}: mediana {mediana_ms:.1f} ms (orçamento {args.orcamento_ms:.0f} ms)")
+    if indevidos:
+        print("módulos carregados na inicialização e que deveriam ser tardios: " + ', '.join(indevidos))
+    return 1 if mediana_ms > args.orcamento_ms or indevidos else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
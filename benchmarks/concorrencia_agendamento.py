@@ -0,0 +1,150 @@
+"""Verifica que escritores concorrentes não conseguem agendar o mesmo horário.
+
+Com --laboratorios, mede também a vazão de escritores em laboratórios distintos: eles não disputam
+horários, só o contador único de agendamentos_mudancas, retido do INSERT até o COMMIT.
+
+Uso (contra um PostgreSQL local carregado com infra/db/schema.SQL):
+
+    DB_NAME=agendamentos DB_USER=postgres DB_PASSWORD=postgres DB_HOST=localhost \\
+        python -m benchmarks.concorrencia_agendamento --escritores 32 --laboratorios 32
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from datetime import date, timedelta
+
+from src.exceptions.custom_exception import CustomException
+from src.models.agendamento_model import Agendamento
+from src.repository.agendamento_repository import AgendamentoRepository
+from src.repository.database import Database
+
+
+def criar_database(maxconn):
+    return Database(
+        os.getenv('DB_NAME', 'agendamentos'),
+        os.getenv('DB_USER', 'postgres'),
+        os.getenv('DB_PASSWORD', 'postgres'),
+        os.getenv('DB_HOST', 'localhost'),
+        int(os.getenv('DB_PORT', '5432')),
+        maxconn=maxconn
+    )
+
+
+def preparar(database, laboratorios=1):
+    with database.connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO laboratorios (nome, capacidade) "
+                "SELECT 'Lab concorrência ' || n, 30 FROM generate_series(1, %s) AS n RETURNING id",
+                (laboratorios,)
+            )
+            ids_laboratorios = [linha[0] for linha in cursor.fetchall()]
+            cursor.execute(
+                "INSERT INTO professores (nome, email, senha_hash) VALUES (%s, %s, 'x') RETURNING id",
+                ('Professor concorrência', f'concorrencia-{time.time_ns()}@fecaf.com.br')
+            )
+            id_professor = cursor.fetchone()[0]
+    return ids_laboratorios, id_professor
+
+
+def medir_vazao(repository, ids_laboratorios, id_professor, dia, por_escritor):
+    """Cada escritor agenda `por_escritor` horários seguidos no próprio laboratório."""
+    barreira = threading.Barrier(len(ids_laboratorios))
+
+    def escritor(id_laboratorio):
+        barreira.wait()
+        # 32 janelas de 30 minutos por dia (07:00-23:00), com 10 minutos ocupados em cada
+        for i in range(por_escritor):
+            minuto = 7 * 60 + (i % 32) * 30
+            agendamento = Agendamento(None, id_laboratorio, id_professor, dia + timedelta(days=i // 32),
+                                      f"{minuto // 60:02d}:{minuto % 60:02d}",
+                                      f"{minuto // 60:02d}:{minuto % 60 + 10:02d}")
+            repository.fazer_agendamento(agendamento)
+
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=escritor, args=(id_laboratorio,)) for id_laboratorio in ids_laboratorios]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return len(ids_laboratorios) * por_escritor / (time.perf_counter() - inicio)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--escritores', type=int, default=32)
+    parser.add_argument('--laboratorios', type=int, default=0,
+                        help="escritores em laboratórios distintos para medir a vazão (0 desliga)")
+    parser.add_argument('--por-escritor', type=int, default=50)
+    args = parser.parse_args()
+
+    database = criar_database(max(args.escritores, args.laboratorios))
+    repository = AgendamentoRepository(database)
+    ids_laboratorios, id_professor = preparar(database, 1 + args.laboratorios)
+    id_laboratorio = ids_laboratorios[0]
+    dia = date.today() + timedelta(days=365)
+
+    # Metade tenta o mesmo horário e a outra metade horários que invadem o intervalo de 15 minutos
+    horarios = [("10:00", "11:00"), ("10:30", "11:30"), ("11:10", "12:10"), ("09:00", "10:00")]
+    barreira = threading.Barrier(args.escritores)
+    sucessos = []
+    conflitos = []
+    lock = threading.Lock()
+
+    def escritor(i):
+        hora_inicio, hora_fim = horarios[i % len(horarios)]
+        agendamento = Agendamento(None, id_laboratorio, id_professor, dia, hora_inicio, hora_fim)
+        barreira.wait()
+        try:
+            resultado = repository.fazer_agendamento(agendamento)
+            with lock:
+                sucessos.append((resultado['id'], hora_inicio, hora_fim))
+        except CustomException:
+            with lock:
+                conflitos.append((hora_inicio, hora_fim))
+
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=escritor, args=(i,)) for i in range(args.escritores)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duracao = time.perf_counter() - inicio
+
+    with database.connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT COUNT(*) FROM agendamentos a JOIN agendamentos b
+                  ON a.id < b.id AND a.id_laboratorio = b.id_laboratorio
+                 AND a.data_agendamento = b.data_agendamento
+                 AND a.hora_inicio < b.hora_fim + interval '15 minutes'
+                 AND b.hora_inicio < a.hora_fim + interval '15 minutes'
+                WHERE a.id_laboratorio = %s
+            """, (id_laboratorio,))
+            sobreposicoes = cursor.fetchone()[0]
+
+    print(f"escritores={args.escritores} sucessos={len(sucessos)} conflitos={len(conflitos)} "
+          f"sobreposicoes={sobreposicoes} duracao={duracao:.3f}s")
+    for agendamento_id, hora_inicio, hora_fim in sorted(sucessos, key=lambda s: s[1]):
+        print(f"  #{agendamento_id} {hora_inicio}-{hora_fim}")
+
+    if args.laboratorios:
+        # Um laboratório só e vários laboratórios: a diferença é o quanto o contador único deixa escalar
+        um = medir_vazao(repository, ids_laboratorios[1:2], id_professor, dia + timedelta(days=30), args.por_escritor)
+        varios = medir_vazao(repository, ids_laboratorios[1:], id_professor, dia + timedelta(days=60),
+                             args.por_escritor)
+        print(f"vazao laboratorios=1: {um:.0f} agendamentos/s; laboratorios={args.laboratorios}: {varios:.0f} "
+              f"agendamentos/s ({varios / um:.1f}x)")
+
+    with database.connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM laboratorios WHERE id = ANY(%s)", (ids_laboratorios,))
+            cursor.execute("DELETE FROM professores WHERE id = %s", (id_professor,))
+    database.close()
+    return 1 if sobreposicoes else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
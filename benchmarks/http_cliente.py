@@ -0,0 +1,70 @@
+"""Cliente HTTP/1.1 mínimo e assíncrono usado pelos testes de carga (só biblioteca padrão)."""
+import asyncio
+import json
+import time
+
+
+async def requisitar(host, porta, metodo, caminho, token=None, corpo=None, extras=None):
+    """Faz uma requisição com `Connection: close` e retorna (status, corpo em bytes)."""
+    dados = json.dumps(corpo).encode('utf-8') if corpo is not None else b''
+    cabecalhos = [f"{metodo} {caminho} HTTP/1.1", f"Host: {host}", "Connection: close",
+                  f"Content-Length: {len(dados)}"]
+    if token:
+        cabecalhos.append(f"Authorization: Bearer {token}")
+    if corpo is not None:
+        cabecalhos.append("Content-Type: application/json")
+    for nome, valor in (extras or {}).items():
+        cabecalhos.append(f"{nome}: {valor}")
+    reader, writer = await asyncio.open_connection(host, porta)
+    try:
+        writer.write(('\r\n'.join(cabecalhos) + '\r\n\r\n').encode('ascii') + dados)
+        await writer.drain()
+        resposta = await reader.read()
+    finally:
+        writer.close()
+    cabecalho, _, conteudo = resposta.partition(b'\r\n\r\n')
+    return int(cabecalho.split(b' ', 2)[1]), conteudo
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(int(len(ordenados) * p / 100), len(ordenados) - 1)]
+
+
+def resumir(latencias, erros, duracao):
+    total = len(latencias)
+    return {
+        'requisicoes': total,
+        'erros': erros,
+        'duracao_s': round(duracao, 3),
+        'rps': round(total / duracao, 1) if duracao else 0.0,
+        'p50_ms': round(percentil(latencias, 50) * 1000, 2),
+        'p95_ms': round(percentil(latencias, 95) * 1000, 2),
+        'p99_ms': round(percentil(latencias, 99) * 1000, 2),
+    }
+
+
+async def medir(host, porta, concorrencia, requisicoes, esperado=(200, 201)):
+    """Executa `requisicoes` (lista de dicts com metodo/caminho/token/corpo/cabecalhos/rota) e agrupa por rota."""
+    semaforo = asyncio.Semaphore(concorrencia)
+    por_rota = {}
+
+    async def uma(req):
+        async with semaforo:
+            inicio = time.perf_counter()
+            try:
+                status, _ = await requisitar(host, porta, req['metodo'], req['caminho'], req.get('token'), req.get('corpo'),
+                                             req.get('cabecalhos'))
+                erro = status not in req.get('esperado', esperado)
+            except OSError:
+                erro = True
+            latencias, erros = por_rota.setdefault(req['rota'], ([], [0]))
+            latencias.append(time.perf_counter() - inicio)
+            erros[0] += erro
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(uma(req) for req in requisicoes))
+    duracao = time.perf_counter() - inicio
+    return {rota: resumir(latencias, erros[0], duracao) for rota, (latencias, erros) in por_rota.items()}
@@ -0,0 +1,92 @@
+"""Importação de professores em massa: um criar_professor por linha x cadastro_csv (COPY + bcrypt em processos).
+
+- um_a_um: ProfessorService.criar_professor para cada linha (o caminho do POST /professores)
+- copy: ImportacaoService.importar_professores com `--processos` processos
+- exportacao: ImportacaoService.exportar dos agendamentos de um ano para um arquivo
+
+    python -m benchmarks.importacao --efemero --professores 2000
+"""
+import argparse
+import io
+import json
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+import psycopg2
+
+from benchmarks.postgres_local import criar_banco, postgres_efemero, postgres_existente
+from benchmarks.resultados import salvar
+from benchmarks.seed import semear
+
+
+def _planilha(prefixo, quantidade):
+    linhas = ['nome,email,senha']
+    linhas += [f'Professor {i},{prefixo}{i}@fecaf.com.br,senha{i}' for i in range(quantidade)]
+    return '\n'.join(linhas) + '\n'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--efemero', action='store_true')
+    parser.add_argument('--professores', type=int, default=2000)
+    parser.add_argument('--bcrypt-rounds', type=int, default=10)
+    parser.add_argument('--processos', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--agendamentos', type=int, default=500000)
+    args = parser.parse_args()
+
+    from src.auth.senha_hasher import SenhaHasher
+    from src.repository.database import Database
+    from src.repository.importacao_repository import ImportacaoRepository
+    from src.repository.professor_repository import ProfessorRepository
+    from src.service.importacao_service import ImportacaoService
+    from src.service.professor_service import ProfessorService
+
+    with (postgres_efemero() if args.efemero else postgres_existente()) as servidor:
+        credenciais = criar_banco(servidor, 'importacao')
+        conn = psycopg2.connect(dbname=credenciais['dbname'], user=credenciais['username'],
+                                password=credenciais['password'], host=credenciais['host'], port=credenciais['port'])
+        semear(conn, 100, 50, args.agendamentos, inicio=date.today() - timedelta(days=365))
+        conn.close()
+        database = Database(credenciais['dbname'], credenciais['username'], credenciais['password'],
+                            credenciais['host'], credenciais['port'], maxconn=4)
+        resultados = {}
+
+        # Mesmo custo de bcrypt nos dois caminhos; o um a um usa uma thread, como uma requisição
+        hasher = SenhaHasher(rounds=args.bcrypt_rounds, workers=1)
+        professor_service = ProfessorService(ProfessorRepository(database), hasher)
+        inicio = time.perf_counter()
+        for i in range(args.professores):
+            professor_service.criar_professor(f'Professor {i}', f'um{i}@fecaf.com.br', f'senha{i}')
+        duracao = time.perf_counter() - inicio
+        resultados['um_a_um'] = {'linhas': args.professores, 'segundos': round(duracao, 2),
+                                 'linhas_s': round(args.professores / duracao, 1)}
+        hasher.close()
+
+        service = ImportacaoService(ImportacaoRepository(database), rounds=args.bcrypt_rounds,
+                                    processos=args.processos)
+        inicio = time.perf_counter()
+        resumo = service.importar_professores(io.StringIO(_planilha('lote', args.professores)))
+        duracao = time.perf_counter() - inicio
+        resultados['copy'] = {'linhas': resumo['linhas'], 'inseridos': resumo['inseridos'],
+                              'erros': len(resumo['erros']), 'processos': args.processos,
+                              'segundos': round(duracao, 2), 'linhas_s': round(resumo['linhas'] / duracao, 1)}
+
+        with tempfile.TemporaryDirectory() as diretorio:
+            caminho = os.path.join(diretorio, 'agendamentos.csv')
+            inicio = time.perf_counter()
+            with open(caminho, 'w', encoding='utf-8', newline='') as arquivo:
+                linhas = service.exportar('agendamentos', arquivo, (date.today() - timedelta(days=365)).isoformat(),
+                                          date.today().isoformat())
+            duracao = time.perf_counter() - inicio
+            resultados['exportacao'] = {'linhas': linhas, 'bytes': os.path.getsize(caminho),
+                                        'segundos': round(duracao, 2), 'linhas_s': round(linhas / duracao, 1)}
+        database.close()
+
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    print('salvo em', salvar('importacao', resultados))
+
+
+if __name__ == '__main__':
+    main()
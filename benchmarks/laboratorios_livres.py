@@ -0,0 +1,90 @@
+"""Busca de laboratórios livres: uma consulta (anti-join) x sondagem laboratório por laboratório.
+
+- sondagem: lista os laboratórios e lê os agendamentos do dia de cada um,
+  como um cliente faria sem a busca
+- anti_join: LaboratorioRepository.livres, uma consulta para todos
+
+Os dias consultados ficam no período mais denso da carga gerada.
+
+    python -m benchmarks.laboratorios_livres --efemero --laboratorios 500
+"""
+import argparse
+import json
+import random
+from datetime import date, timedelta
+
+import psycopg2
+
+from benchmarks.micro import cronometrar
+from benchmarks.postgres_local import criar_banco, postgres_efemero, postgres_existente
+from benchmarks.resultados import salvar
+from benchmarks.seed import HORARIOS, semear
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--efemero', action='store_true')
+    parser.add_argument('--laboratorios', type=int, default=500)
+    parser.add_argument('--professores', type=int, default=2000)
+    parser.add_argument('--agendamentos', type=int, default=500000)
+    parser.add_argument('--repeticoes', type=int, default=200)
+    args = parser.parse_args()
+
+    from src.repository.agendamento_repository import AgendamentoRepository
+    from src.repository.database import Database
+    from src.repository.laboratorio_repository import LaboratorioRepository
+
+    with (postgres_efemero() if args.efemero else postgres_existente()) as servidor:
+        credenciais = criar_banco(servidor, 'laboratorios_livres')
+        conn = psycopg2.connect(dbname=credenciais['dbname'], user=credenciais['username'],
+                                password=credenciais['password'], host=credenciais['host'],
+                                port=credenciais['port'])
+        inicio = date.today().replace(day=1)
+        carga = semear(conn, args.professores, args.laboratorios, args.agendamentos, inicio=inicio)
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT min(data_agendamento), max(data_agendamento) FROM agendamentos")
+            primeiro_dia, ultimo_dia = cursor.fetchone()
+        conn.close()
+
+        database = Database(credenciais['dbname'], credenciais['username'], credenciais['password'],
+                            credenciais['host'], credenciais['port'], maxconn=2)
+        laboratorios = LaboratorioRepository(database)
+        agendamentos = AgendamentoRepository(database)
+        rnd = random.Random(11)
+        dias = (ultimo_dia - primeiro_dia).days
+
+        def parametros():
+            # O último dia gerado pode estar incompleto: sorteia entre os anteriores
+            dia = primeiro_dia + timedelta(days=rnd.randint(0, max(dias - 1, 0)))
+            hora_inicio, hora_fim = rnd.choice(HORARIOS)
+            return dia, hora_inicio, hora_fim, rnd.choice((20, 30, 40))
+
+        def ocupado(id_laboratorio, dia, hora_inicio, hora_fim):
+            return any(a.hora_inicio.strftime('%H:%M') < hora_fim and a.hora_fim.strftime('%H:%M') > hora_inicio
+                       for a in agendamentos.iter_filtrados(id_laboratorio=id_laboratorio, data_inicio=dia, data_fim=dia))
+
+        def sondagem(_):
+            dia, hora_inicio, hora_fim, capacidade = parametros()
+            return [laboratorio for laboratorio in sorted(laboratorios.get_all(), key=lambda l: (l.capacidade, l.id))
+                    if laboratorio.capacidade >= capacidade
+                    and not ocupado(laboratorio.id, dia, hora_inicio, hora_fim)]
+
+        def anti_join(_):
+            dia, hora_inicio, hora_fim, capacidade = parametros()
+            return laboratorios.livres(dia, hora_inicio, hora_fim, capacidade)
+
+        resultados = {
+            'carga_s': {tabela: round(segundos, 2) for tabela, segundos in carga.items()},
+            'dias': dias + 1,
+            'sondagem': cronometrar(sondagem, max(args.repeticoes // 20, 5)),
+            'anti_join': cronometrar(anti_join, args.repeticoes),
+            'comandos': database.consultas.stats(),
+        }
+        database.close()
+
+    print(json.dumps(resultados, indent=2, ensure_ascii=False, default=str))
+    print('salvo em', salvar('laboratorios_livres', resultados))
+
+
+if __name__ == '__main__':
+    main()
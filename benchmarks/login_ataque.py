@@ -0,0 +1,113 @@
+"""Latência dos logins legítimos durante um ataque de força bruta.
+
+Os mesmos logins legítimos (um IP por professor, senha correta) rodam em três
+situações, cada uma com uma instância nova do app:
+
+- sem_ataque: só os logins legítimos
+- ataque_sem_limite: com o ataque e LOGIN_LIMITE_IP=LOGIN_LIMITE_EMAIL=0
+- ataque_com_limite: com o ataque e os limites padrão
+
+O ataque mistura três padrões:
+
+- ataque_ip: poucos IPs tentando senhas em e-mails existentes (limite por IP)
+- ataque_email: IPs variados contra poucos e-mails (limite por e-mail)
+- ataque_desconhecido: IPs e e-mails inexistentes variados (cache negativo, sem bcrypt)
+
+Os IPs vão no X-Forwarded-For (PROXY_X_FOR=1). Compare p50/p99 de `legitimo`.
+
+    python -m benchmarks.login_ataque --efemero
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+
+from benchmarks.carga import iniciar_app
+from benchmarks.http_cliente import medir
+from benchmarks.postgres_local import criar_banco, exportar_para_app, postgres_efemero, postgres_existente
+from benchmarks.resultados import salvar
+from benchmarks.seed import SENHA_PADRAO, semear
+
+
+def _login(rota, email, senha, ip, esperado):
+    return {'metodo': 'POST', 'caminho': '/login', 'rota': rota, 'esperado': esperado,
+            'corpo': {'email': email, 'senha': senha}, 'cabecalhos': {'X-Forwarded-For': ip}}
+
+
+def logins_legitimos(professores, total):
+    # Professores distintos, cada um do seu IP: nunca chegam perto dos limites
+    return [_login('legitimo', f'professor{i}@fecaf.com.br', SENHA_PADRAO, f'10.0.{i // 250}.{i % 250 + 1}', (200,))
+            for i in range(1, min(total, professores) + 1)]
+
+
+def ataque(professores, total, primeiro_alvo):
+    # Os e-mails atacados ficam fora dos usados pelos logins legítimos
+    rnd = random.Random(9)
+    alvos = [f'professor{rnd.randint(primeiro_alvo, professores)}@fecaf.com.br' for _ in range(5)]
+    requisicoes = []
+    for i in range(total):
+        padrao = i % 3
+        ip = f'172.16.{rnd.randint(0, 255)}.{rnd.randint(1, 254)}'
+        if padrao == 0:
+            requisicoes.append(_login('ataque_ip', f'professor{rnd.randint(primeiro_alvo, professores)}@fecaf.com.br',
+                                      f'errada{i}', f'192.168.0.{i % 4 + 1}', (401, 429)))
+        elif padrao == 1:
+            requisicoes.append(_login('ataque_email', rnd.choice(alvos), f'errada{i}', ip, (401, 429)))
+        else:
+            requisicoes.append(_login('ataque_desconhecido', f'ninguem{i % 500}@exemplo.com', f'errada{i}', ip,
+                                      (401, 429)))
+    return requisicoes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--efemero', action='store_true')
+    parser.add_argument('--professores', type=int, default=2000)
+    parser.add_argument('--bcrypt-rounds', type=int, default=10)
+    parser.add_argument('--legitimos', type=int, default=300)
+    parser.add_argument('--ataque', type=int, default=6000)
+    parser.add_argument('--concorrencia', type=int, default=64)
+    parser.add_argument('--porta', type=int, default=5070)
+    args = parser.parse_args()
+
+    with (postgres_efemero() if args.efemero else postgres_existente()) as servidor:
+        credenciais = criar_banco(servidor, 'login_ataque')
+        import psycopg2
+        conn = psycopg2.connect(dbname=credenciais['dbname'], user=credenciais['username'],
+                                password=credenciais['password'], host=credenciais['host'], port=credenciais['port'])
+        semear(conn, args.professores, 10, 1000, rounds=args.bcrypt_rounds)
+        conn.close()
+
+        exportar_para_app(credenciais)
+        os.environ.setdefault('JWT_SECRET_KEY', 'benchmark')
+        os.environ['BCRYPT_ROUNDS'] = str(args.bcrypt_rounds)
+        os.environ['PROXY_X_FOR'] = '1'
+        # A fila do bcrypt não deve recusar: o que se mede aqui é o limitador
+        os.environ['BCRYPT_MAX_PENDENTES'] = str(args.legitimos + args.ataque)
+
+        legitimos = logins_legitimos(args.professores, args.legitimos)
+        situacoes = {
+            'sem_ataque': (legitimos, {}),
+            'ataque_sem_limite': (legitimos + ataque(args.professores, args.ataque, len(legitimos) + 1),
+                                  {'LOGIN_LIMITE_IP': '0', 'LOGIN_LIMITE_EMAIL': '0'}),
+            'ataque_com_limite': (legitimos + ataque(args.professores, args.ataque, len(legitimos) + 1), {}),
+        }
+        resultados = {}
+        for indice, (nome, (requisicoes, ambiente)) in enumerate(situacoes.items()):
+            for variavel in ('LOGIN_LIMITE_IP', 'LOGIN_LIMITE_EMAIL'):
+                os.environ.pop(variavel, None)
+            os.environ.update(ambiente)
+            _, servidor_http = iniciar_app(args.porta + indice)
+            # Os legítimos chegam espalhados no meio do ataque
+            requisicoes = list(requisicoes)
+            random.Random(indice).shuffle(requisicoes)
+            resultados[nome] = asyncio.run(medir('127.0.0.1', args.porta + indice, args.concorrencia, requisicoes))
+            servidor_http.shutdown()
+
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    print('salvo em', salvar('login_ataque', resultados))
+
+
+if __name__ == '__main__':
+    main()
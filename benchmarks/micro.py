@@ -0,0 +1,148 @@
+"""Micro-benchmarks dos caminhos quentes.
+
+- serializacao: dicts montados à mão (caminho antigo) x to_dict + json_dumps x texto já pronto (sem banco)
+- fazer_agendamento: AgendamentoRepository.fazer_agendamento em horários livres
+- login: ProfessorService.login_professor com o SenhaHasher
+- listagem: iter_filtrados + to_dict x iter_json_filtrados (JSON montado no PostgreSQL)
+- requisicao_sem_prepare / requisicao_com_prepare: tempo de banco de uma requisição típica
+  (get_by_email, get_by_id e verificação de intervalo) com e sem comandos preparados
+
+    python -m benchmarks.micro --efemero
+    python -m benchmarks.micro --somente serializacao
+"""
+import argparse
+import json
+import time
+from datetime import date, datetime, time as hora, timedelta
+
+from benchmarks.postgres_local import criar_banco, postgres_efemero, postgres_existente
+from benchmarks.resultados import salvar
+from src.models.agendamento_model import Agendamento
+from src.utils.utils import json_dumps, stream_json_array
+
+
+def cronometrar(funcao, repeticoes):
+    amostras = []
+    for i in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(i)
+        amostras.append(time.perf_counter() - inicio)
+    amostras.sort()
+    return {
+        'repeticoes': repeticoes,
+        'media_ms': round(sum(amostras) / len(amostras) * 1000, 4),
+        'p50_ms': round(amostras[len(amostras) // 2] * 1000, 4),
+        'p95_ms': round(amostras[min(int(len(amostras) * 0.95), len(amostras) - 1)] * 1000, 4),
+        'ops_s': round(len(amostras) / sum(amostras), 1),
+    }
+
+
+def _dict_legado(agendamento):
+    # Como as rotas montavam a resposta antes dos modelos com to_dict
+    return {
+        'id': agendamento.id,
+        'id_laboratorio': agendamento.id_laboratorio,
+        'id_professor': agendamento.id_professor,
+        'data_agendamento': agendamento.data_agendamento.strftime('%Y-%m-%d'),
+        'hora_inicio': agendamento.hora_inicio.strftime('%H:%M:%S'),
+        'hora_fim': agendamento.hora_fim.strftime('%H:%M:%S')
+    }
+
+
+def bench_serializacao(linhas, repeticoes):
+    agendamentos = [Agendamento(i, i % 300, i % 5000, date(2026, 1, 1) + timedelta(days=i % 365),
+                                hora(8, 0), hora(9, 0), datetime(2025, 12, 1)) for i in range(linhas)]
+    # Simula as linhas que o PostgreSQL entrega já em JSON no render=db
+    textos = [json_dumps(a.to_dict()) for a in agendamentos]
+    return {
+        'legado_lista_json': cronometrar(lambda _: json.dumps([_dict_legado(a) for a in agendamentos]), repeticoes),
+        'to_dict_lista_json': cronometrar(lambda _: json_dumps([a.to_dict() for a in agendamentos]), repeticoes),
+        'to_dict_stream': cronometrar(lambda _: ''.join(stream_json_array(agendamentos, Agendamento.to_dict)), repeticoes),
+        'texto_pronto_stream': cronometrar(lambda _: ''.join(stream_json_array(textos)), repeticoes),
+    }
+
+
+def bench_banco(servidor, repeticoes, rounds):
+    from src.auth.senha_hasher import SenhaHasher
+    from src.repository.agendamento_repository import AgendamentoRepository
+    from src.repository.database import Database
+    from src.repository.professor_repository import ProfessorRepository
+    from src.service.professor_service import ProfessorService
+
+    credenciais = criar_banco(servidor, 'micro_agendamentos')
+    database = Database(credenciais['dbname'], credenciais['username'], credenciais['password'],
+                        credenciais['host'], credenciais['port'])
+    hasher = SenhaHasher(rounds=rounds)
+    professor_service = ProfessorService(ProfessorRepository(database), hasher)
+    professor_service.criar_professor('Professor Micro', 'micro@fecaf.com.br', 'senha123')
+    with database.connection() as conn, conn.cursor() as cursor:
+        cursor.execute("INSERT INTO laboratorios (nome, capacidade) VALUES ('Lab micro', 30) RETURNING id")
+        id_lab = cursor.fetchone()[0]
+        cursor.execute("SELECT id FROM professores LIMIT 1")
+        id_prof = cursor.fetchone()[0]
+
+    repository = AgendamentoRepository(database)
+    dia_base = date.today() + timedelta(days=30)
+
+    def agendar(i):
+        # Um horário livre por repetição: 12 por dia, 75 minutos de passo
+        dia = dia_base + timedelta(days=i // 12)
+        minuto = 7 * 60 + (i % 12) * 75
+        repository.fazer_agendamento(Agendamento(None, id_lab, id_prof, dia, f'{minuto // 60:02d}:{minuto % 60:02d}',
+                                                 f'{(minuto + 60) // 60:02d}:{minuto % 60:02d}'))
+
+    resultados = {
+        'fazer_agendamento': cronometrar(agendar, repeticoes),
+        # As listagens percorrem os agendamentos criados acima
+        'listagem_objetos': cronometrar(
+            lambda _: ''.join(stream_json_array(repository.iter_filtrados(), Agendamento.to_dict)), repeticoes),
+        'listagem_sql_json': cronometrar(
+            lambda _: ''.join(stream_json_array(repository.iter_json_filtrados())), repeticoes),
+        'login_professor': cronometrar(lambda _: professor_service.login_professor('micro@fecaf.com.br', 'senha123'),
+                                       max(repeticoes // 10, 10)),
+    }
+
+    # Mesma sequência de consultas com e sem PREPARE, em uma conexão só para isolar o custo do comando
+    for preparar in (False, True):
+        banco = Database(credenciais['dbname'], credenciais['username'], credenciais['password'],
+                         credenciais['host'], credenciais['port'], maxconn=1, preparar=preparar)
+        professores = ProfessorRepository(banco)
+        agendamentos = AgendamentoRepository(banco)
+
+        def requisicao(i):
+            professores.get_by_email('micro@fecaf.com.br')
+            agendamentos.get_by_id(1 + i % repeticoes)
+
+        requisicao(0)
+        chave = 'requisicao_com_prepare' if preparar else 'requisicao_sem_prepare'
+        resultados[chave] = cronometrar(requisicao, repeticoes * 5)
+        resultados[chave]['comandos'] = banco.consultas.stats()
+        banco.close()
+
+    hasher.close()
+    database.close()
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--efemero', action='store_true')
+    parser.add_argument('--somente', choices=('serializacao', 'banco'))
+    parser.add_argument('--linhas', type=int, default=10000)
+    parser.add_argument('--repeticoes', type=int, default=200)
+    parser.add_argument('--bcrypt-rounds', type=int, default=12)
+    args = parser.parse_args()
+
+    resultados = {}
+    if args.somente in (None, 'serializacao'):
+        resultados['serializacao'] = bench_serializacao(args.linhas, max(args.repeticoes // 20, 5))
+    if args.somente in (None, 'banco'):
+        with (postgres_efemero() if args.efemero else postgres_existente()) as servidor:
+            resultados['banco'] = bench_banco(servidor, args.repeticoes, args.bcrypt_rounds)
+
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    print('salvo em', salvar('micro', resultados))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Custo da fila de tarefas (outbox) no caminho de escrita.
+
+- sem_efeitos: fazer_agendamento sem tarefas (o caminho antes da fila)
+- inline: fazer_agendamento seguido do e-mail e da auditoria na própria requisição
+- outbox: fazer_agendamento gravando as tarefas na mesma transação
+- worker: vazão do ProcessadorTarefas esvaziando as tarefas acumuladas pelo `outbox`
+
+O SMTP é simulado por um enviador que grava .eml e espera `--latencia-smtp` ms.
+
+    python -m benchmarks.outbox --efemero
+"""
+import argparse
+import json
+import tempfile
+import time
+from datetime import date, timedelta
+
+from benchmarks.micro import cronometrar
+from benchmarks.postgres_local import criar_banco, postgres_efemero, postgres_existente
+from benchmarks.resultados import salvar
+
+
+class EnviadorLento:
+    def __init__(self, enviador, latencia):
+        self.enviador = enviador
+        self.latencia = latencia
+
+    def enviar(self, mensagem):
+        time.sleep(self.latencia)
+        self.enviador.enviar(mensagem)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--efemero', action='store_true')
+    parser.add_argument('--repeticoes', type=int, default=600)
+    parser.add_argument('--latencia-smtp', type=float, default=50.0)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    from src.models.agendamento_model import Agendamento
+    from src.repository.agendamento_repository import AgendamentoRepository
+    from src.repository.database import Database
+    from src.repository.laboratorio_repository import LaboratorioRepository
+    from src.repository.particao_repository import ParticaoRepository
+    from src.repository.professor_repository import ProfessorRepository
+    from src.repository.tarefa_repository import TarefaRepository
+    from src.repository.versao_repository import VersaoRepository
+    from src.service.agendamento_service import AgendamentoService
+    from src.service.notificacao_email import EnviadorArquivo
+    from src.service.tarefas import ProcessadorTarefas, TarefasAgendamento
+
+    with (postgres_efemero() if args.efemero else postgres_existente()) as servidor, \
+            tempfile.TemporaryDirectory() as diretorio:
+        credenciais = criar_banco(servidor, 'outbox')
+        database = Database(credenciais['dbname'], credenciais['username'], credenciais['password'],
+                            credenciais['host'], credenciais['port'], maxconn=args.workers + 2)
+        with database.connection() as conn, conn.cursor() as cursor:
+            cursor.execute("INSERT INTO professores (nome, email, senha_hash) VALUES ('Professor Outbox', "
+                           "'outbox@fecaf.com.br', 'x') RETURNING id")
+            id_prof = cursor.fetchone()[0]
+            cursor.execute("INSERT INTO laboratorios (nome, capacidade) SELECT 'Lab ' || i, 30 "
+                           "FROM generate_series(1, 3) AS i RETURNING id")
+            laboratorios = [linha[0] for linha in cursor.fetchall()]
+
+        versoes = VersaoRepository(database)
+        repository = AgendamentoRepository(database, ParticaoRepository(database))
+        tarefa_repository = TarefaRepository(database)
+        tarefas = TarefasAgendamento(tarefa_repository, repository, ProfessorRepository(database),
+                                     LaboratorioRepository(database), versoes,
+                                     EnviadorLento(EnviadorArquivo(diretorio), args.latencia_smtp / 1000))
+        dia_base = date.today() + timedelta(days=30)
+
+        def agendar(id_lab, tipos):
+            def executar(i):
+                # Um horário livre por repetição: 12 por dia, 75 minutos de passo
+                dia = dia_base + timedelta(days=i // 12)
+                minuto = 7 * 60 + (i % 12) * 75
+                agendamento = Agendamento(None, id_lab, id_prof, dia, f'{minuto // 60:02d}:{minuto % 60:02d}',
+                                          f'{(minuto + 60) // 60:02d}:{minuto % 60:02d}')
+                resultado = repository.fazer_agendamento(agendamento, tipos)
+                if tipos is None:
+                    # Os mesmos efeitos, executados antes de responder
+                    evento = {'id': resultado['id'], 'operacao': 'criado', 'id_laboratorio': id_lab,
+                              'id_professor': id_prof, 'data_agendamento': dia.isoformat(),
+                              'hora_inicio': agendamento.hora_inicio + ':00', 'hora_fim': agendamento.hora_fim + ':00',
+                              'por': None, 'ocorrido_em': time.strftime('%Y-%m-%dT%H:%M:%S%z')}
+                    tarefas.confirmacao_email(None, evento)
+                    tarefas.auditoria(None, evento)
+                    tarefas.invalidar_cache(None, evento)
+            return executar
+
+        resultados = {
+            'sem_efeitos': cronometrar(agendar(laboratorios[0], ()), args.repeticoes),
+            'inline': cronometrar(agendar(laboratorios[1], None), args.repeticoes),
+            'outbox': cronometrar(agendar(laboratorios[2], AgendamentoService.TAREFAS['criado']), args.repeticoes),
+        }
+
+        processador = ProcessadorTarefas(database, tarefa_repository, tarefas.handlers(), lote=100,
+                                         workers=args.workers)
+        inicio = time.perf_counter()
+        processadas = processador.esvaziar()
+        duracao = time.perf_counter() - inicio
+        resultados['worker'] = {'tarefas': processadas, 'segundos': round(duracao, 3),
+                                'tarefas_s': round(processadas / duracao, 1) if duracao else None,
+                                **tarefa_repository.stats()}
+        database.close()
+
+    print(json.dumps(resultados, indent=2, ensure_ascii=False, default=str))
+    print('salvo em', salvar('outbox', resultados))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+"""Compara a tabela particionada por mês com uma cópia sem partições (heap única).
+
+Gera vários anos de agendamentos, copia-os para `agendamentos_heap` com os
+mesmos índices e a mesma restrição de exclusão, e mede nas duas tabelas:
+
+- conflito: verificação de sobreposição em um dia recente
+- insercao: INSERT (com a restrição de exclusão) seguido de rollback
+- listagem_mes: agendamentos de um laboratório em um mês
+- por_id: busca por id (na particionada, com a data vinda de agendamentos_datas)
+
+Também informa quantas partições cada consulta leu (EXPLAIN ANALYZE), o
+tamanho dos índices e o tempo para arquivar os meses com mais de um ano.
+
+    python -m benchmarks.particionamento --efemero --agendamentos 2000000
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+import psycopg2
+
+from benchmarks.micro import cronometrar
+from benchmarks.postgres_local import criar_banco, postgres_efemero, postgres_existente
+from benchmarks.resultados import salvar
+from benchmarks.seed import HORARIOS, semear
+
+COLUNAS = "id, id_laboratorio, id_professor, data_agendamento, hora_inicio, hora_fim, criado_em"
+
+CONSULTAS = {
+    'conflito': """
+        SELECT COUNT(*) FROM {tabela}
+        WHERE id_laboratorio = %(lab)s AND data_agendamento = %(dia)s
+        AND (hora_inicio < '11:00'::time AND hora_fim > '10:00'::time)
+    """,
+    'listagem_mes': f"""
+        SELECT {COLUNAS} FROM {{tabela}}
+        WHERE id_laboratorio = %(lab)s AND data_agendamento >= %(mes)s AND data_agendamento < %(proximo_mes)s
+        ORDER BY id
+    """,
+}
+POR_ID = {
+    'agendamentos': f"""SELECT {COLUNAS} FROM agendamentos
+        WHERE id = %(id)s AND data_agendamento = (SELECT data_agendamento FROM agendamentos_datas WHERE id = %(id)s)""",
+    'agendamentos_heap': f"SELECT {COLUNAS} FROM agendamentos_heap WHERE id = %(id)s",
+}
+INSERIR = """
+    INSERT INTO {tabela} (id_laboratorio, id_professor, data_agendamento, hora_inicio, hora_fim)
+    VALUES (%(lab)s, %(prof)s, %(dia)s, %(inicio)s, %(fim)s)
+"""
+
+
+def criar_heap(cursor):
+    cursor.execute("CREATE TABLE agendamentos_heap (LIKE agendamentos INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    cursor.execute(f"INSERT INTO agendamentos_heap ({COLUNAS}) SELECT {COLUNAS} FROM agendamentos")
+    cursor.execute("ALTER TABLE agendamentos_heap ADD PRIMARY KEY (id)")
+    cursor.execute("CREATE INDEX ON agendamentos_heap (id_laboratorio, data_agendamento)")
+    cursor.execute("CREATE INDEX ON agendamentos_heap (id_professor, data_agendamento)")
+    cursor.execute("""
+        ALTER TABLE agendamentos_heap ADD CONSTRAINT excl_heap_sem_sobreposicao EXCLUDE USING gist (
+            id_laboratorio WITH =,
+            tsrange(data_agendamento + hora_inicio, data_agendamento + hora_fim + interval '15 minutes') WITH &&
+        )
+    """)
+    # Mesmo trigger de registro de mudanças da tabela original, para comparar o mesmo trabalho por escrita
+    cursor.execute("""
+        CREATE TRIGGER trg_heap_mudancas AFTER INSERT OR UPDATE OR DELETE ON agendamentos_heap
+        FOR EACH ROW EXECUTE FUNCTION registrar_mudanca_agendamento()
+    """)
+    cursor.execute("ANALYZE agendamentos_heap")
+
+
+def particoes_lidas(cursor, sql, params):
+    # Conta as tabelas efetivamente percorridas no plano executado
+    cursor.execute("EXPLAIN (ANALYZE, FORMAT JSON) " + sql, params)
+    plano = cursor.fetchone()[0]
+    if isinstance(plano, str):
+        plano = json.loads(plano)
+    lidas = set()
+
+    def visitar(no):
+        if no.get('Relation Name') and no.get('Actual Loops', 0) > 0:
+            lidas.add(no['Relation Name'])
+        for filho in no.get('Plans', ()):
+            visitar(filho)
+
+    visitar(plano[0]['Plan'])
+    return len(lidas - {'agendamentos_datas'})
+
+
+def tamanho_indices(cursor, tabela):
+    # Total e maior tabela: na particionada, uma consulta do mês só percorre os índices de uma partição
+    cursor.execute("""
+        SELECT coalesce(sum(pg_indexes_size(c.oid)), 0), coalesce(max(pg_indexes_size(c.oid)), 0) FROM pg_class c
+        WHERE c.oid = %s::regclass OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = %s::regclass)
+    """, (tabela, tabela))
+    total, maior = cursor.fetchone()
+    return {'total': int(total), 'maior_tabela': int(maior)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--efemero', action='store_true')
+    parser.add_argument('--agendamentos', type=int, default=2000000)
+    parser.add_argument('--laboratorios', type=int, default=300)
+    parser.add_argument('--professores', type=int, default=5000)
+    parser.add_argument('--anos', type=int, default=3)
+    parser.add_argument('--repeticoes', type=int, default=500)
+    args = parser.parse_args()
+
+    with (postgres_efemero() if args.efemero else postgres_existente()) as servidor:
+        credenciais = criar_banco(servidor, 'particionamento_agendamentos')
+        conn = psycopg2.connect(dbname=credenciais['dbname'], user=credenciais['username'],
+                                password=credenciais['password'], host=credenciais['host'],
+                                port=credenciais['port'])
+        inicio = date.today().replace(day=1) - timedelta(days=365 * args.anos)
+        carga = semear(conn, args.professores, args.laboratorios, args.agendamentos, inicio=inicio)
+        with conn.cursor() as cursor:
+            t = time.perf_counter()
+            criar_heap(cursor)
+            conn.commit()
+            carga['agendamentos_heap'] = time.perf_counter() - t
+            cursor.execute("SELECT min(id), max(id), max(data_agendamento) FROM agendamentos_heap")
+            primeiro_id, ultimo_id, ultimo_dia = cursor.fetchone()
+            cursor.execute("SELECT min(id), max(id) FROM laboratorios")
+            primeiro_lab, ultimo_lab = cursor.fetchone()
+            cursor.execute("SELECT min(id) FROM professores")
+            id_prof = cursor.fetchone()[0]
+
+        rnd = random.Random(7)
+        futuro = date.today() + timedelta(days=60)
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT criar_particao_agendamentos(%s)", (futuro,))
+        conn.commit()
+
+        def parametros():
+            # Consultas concentradas no último mês gerado, como no uso real
+            dia = ultimo_dia - timedelta(days=rnd.randint(0, 27))
+            mes = dia.replace(day=1)
+            hora_inicio, hora_fim = rnd.choice(HORARIOS)
+            return {
+                'lab': rnd.randint(primeiro_lab, ultimo_lab), 'prof': id_prof, 'dia': dia,
+                'mes': mes, 'proximo_mes': (mes + timedelta(days=32)).replace(day=1),
+                'id': rnd.randint(primeiro_id, ultimo_id), 'inicio': hora_inicio, 'fim': hora_fim,
+            }
+
+        resultados = {'carga_s': {tabela: round(segundos, 2) for tabela, segundos in carga.items()}}
+        with conn.cursor() as cursor:
+            for tabela in ('agendamentos', 'agendamentos_heap'):
+                medidas = {}
+                amostra = parametros()
+                for nome, sql in CONSULTAS.items():
+                    sql = sql.format(tabela=tabela)
+                    medidas[nome] = cronometrar(lambda _: (cursor.execute(sql, parametros()), cursor.fetchall()),
+                                                args.repeticoes)
+                    medidas[nome]['tabelas_lidas'] = particoes_lidas(cursor, sql, amostra)
+                medidas['por_id'] = cronometrar(lambda _: (cursor.execute(POR_ID[tabela], parametros()),
+                                                           cursor.fetchall()), args.repeticoes)
+                medidas['por_id']['tabelas_lidas'] = particoes_lidas(cursor, POR_ID[tabela], amostra)
+
+                def inserir(_):
+                    params = parametros()
+                    params['dia'] = futuro
+                    cursor.execute(INSERIR.format(tabela=tabela), params)
+                    conn.rollback()
+
+                medidas['insercao'] = cronometrar(inserir, args.repeticoes)
+                conn.rollback()
+                medidas['bytes_indices'] = tamanho_indices(cursor, tabela)
+                resultados[tabela] = medidas
+
+        conn.close()
+
+        # Arquivamento dos meses com mais de um ano
+        from src.repository.database import Database
+        from src.repository.particao_repository import ParticaoRepository
+
+        database = Database(credenciais['dbname'], credenciais['username'], credenciais['password'],
+                            credenciais['host'], credenciais['port'], maxconn=2)
+        with tempfile.TemporaryDirectory(prefix='arquivo-agendamentos-') as diretorio:
+            t = time.perf_counter()
+            arquivadas = ParticaoRepository(database).arquivar(date.today() - timedelta(days=365), diretorio)
+            resultados['arquivamento'] = {
+                'particoes': len(arquivadas),
+                'segundos': round(time.perf_counter() - t, 2),
+                'bytes_comprimidos': sum(particao['bytes'] for particao in arquivadas),
+            }
+        database.close()
+
+    print(json.dumps(resultados, indent=2, ensure_ascii=False, default=str))
+    print('salvo em', salvar('particionamento', resultados))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""PostgreSQL local para os benchmarks.
+
+Usa o servidor indicado por DB_HOST/DB_PORT/DB_USER/DB_PASSWORD se existir;
+com `--efemero`, cria um cluster temporário com initdb/pg_ctl (precisam estar
+no PATH) e o remove ao final.
+"""
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA = os.path.join(RAIZ, 'infra', 'db', 'schema.SQL')
+
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def postgres_efemero():
+    diretorio = tempfile.mkdtemp(prefix='bench-pg-')
+    porta = _porta_livre()
+    dados = os.path.join(diretorio, 'dados')
+    subprocess.run(['initdb', '-D', dados, '-U', 'postgres', '--auth=trust', '-E', 'UTF8'],
+                   check=True, capture_output=True)
+    subprocess.run(['pg_ctl', '-D', dados, '-o', f'-p {porta} -k {diretorio} -c fsync=off -c max_connections=300',
+                    '-l', os.path.join(diretorio, 'log'), '-w', 'start'], check=True, capture_output=True)
+    try:
+        yield {'host': '127.0.0.1', 'port': porta, 'username': 'postgres', 'password': ''}
+    finally:
+        subprocess.run(['pg_ctl', '-D', dados, '-m', 'immediate', 'stop'], capture_output=True)
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+
+@contextmanager
+def postgres_existente():
+    yield {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'port': int(os.getenv('DB_PORT', '5432')),
+        'username': os.getenv('DB_USER', 'postgres'),
+        'password': os.getenv('DB_PASSWORD', 'postgres'),
+    }
+
+
+def criar_banco(servidor, nome):
+    """Recria o banco `nome` a partir de infra/db/schema.SQL e retorna as credenciais."""
+    import psycopg2
+
+    conn = psycopg2.connect(dbname='postgres', user=servidor['username'], password=servidor['password'],
+                            host=servidor['host'], port=servidor['port'])
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        cursor.execute(f'DROP DATABASE IF EXISTS "{nome}"')
+        cursor.execute(f'CREATE DATABASE "{nome}"')
+    conn.close()
+
+    credenciais = dict(servidor, dbname=nome)
+    conn = psycopg2.connect(dbname=nome, user=servidor['username'], password=servidor['password'],
+                            host=servidor['host'], port=servidor['port'])
+    with conn, conn.cursor() as cursor, open(SCHEMA, encoding='utf-8') as arquivo:
+        cursor.execute(arquivo.read())
+    conn.close()
+    return credenciais
+
+
+def exportar_para_app(credenciais):
+    # O create_app lê as credenciais do ambiente com CREDENTIALS_SOURCE=env
+    os.environ.update({
+        'CREDENTIALS_SOURCE': 'env',
+        'DB_NAME': credenciais['dbname'],
+        'DB_USER': credenciais['username'],
+        'DB_PASSWORD': credenciais['password'],
+        'DB_HOST': credenciais['host'],
+        'DB_PORT': str(credenciais['port']),
+    })
+
+
+def aguardar_porta(host, porta, timeout=10.0):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        try:
+            with socket.create_connection((host, porta), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise TimeoutError(f'{host}:{porta} não respondeu')
@@ -0,0 +1,124 @@
+"""Relatórios de ocupação: agregados mantidos por trigger x GROUP BY direto em agendamentos.
+
+- utilizacao_mes: minutos ocupados por dia em um mês
+- horarios_pico: minutos por dia da semana e hora em um trimestre
+- top_professores: 5 professores com mais horas por laboratório em um trimestre
+- insercao: INSERT de um agendamento (com o trigger dos agregados) seguido de rollback
+
+    python -m benchmarks.relatorios --efemero --agendamentos 2000000
+"""
+import argparse
+import json
+import random
+from datetime import date, timedelta
+
+import psycopg2
+
+from benchmarks.micro import cronometrar
+from benchmarks.postgres_local import criar_banco, postgres_efemero, postgres_existente
+from benchmarks.resultados import salvar
+from benchmarks.seed import HORARIOS, semear
+
+DIRETO = {
+    'utilizacao_mes': """
+        SELECT data_agendamento, sum(extract(epoch FROM hora_fim - hora_inicio) / 60), count(*) FROM agendamentos
+        WHERE data_agendamento BETWEEN %(inicio)s AND %(fim_mes)s GROUP BY 1 ORDER BY 1
+    """,
+    'horarios_pico': """
+        SELECT extract(isodow FROM a.data_agendamento), p.hora, sum(p.minutos)
+        FROM agendamentos a, ocupacao_por_hora(a.hora_inicio, a.hora_fim) p
+        WHERE a.data_agendamento BETWEEN %(inicio)s AND %(fim_trimestre)s GROUP BY 1, 2
+    """,
+    'top_professores': """
+        SELECT * FROM (
+            SELECT id_laboratorio, id_professor, count(*),
+                   row_number() OVER (PARTITION BY id_laboratorio ORDER BY count(*) DESC, id_professor) AS posicao
+            FROM agendamentos WHERE data_agendamento BETWEEN %(inicio)s AND %(fim_trimestre)s
+            GROUP BY id_laboratorio, id_professor
+        ) t WHERE posicao <= 5
+    """,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--efemero', action='store_true')
+    parser.add_argument('--agendamentos', type=int, default=2000000)
+    parser.add_argument('--laboratorios', type=int, default=300)
+    parser.add_argument('--professores', type=int, default=5000)
+    parser.add_argument('--repeticoes', type=int, default=50)
+    args = parser.parse_args()
+
+    from src.repository.database import Database
+    from src.repository.relatorio_repository import RelatorioRepository
+    from src.service.relatorio_service import RelatorioService
+
+    with (postgres_efemero() if args.efemero else postgres_existente()) as servidor:
+        credenciais = criar_banco(servidor, 'relatorios_ocupacao')
+        conn = psycopg2.connect(dbname=credenciais['dbname'], user=credenciais['username'],
+                                password=credenciais['password'], host=credenciais['host'],
+                                port=credenciais['port'])
+        inicio_carga = date.today().replace(day=1) - timedelta(days=365 * 2)
+        carga = semear(conn, args.professores, args.laboratorios, args.agendamentos, inicio=inicio_carga)
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT max(data_agendamento) FROM agendamentos")
+            ultimo_dia = cursor.fetchone()[0]
+            cursor.execute("SELECT min(id), max(id) FROM laboratorios")
+            primeiro_lab, ultimo_lab = cursor.fetchone()
+            cursor.execute("SELECT min(id) FROM professores")
+            id_prof = cursor.fetchone()[0]
+            cursor.execute("SELECT criar_particao_agendamentos(%s)", (date.today() + timedelta(days=60),))
+        conn.commit()
+
+        # Períodos fechados antes do último mês gerado
+        inicio = (ultimo_dia.replace(day=1) - timedelta(days=95)).replace(day=1)
+        params = {
+            'inicio': inicio,
+            'fim_mes': (inicio + timedelta(days=32)).replace(day=1) - timedelta(days=1),
+            'fim_trimestre': (inicio + timedelta(days=95)).replace(day=1) - timedelta(days=1),
+        }
+        resultados = {'carga_s': {tabela: round(segundos, 2) for tabela, segundos in carga.items()}, 'direto': {}}
+        with conn.cursor() as cursor:
+            for nome, sql in DIRETO.items():
+                resultados['direto'][nome] = cronometrar(lambda _: (cursor.execute(sql, params), cursor.fetchall()),
+                                                         max(args.repeticoes // 10, 3))
+
+            rnd = random.Random(5)
+
+            def inserir(_):
+                hora_inicio, hora_fim = rnd.choice(HORARIOS)
+                cursor.execute("""
+                    INSERT INTO agendamentos (id_laboratorio, id_professor, data_agendamento, hora_inicio, hora_fim)
+                    VALUES (%s, %s, %s, %s, %s)
+                """, (rnd.randint(primeiro_lab, ultimo_lab), id_prof, date.today() + timedelta(days=60),
+                      hora_inicio, hora_fim))
+                conn.rollback()
+
+            resultados['insercao_com_agregados'] = cronometrar(inserir, args.repeticoes * 10)
+            cursor.execute("ALTER TABLE agendamentos DISABLE TRIGGER trg_agendamentos_ocupacao")
+            conn.commit()
+            resultados['insercao_sem_agregados'] = cronometrar(inserir, args.repeticoes * 10)
+            cursor.execute("ALTER TABLE agendamentos ENABLE TRIGGER trg_agendamentos_ocupacao")
+            conn.commit()
+        conn.close()
+
+        database = Database(credenciais['dbname'], credenciais['username'], credenciais['password'],
+                            credenciais['host'], credenciais['port'], maxconn=2)
+        servico = RelatorioService(RelatorioRepository(database))
+        texto = {nome: valor.isoformat() for nome, valor in params.items()}
+        resultados['agregados'] = {
+            'utilizacao_mes': cronometrar(lambda _: servico.utilizacao(texto['inicio'], texto['fim_mes']),
+                                          args.repeticoes),
+            'horarios_pico': cronometrar(lambda _: servico.horarios_pico(texto['inicio'], texto['fim_trimestre']),
+                                         args.repeticoes),
+            'top_professores': cronometrar(lambda _: servico.top_professores(texto['inicio'], texto['fim_trimestre']),
+                                           args.repeticoes),
+        }
+        database.close()
+
+    print(json.dumps(resultados, indent=2, ensure_ascii=False, default=str))
+    print('salvo em', salvar('relatorios', resultados))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Grava e compara resultados de benchmark entre commits.
+
+    python -m benchmarks.resultados antes.json depois.json --tolerancia 0.1
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+DIRETORIO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resultados')
+
+# Métricas em que valores maiores são piores
+MAIOR_PIOR = ('p50_ms', 'p95_ms', 'p99_ms', 'erros', 'media_ms')
+# Métricas em que valores menores são piores
+MENOR_PIOR = ('rps', 'ops_s')
+
+
+def commit_atual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'desconhecido'
+
+
+def salvar(nome, dados, diretorio=DIRETORIO):
+    os.makedirs(diretorio, exist_ok=True)
+    commit = commit_atual()
+    caminho = os.path.join(diretorio, f'{nome}-{commit}.json')
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        json.dump({
+            'commit': commit,
+            'data': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'maquina': platform.machine(),
+            'resultados': dados,
+        }, arquivo, indent=2, ensure_ascii=False)
+    return caminho
+
+
+def _folhas(dados, prefixo=''):
+    for chave, valor in dados.items():
+        caminho = f'{prefixo}{chave}'
+        if isinstance(valor, dict):
+            yield from _folhas(valor, caminho + '/')
+        elif isinstance(valor, (int, float)):
+            yield caminho, chave, valor
+
+
+def comparar(antes, depois, tolerancia):
+    valores_antes = {caminho: valor for caminho, _, valor in _folhas(antes['resultados'])}
+    regressoes = []
+    for caminho, metrica, novo in _folhas(depois['resultados']):
+        antigo = valores_antes.get(caminho)
+        if antigo is None or metrica not in MAIOR_PIOR + MENOR_PIOR:
+            continue
+        variacao = (novo - antigo) / antigo if antigo else 0.0
+        piorou = variacao > tolerancia if metrica in MAIOR_PIOR else variacao < -tolerancia
+        marca = 'REGRESSÃO' if piorou else ''
+        print(f'{caminho:<50} {antigo:>12} {novo:>12} {variacao:>+8.1%} {marca}')
+        if piorou:
+            regressoes.append(caminho)
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('antes')
+    parser.add_argument('depois')
+    parser.add_argument('--tolerancia', type=float, default=0.10)
+    args = parser.parse_args()
+    with open(args.antes, encoding='utf-8') as a, open(args.depois, encoding='utf-8') as b:
+        antes, depois = json.load(a), json.load(b)
+    print(f"{antes['commit']} -> {depois['commit']}")
+    regressoes = comparar(antes, depois, args.tolerancia)
+    return 1 if regressoes else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
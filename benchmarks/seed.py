@@ -0,0 +1,135 @@
+"""Gera volumes realistas de professores, laboratórios e agendamentos via COPY.
+
+    python -m benchmarks.seed --professores 5000 --laboratorios 300 --agendamentos 2000000
+
+Os agendamentos respeitam a restrição de sobreposição: cada laboratório tem, por
+dia, horários fixos de 1h separados por 15 minutos, e o gerador sorteia quais
+deles estão ocupados.
+"""
+import argparse
+import io
+import os
+import random
+import time
+from datetime import date, timedelta
+
+import bcrypt
+import psycopg2
+
+# Horários de 1h com 15 minutos de intervalo entre 07:00 e 22:00
+HORARIOS = []
+_minuto = 7 * 60
+while _minuto + 60 <= 22 * 60:
+    HORARIOS.append((f'{_minuto // 60:02d}:{_minuto % 60:02d}', f'{(_minuto + 60) // 60:02d}:{(_minuto + 60) % 60:02d}'))
+    _minuto += 75
+
+SENHA_PADRAO = 'senha123'
+
+
+class _LinhasCopy(io.RawIOBase):
+    """Adapta um gerador de linhas TSV para o `copy_expert` sem montar tudo em memória."""
+
+    def __init__(self, linhas):
+        self._linhas = linhas
+        self._resto = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while len(self._resto) < len(buffer):
+            try:
+                self._resto += next(self._linhas).encode('utf-8')
+            except StopIteration:
+                break
+        tamanho = min(len(buffer), len(self._resto))
+        buffer[:tamanho] = self._resto[:tamanho]
+        self._resto = self._resto[tamanho:]
+        return tamanho
+
+
+def copiar(cursor, tabela, colunas, linhas):
+    fluxo = io.BufferedReader(_LinhasCopy(linhas), buffer_size=1 << 20)
+    cursor.copy_expert(f"COPY {tabela} ({', '.join(colunas)}) FROM STDIN", fluxo)
+
+
+def criar_particoes(cursor, inicio, fim):
+    mes = inicio.replace(day=1)
+    while mes <= fim:
+        cursor.execute("SELECT criar_particao_agendamentos(%s)", (mes,))
+        mes = (mes + timedelta(days=32)).replace(day=1)
+
+
+def semear(conn, professores, laboratorios, agendamentos, inicio=None, semente=42, rounds=4):
+    rnd = random.Random(semente)
+    inicio = inicio or date.today() - timedelta(days=365 * 2)
+    # Um único hash reaproveitado: o custo aqui é o COPY, não o bcrypt
+    senha_hash = bcrypt.hashpw(SENHA_PADRAO.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+    tempos = {}
+
+    with conn.cursor() as cursor:
+        t = time.perf_counter()
+        copiar(cursor, 'professores', ('nome', 'email', 'senha_hash'),
+               (f'Professor {i}\tprofessor{i}@fecaf.com.br\t{senha_hash}\n' for i in range(1, professores + 1)))
+        tempos['professores'] = time.perf_counter() - t
+
+        t = time.perf_counter()
+        copiar(cursor, 'laboratorios', ('nome', 'capacidade'),
+               (f'Laboratório {i}\t{rnd.choice((20, 25, 30, 35, 40, 50))}\n' for i in range(1, laboratorios + 1)))
+        tempos['laboratorios'] = time.perf_counter() - t
+
+        cursor.execute("SELECT min(id), max(id) FROM professores")
+        primeiro_prof, ultimo_prof = cursor.fetchone()
+        cursor.execute("SELECT min(id), max(id) FROM laboratorios")
+        primeiro_lab, ultimo_lab = cursor.fetchone()
+        ocupacao = 0.6
+
+        def gerar():
+            # Percorre os dias preenchendo uma fração dos horários de cada laboratório
+            total = 0
+            dia = inicio
+            while total < agendamentos:
+                data = dia.isoformat()
+                for id_lab in range(primeiro_lab, ultimo_lab + 1):
+                    for hora_inicio, hora_fim in HORARIOS:
+                        if rnd.random() >= ocupacao:
+                            continue
+                        id_prof = rnd.randint(primeiro_prof, ultimo_prof)
+                        yield f'{id_lab}\t{id_prof}\t{data}\t{hora_inicio}\t{hora_fim}\n'
+                        total += 1
+                        if total >= agendamentos:
+                            return
+                dia += timedelta(days=1)
+
+        # Partições mensais para todo o período gerado (com folga de um mês)
+        por_dia = max(int((ultimo_lab - primeiro_lab + 1) * len(HORARIOS) * ocupacao), 1)
+        criar_particoes(cursor, inicio, inicio + timedelta(days=agendamentos // por_dia + 31))
+
+        t = time.perf_counter()
+        copiar(cursor, 'agendamentos', ('id_laboratorio', 'id_professor', 'data_agendamento', 'hora_inicio', 'hora_fim'),
+               gerar())
+        tempos['agendamentos'] = time.perf_counter() - t
+        cursor.execute("ANALYZE")
+    conn.commit()
+    return tempos
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--professores', type=int, default=5000)
+    parser.add_argument('--laboratorios', type=int, default=300)
+    parser.add_argument('--agendamentos', type=int, default=1000000)
+    parser.add_argument('--semente', type=int, default=42)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(dbname=os.getenv('DB_NAME', 'agendamentos'), user=os.getenv('DB_USER', 'postgres'),
+                            password=os.getenv('DB_PASSWORD', 'postgres'), host=os.getenv('DB_HOST', 'localhost'),
+                            port=int(os.getenv('DB_PORT', '5432')))
+    tempos = semear(conn, args.professores, args.laboratorios, args.agendamentos, semente=args.semente)
+    conn.close()
+    for tabela, segundos in tempos.items():
+        print(f'{tabela:<14} {segundos:8.2f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Compara o modo WSGI (main.py) e o modo ASGI (asgi.py) sob a mesma carga.
+
+Suba os dois servidores apontando para o mesmo banco, por exemplo:
+
+    gunicorn -w 4 --threads 8 -b :5000 main:app
+    uvicorn asgi:app --workers 4 --port 8000
+
+e rode:
+
+    python -m benchmarks.wsgi_vs_asgi --email prof@fecaf.com.br --senha 123 \\
+        --alvo wsgi=http://127.0.0.1:5000 --alvo asgi=http://127.0.0.1:8000 \\
+        --concorrencia 500 --requisicoes 5000
+"""
+import argparse
+import asyncio
+import json
+import urllib.request
+from urllib.parse import urlsplit
+
+from benchmarks.http_cliente import medir
+
+
+def login(base_url, email, senha):
+    req = urllib.request.Request(
+        base_url + '/login',
+        data=json.dumps({'email': email, 'senha': senha}).encode('utf-8'),
+        headers={'Content-Type': 'application/json'},
+        method='POST'
+    )
+    with urllib.request.urlopen(req) as resp:
+        return json.loads(resp.read())['access_token']
+
+
+async def carga(base_url, token, caminhos, concorrencia, total):
+    url = urlsplit(base_url)
+    requisicoes = [{'metodo': 'GET', 'caminho': caminhos[i % len(caminhos)], 'token': token, 'rota': 'total'}
+                   for i in range(total)]
+    resultado = await medir(url.hostname, url.port or 80, concorrencia, requisicoes)
+    return resultado['total']
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--alvo', action='append', required=True, help='nome=url_base')
+    parser.add_argument('--email', required=True)
+    parser.add_argument('--senha', required=True)
+    parser.add_argument('--concorrencia', type=int, default=200)
+    parser.add_argument('--requisicoes', type=int, default=2000)
+    parser.add_argument('--caminho', action='append',
+                        help='rotas GET exercitadas (padrão: listagem paginada e professores)')
+    args = parser.parse_args()
+    caminhos = args.caminho or ['/agendamentos?limit=50', '/professores']
+
+    resultados = {}
+    for alvo in args.alvo:
+        nome, base_url = alvo.split('=', 1)
+        token = login(base_url, args.email, args.senha)
+        resultados[nome] = asyncio.run(carga(base_url, token, caminhos, args.concorrencia, args.requisicoes))
+
+    colunas = ['requisicoes', 'erros', 'duracao_s', 'rps', 'p50_ms', 'p95_ms', 'p99_ms']
+    print(f"{'alvo':<8}" + ''.join(f"{c:>12}" for c in colunas))
+    for nome, r in resultados.items():
+        print(f"{nome:<8}" + ''.join(f"{r[c]:>12}" for c in colunas))
+    print(json.dumps(resultados, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Importação e exportação em massa de professores, laboratórios e agendamentos em CSV.
+
+    python cadastro_csv.py importar professores professores.csv --erros erros.csv
+    python cadastro_csv.py importar laboratorios laboratorios.csv
+    python cadastro_csv.py exportar agendamentos --de 2025-02-01 --ate 2025-06-30 --saida agendamentos.csv
+    python cadastro_csv.py exportar professores > professores.csv
+
+Planilhas de professores têm as colunas nome,email,senha; de laboratórios,
+nome,capacidade. Linhas com erro não interrompem a importação e são listadas
+no resumo (ou em --erros). Use "-" para ler da entrada padrão. Usa as mesmas
+variáveis de ambiente de credenciais da aplicação.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+
+from dotenv import load_dotenv
+
+from src.exceptions.custom_exception import CustomException
+from src.repository.database import Database
+from src.repository.importacao_repository import EXPORTAR, ImportacaoRepository
+from src.secret.credentials import credentials_provider_from_env
+from src.service.importacao_service import COLUNAS, ImportacaoService
+
+
+def _abrir(caminho, modo):
+    if caminho == '-':
+        return None
+    return open(caminho, modo, encoding='utf-8', newline='')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    importar = comandos.add_parser('importar', help='insere as linhas de um CSV')
+    importar.add_argument('tabela', choices=sorted(COLUNAS))
+    importar.add_argument('arquivo', help='CSV com cabeçalho ("-" para a entrada padrão)')
+    importar.add_argument('--erros', help='grava as linhas com erro neste CSV em vez de no resumo')
+    importar.add_argument('--lote', type=int, default=1000, help='linhas por COPY')
+    importar.add_argument('--processos', type=int, default=0, help='processos para o bcrypt (padrão: núcleos)')
+
+    exportar = comandos.add_parser('exportar', help='escreve a tabela em CSV')
+    exportar.add_argument('tabela', choices=sorted(EXPORTAR))
+    exportar.add_argument('--de', help='primeiro dia dos agendamentos (AAAA-MM-DD)')
+    exportar.add_argument('--ate', help='último dia dos agendamentos (AAAA-MM-DD)')
+    exportar.add_argument('--saida', default='-', help='arquivo de saída (padrão: saída padrão)')
+    args = parser.parse_args()
+
+    load_dotenv()
+    database = Database(credenciais=credentials_provider_from_env(), minconn=0, maxconn=2)
+    service = ImportacaoService(ImportacaoRepository(database),
+                                rounds=int(os.getenv('BCRYPT_ROUNDS', '12')),
+                                processos=getattr(args, 'processos', 0) or None,
+                                lote=getattr(args, 'lote', 1000))
+    try:
+        if args.comando == 'importar':
+            arquivo = _abrir(args.arquivo, 'r') or sys.stdin
+            with arquivo:
+                if args.tabela == 'professores':
+                    resumo = service.importar_professores(arquivo)
+                else:
+                    resumo = service.importar_laboratorios(arquivo)
+            if args.erros:
+                with open(args.erros, 'w', encoding='utf-8', newline='') as saida:
+                    escritor = csv.DictWriter(saida, fieldnames=('linha', 'erro'), lineterminator='\n')
+                    escritor.writeheader()
+                    escritor.writerows(resumo['erros'])
+                resumo['erros'] = len(resumo['erros'])
+            print(json.dumps(resumo, indent=2, ensure_ascii=False))
+        else:
+            saida = _abrir(args.saida, 'w') or sys.stdout
+            try:
+                linhas = service.exportar(args.tabela, saida, args.de, args.ate)
+            finally:
+                if saida is not sys.stdout:
+                    saida.close()
+            # O resumo vai para stderr: a saída padrão pode ser o próprio CSV
+            print(json.dumps({'tabela': args.tabela, 'linhas': linhas}, ensure_ascii=False), file=sys.stderr)
+    except CustomException as e:
+        parser.exit(2, f"erro: {e.message}\n")
+    finally:
+        database.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,70 +1,283 @@
-from flask import Flask, request, jsonify
-from flask_jwt_extended import JWTManager, jwt_required, get_jwt_identity, create_access_token, create_refresh_token
-from flask_cors import CORS
+import hashlib
+import hmac
+import math
 import os
+import threading
+import time
+from functools import wraps
+from itertools import chain
+
+from flask import Blueprint, Flask, Response, current_app, g, request, jsonify
+from flask_jwt_extended import JWTManager, jwt_required, get_jwt_identity, create_access_token, create_refresh_token, verify_jwt_in_request
+from flask_cors import CORS
 from dotenv import load_dotenv
-from src.secret.get_rds_credentials import get_secret
+from werkzeug.local import LocalProxy
+from werkzeug.middleware.proxy_fix import ProxyFix
+from src.secret.credentials import credentials_provider_from_env
 from src.models.professor_model import Professor
 from src.repository.database import Database
 from src.repository.professor_repository import ProfessorRepository
+from src.repository.laboratorio_repository import LaboratorioRepository
+from src.repository.versao_repository import VersaoRepository
+from src.repository.particao_repository import MESES_A_FRENTE, ParticaoRepository
+from src.repository.relatorio_repository import RelatorioRepository
+from src.repository.tarefa_repository import TarefaRepository
+from src.cache.cache import TTLCache, RedisCache
+from src.cache.respostas import RespostaCache
+from src.cache.idempotencia import ArmazemIdempotencia, impressao_digital
 from src.service.professor_service import ProfessorService
 from src.repository.agendamento_repository import AgendamentoRepository
 from src.service.agendamento_service import AgendamentoService
+from src.service.relatorio_service import COLUNAS as COLUNAS_RELATORIO, RelatorioService
+from src.service.disponibilidade_index import DisponibilidadeIndex
+from src.service.eventos import SSE_HEARTBEAT, DistribuidorEventos, mensagem_sse
+from src.repository.ouvinte_notificacoes import OuvinteNotificacoes
 from src.exceptions.custom_exception import ErrorType, CustomException
 from src.auth.auth import authenticate_professor
+from src.auth.senha_hasher import SenhaHasher
+from src.auth.limitador import BaldesMemoria, BaldesRedis, LimitadorLogin
+from src.models.agendamento_model import Agendamento
+from src.utils.utils import ids_da_consulta, json_dumps, stream_csv, stream_json_array
+from src.utils.compressao import comprimir_stream, escolher_codificacao
+from src.metrics.metrics import Metrics, RepositorioInstrumentado
  
 load_dotenv()
 
-app = Flask(__name__)
-
-# Hbilitando CORS, para consumo no front end
-CORS(app, resources={r"/*": {"origins": "*"}})
-
-# Configurações do JWT
-app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY')
-jwt = JWTManager(app)
+api = Blueprint('api', __name__)
+jwt = JWTManager()
 
 @jwt.unauthorized_loader
 def unauthorized_callback(callback):
-    app.logger.error(f"Erro JWT: Nenhuma autorização fornecida.")
+    current_app.logger.error(f"Erro JWT: Nenhuma autorização fornecida.")
     return jsonify({'message': 'Token de acesso não fornecido no cabeçalho Authorization.'}), 401
 
 @jwt.invalid_token_loader
 def invalid_token_callback(callback):
-    app.logger.error(f"Erro JWT: Token inválido. Descrição: {callback}")
+    current_app.logger.error(f"Erro JWT: Token inválido. Descrição: {callback}")
     return jsonify({'message': f'Token inválido: {callback}'}), 401
 
 @jwt.expired_token_loader
 def expired_token_callback(jwt_header, jwt_payload):
-    app.logger.error(f"Erro JWT: Token expirado. Payload: {jwt_payload}")
+    current_app.logger.error(f"Erro JWT: Token expirado. Payload: {jwt_payload}")
     return jsonify({'message': 'Token de acesso expirado.'}), 401
 
 def handle_jwt_errors(error):
-    app.logger.error(f"Erro JWT Capturado: {type(error).__name__} - {str(error)}")
+    current_app.logger.error(f"Erro JWT Capturado: {type(error).__name__} - {str(error)}")
     # Retorna o erro 401 para qualquer falha de autenticação JWT
     return jsonify({'message': 'Falha na autenticação do Token', 'details': str(error)}), 401
 
 
-# Configurações do banco de dados
-db_host = os.getenv('DB_HOST')
-db_name = os.getenv('DB_NAME')
+def _enderecos(texto):
+    enderecos = []
+    for item in filter(None, (parte.strip() for parte in texto.split(','))):
+        host, _, porta = item.partition(':')
+        enderecos.append((host, int(porta or 5432)))
+    return enderecos
+
+
+def criar_servicos():
+    """Monta banco, cache e serviços sem fazer nenhuma chamada de rede.
+
+    As credenciais só são buscadas quando o pool abre a primeira conexão.
+    """
+    metrics = Metrics()
+
+    # Cache de leitura para professores e laboratórios
+    cache_ttl = float(os.getenv('CACHE_TTL', '60'))
+    cache_ttl_negativo = float(os.getenv('CACHE_TTL_NEGATIVO', '5'))
+    # Resultados de POSTs com Idempotency-Key (no mesmo backend do cache de leitura)
+    idempotencia_ttl = float(os.getenv('IDEMPOTENCIA_TTL', '86400'))
+    if os.getenv('CACHE_BACKEND', 'memory') == 'redis':
+        import redis
+        cliente_redis = redis.Redis.from_url(os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+        cache = RedisCache(cliente_redis, ttl=cache_ttl, ttl_negativo=cache_ttl_negativo)
+        armazem_idempotencia = RedisCache(cliente_redis, prefixo='idempotencia:', ttl=idempotencia_ttl)
+        # Limites de login compartilhados por todos os processos
+        baldes_login = BaldesRedis(cliente_redis)
+    else:
+        cache = TTLCache(max_itens=int(os.getenv('CACHE_MAX_ITENS', '1024')),
+                         ttl=cache_ttl, ttl_negativo=cache_ttl_negativo)
+        armazem_idempotencia = TTLCache(max_itens=int(os.getenv('IDEMPOTENCIA_MAX_ITENS', '10000')),
+                                        ttl=idempotencia_ttl)
+        baldes_login = BaldesMemoria(max_chaves=int(os.getenv('LOGIN_LIMITE_MAX_CHAVES', '100000')))
+    idempotencia = ArmazemIdempotencia(armazem_idempotencia, ttl=idempotencia_ttl,
+                                       espera=float(os.getenv('IDEMPOTENCIA_ESPERA', '30')))
+
+    # SLOW_QUERY_MS habilita o log de consultas lentas (parâmetros não são registrados)
+    database = Database(
+        credenciais=credentials_provider_from_env(),
+        metrics=metrics,
+        slow_query_ms=float(os.getenv('SLOW_QUERY_MS', '0')) or None,
+        minconn=int(os.getenv('DB_POOL_MIN', '1')),
+        maxconn=int(os.getenv('DB_POOL_MAX', '10')),
+        timeout=float(os.getenv('DB_POOL_TIMEOUT', '30')),
+        max_uses=int(os.getenv('DB_POOL_MAX_USES', '1000')),
+        max_age=float(os.getenv('DB_POOL_MAX_AGE', '3600')),
+        # DB_REPLICAS=host1:5432,host2:5432 liga a leitura em réplicas
+        replicas=_enderecos(os.getenv('DB_REPLICAS', '')),
+        max_atraso=float(os.getenv('DB_REPLICA_MAX_LAG', '5')),
+        janela_escrita=float(os.getenv('DB_READ_YOUR_WRITES', '5')),
+        escritas_recentes=cache
+    )
+
+    senha_hasher = SenhaHasher(
+        rounds=int(os.getenv('BCRYPT_ROUNDS', '12')),
+        workers=int(os.getenv('BCRYPT_WORKERS', '0')) or None,
+        max_pendentes=int(os.getenv('BCRYPT_MAX_PENDENTES', '0')) or None,
+        metrics=metrics
+    )
+
+    metrics.gauge_callback('cache', 'Estado do cache de leitura', cache.stats)
+
+    # Corpos já comprimidos das listagens, indexados pela versão da tabela
+    respostas = RespostaCache(max_itens=int(os.getenv('RESPOSTA_CACHE_MAX_ITENS', '256')),
+                              max_bytes_item=int(os.getenv('RESPOSTA_CACHE_MAX_BYTES', str(1024 * 1024))))
+    metrics.gauge_callback('respostas_cache', 'Estado do cache de respostas comprimidas', respostas.stats)
+
+    versoes = RepositorioInstrumentado(VersaoRepository(database), metrics)
+    professor_repository = RepositorioInstrumentado(ProfessorRepository(database, cache), metrics)
+    laboratorio_repository = RepositorioInstrumentado(LaboratorioRepository(database, cache), metrics)
+    particoes = ParticaoRepository(database, versoes)
+    agendamento_repository = RepositorioInstrumentado(AgendamentoRepository(database, particoes), metrics)
+
+    # Eventos em tempo real: uma conexão LISTEN compartilhada por todos os clientes SSE
+    eventos = DistribuidorEventos(max_assinantes=int(os.getenv('SSE_MAX_ASSINANTES', '1000')),
+                                  max_pendentes=int(os.getenv('SSE_MAX_PENDENTES', '100')),
+                                  metrics=metrics)
+    # O índice de disponibilidade também recebe as escritas dos outros processos pelo LISTEN;
+    # cada dia consultado é relido do banco depois de DISPONIBILIDADE_VALIDADE segundos
+    disponibilidade = DisponibilidadeIndex(validade=float(os.getenv('DISPONIBILIDADE_VALIDADE', '60')))
+    eventos.observar(disponibilidade.aplicar_evento)
+
+    return {
+        'metrics': metrics,
+        'database': database,
+        'cache': cache,
+        'versoes': versoes,
+        'respostas': respostas,
+        'particoes': particoes,
+        # Fila de tarefas gravada com os agendamentos; executada pelo worker.py
+        'tarefas': TarefaRepository(database),
+        'idempotencia': idempotencia,
+        # Tentativas de login por IP e por e-mail; LOGIN_LIMITE_*=0 desliga o limite
+        'limitador_login': LimitadorLogin(
+            baldes_login,
+            por_ip=(int(os.getenv('LOGIN_LIMITE_IP', '20')), float(os.getenv('LOGIN_JANELA_IP', '60'))),
+            por_email=(int(os.getenv('LOGIN_LIMITE_EMAIL', '5')), float(os.getenv('LOGIN_JANELA_EMAIL', '300'))),
+            metrics=metrics
+        ),
+        'professor_service': ProfessorService(professor_repository, senha_hasher),
+        'laboratorio_repository': laboratorio_repository,
+        'agendamento_service': AgendamentoService(agendamento_repository, disponibilidade,
+                                                  professor_repository, laboratorio_repository),
+        'relatorio_service': RelatorioService(RepositorioInstrumentado(RelatorioRepository(database), metrics)),
+        'eventos': eventos,
+        'ouvinte': OuvinteNotificacoes(database, eventos),
+    }
+
+
+def create_app(servicos=None):
+    app = Flask(__name__)
+
+    # Hbilitando CORS, para consumo no front end
+    CORS(app, resources={r"/*": {"origins": "*"}})
+
+    # Configurações do JWT
+    app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY')
+    jwt.init_app(app)
+
+    # Atrás de um proxy reverso, PROXY_X_FOR=<número de proxies> faz o remote_addr (usado
+    # no limite de login por IP) vir do X-Forwarded-For
+    proxies = int(os.getenv('PROXY_X_FOR', '0'))
+    if proxies:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies)
+
+    app.extensions['agendamentos'] = servicos if servicos is not None else criar_servicos()
+    app.register_blueprint(api)
+    return app
+
 
-# Conexão com o banco de dados
-db_password_user = get_secret()
+def _servico(nome):
+    return LocalProxy(lambda: current_app.extensions['agendamentos'][nome])
 
-db_name = db_password_user['dbname']
-user = db_password_user['username']
-password = db_password_user['password']
-db_host = db_password_user['host']
-port = db_password_user['port']
+metrics = _servico('metrics')
+database = _servico('database')
+cache = _servico('cache')
+versoes = _servico('versoes')
+respostas = _servico('respostas')
+particoes = _servico('particoes')
+tarefas = _servico('tarefas')
+idempotencia = _servico('idempotencia')
+limitador_login = _servico('limitador_login')
+professor_service = _servico('professor_service')
+laboratorio_repository = _servico('laboratorio_repository')
+agendamento_service = _servico('agendamento_service')
+relatorio_service = _servico('relatorio_service')
 
-database = Database(db_name, user, password, db_host)
+@api.before_app_request
+def iniciar_cronometro():
+    g.inicio_requisicao = time.perf_counter()
 
-professor_service = ProfessorService(ProfessorRepository(database))
-agendamento_repository = AgendamentoRepository(database)
-agendamento_service = AgendamentoService(agendamento_repository)
+@api.before_app_request
+def definir_sessao_banco():
+    # A sessão (professor do token) decide a janela de leitura no primário após escritas
+    try:
+        verify_jwt_in_request(optional=True)
+        sessao = get_jwt_identity()
+    except Exception:
+        sessao = None
+    database.sessao.set(sessao)
+    database.replica_fixa.set(None)
+
+@api.after_app_request
+def registrar_escrita_sessao(response):
+    if request.method in ('POST', 'PUT', 'PATCH', 'DELETE') and response.status_code < 400:
+        database.registrar_escrita()
+    return response
+
+@api.after_app_request
+def registrar_metricas(response):
+    inicio = g.pop('inicio_requisicao', None)
+    if inicio is not None:
+        rota = request.url_rule.rule if request.url_rule is not None else 'desconhecida'
+        metrics.histogram('http_request_duration_seconds', 'Latência das requisições HTTP').observe(
+            time.perf_counter() - inicio, route=rota, method=request.method)
+        metrics.counter('http_requests_total', 'Requisições HTTP por status').inc(
+            route=rota, method=request.method, status=response.status_code)
+    return response
 
-@app.errorhandler(CustomException)
+_lock_aquecimento = threading.Lock()
+
+def _aquecer_disponibilidade(app, servico, particoes, ouvinte):
+    # Partições dos próximos meses antes que alguma escrita precise criá-las sob demanda
+    try:
+        particoes.garantir(int(os.getenv('AGENDAMENTOS_MESES_A_FRENTE', str(MESES_A_FRENTE))))
+    except Exception as e:
+        app.logger.error(f"Falha ao criar as partições de agendamentos: {e}")
+    try:
+        # Ouvindo antes da leitura, nenhuma escrita feita entre a leitura e o LISTEN se perde
+        ouvinte.iniciar()
+        servico.aquecer_disponibilidade()
+    except Exception as e:
+        app.logger.error(f"Falha ao aquecer o índice de disponibilidade: {e}")
+
+@api.before_app_request
+def iniciar_aquecimento():
+    # O índice é carregado em segundo plano na primeira requisição, não na importação
+    servicos = current_app.extensions['agendamentos']
+    if 'aquecimento' in servicos:
+        return
+    with _lock_aquecimento:
+        if 'aquecimento' in servicos:
+            return
+        thread = threading.Thread(target=_aquecer_disponibilidade,
+                                  args=(current_app._get_current_object(), servicos['agendamento_service'],
+                                        servicos['particoes'], servicos['ouvinte']),
+                                  name='aquecimento-disponibilidade', daemon=True)
+        servicos['aquecimento'] = thread
+        thread.start()
+
+@api.app_errorhandler(CustomException)
 def handle_custom_exception(error):
     response = jsonify({
         'message': error.message,
@@ -73,8 +286,100 @@ def handle_custom_exception(error):
     response.status_code = error.http_status_code()
     return response
 
+def idempotente(funcao):
+    """Honra o cabeçalho Idempotency-Key em um POST.
+
+    A primeira requisição com a chave executa e seu resultado (inclusive erros
+    4xx) é guardado; reenvios recebem a mesma resposta, com
+    `Idempotent-Replayed: true`, sem executar a rota de novo. A chave vale por
+    usuário e rota, e reutilizá-la com outro corpo é recusado.
+    """
+    @wraps(funcao)
+    def envolvida(*args, **kwargs):
+        chave = request.headers.get('Idempotency-Key')
+        if not chave:
+            return funcao(*args, **kwargs)
+        usuario = database.sessao.get()
+
+        def executar():
+            try:
+                rv = funcao(*args, **kwargs)
+            except CustomException as e:
+                rv = handle_custom_exception(e)
+            resposta = current_app.make_response(rv)
+            return resposta.status_code, resposta.get_data(), resposta.mimetype
+
+        status, corpo, mimetype, repetida = idempotencia.executar(
+            f'{request.path}:{usuario}:{chave}',
+            impressao_digital(request.method, request.path, usuario, request.get_data()),
+            executar
+        )
+        resposta = Response(corpo, status=status, mimetype=mimetype)
+        if repetida:
+            resposta.headers['Idempotent-Replayed'] = 'true'
+        return resposta
+    return envolvida
+
+def operacional(funcao):
+    """Restringe as rotas de métricas e estatísticas.
+
+    Aceita um access token JWT ou, para coletores como o Prometheus, o valor
+    de `OPERACAO_TOKEN` em `Authorization: Bearer`.
+    """
+    @wraps(funcao)
+    def envolvida(*args, **kwargs):
+        token = os.getenv('OPERACAO_TOKEN')
+        if token and hmac.compare_digest(request.headers.get('Authorization', '').encode('utf-8'),
+                                         f'Bearer {token}'.encode('utf-8')):
+            return funcao(*args, **kwargs)
+        verify_jwt_in_request()
+        return funcao(*args, **kwargs)
+    return envolvida
+
+def resposta_condicional(rota, filtros, tabela, gerar_corpo, mimetype='application/json'):
+    """Resposta de listagem com ETag/Last-Modified derivados da versão da tabela.
+
+    `tabela` também pode ser uma tupla, quando o corpo depende de várias tabelas.
+
+    Responde 304 sem ler nenhuma linha quando o cliente já tem a versão atual;
+    caso contrário reaproveita o corpo comprimido em cache ou chama
+    `gerar_corpo()` (pedaços de texto) e comprime em streaming.
+    """
+    # A versão é lida antes dos dados: no pior caso o corpo é mais novo que a versão. `gerar_corpo`
+    # não deve ler do cache por leitura (que pode ser mais velho que a versão); o corpo já fica
+    # guardado em `respostas`, sob a chave da versão
+    lidas = [versoes.atual(nome) for nome in ((tabela,) if isinstance(tabela, str) else tabela)]
+    versao = '.'.join(str(versao_tabela) for versao_tabela, _ in lidas)
+    modificado_em = max(modificado for _, modificado in lidas)
+    etag = hashlib.sha1(RespostaCache.chave(rota, filtros, versao, '').encode('utf-8')).hexdigest()[:32]
+
+    if request.if_none_match:
+        nao_modificado = request.if_none_match.contains_weak(etag)
+    else:
+        nao_modificado = request.if_modified_since is not None and modificado_em <= request.if_modified_since
+
+    if nao_modificado:
+        response = Response(status=304)
+    else:
+        codificacao = escolher_codificacao(request.headers.get('Accept-Encoding'))
+        chave = RespostaCache.chave(rota, filtros, versao, codificacao)
+        corpo = respostas.get(chave)
+        if corpo is None:
+            corpo = respostas.armazenar_stream(chave, comprimir_stream(gerar_corpo(), codificacao))
+        response = Response(corpo, mimetype=mimetype)
+        if codificacao != 'identity':
+            response.headers['Content-Encoding'] = codificacao
+
+    # ETag fraca: o mesmo conteúdo pode ir em codificações diferentes
+    response.set_etag(etag, weak=True)
+    response.last_modified = modificado_em
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.update(('Accept-Encoding', 'Authorization'))
+    return response
+
 # CREATE
-@app.route('/professores', methods=['POST'])
+@api.route('/professores', methods=['POST'])
+@idempotente
 def create_professor():
     data = request.json
     nome = data['nome']
@@ -86,7 +391,7 @@ def create_professor():
     return jsonify({'message': 'Professor criado com sucesso!', 'id': professor_id})
 
 # UPDATE
-@app.route('/professores/<int:id>', methods=['PUT'])
+@api.route('/professores/<int:id>', methods=['PUT'])
 def update_professor(id):
     data = request.json
     nome = data['nome']
@@ -98,30 +403,50 @@ def update_professor(id):
     return jsonify({'message': 'Professor atualizado com sucesso!'})
 
 # READ
-@app.route('/professores', methods=['GET'])
+@api.route('/professores', methods=['GET'])
 def get_professores():
-    professores = professor_service.listar_professores()
-    return jsonify([vars(professor) for professor in professores])
+    # ?ids=1,2,3: só os professores pedidos, em uma consulta
+    if request.args.get('ids') is not None:
+        return jsonify(professor_service.buscar_professores(ids_da_consulta(request.args['ids'])))
+
+    render = request.args.get('render')
+
+    def gerar_corpo():
+        # render=db: o PostgreSQL monta o JSON e o texto é repassado sem criar objetos por linha
+        if render == 'db':
+            return [professor_service.listar_professores_json()]
+        return [json_dumps([professor.to_dict() for professor in professor_service.listar_professores(primario=True)])]
+
+    return resposta_condicional('/professores', {'render': render}, 'professores', gerar_corpo)
 
 # READ BY ID
-@app.route('/professores/<int:id>', methods=['GET'])
+@api.route('/professores/<int:id>', methods=['GET'])
 def get_id_professor(id):
     professor = professor_service.busca_professor_id(id)
     return jsonify(professor)
 
 # DELETE
-@app.route('/professores/<int:id>', methods=['DELETE'])
+@api.route('/professores/<int:id>', methods=['DELETE'])
 def delete_professor(id):
     professor_service.deletar_professor(id)
     return jsonify({'message': 'Professor deletado com sucesso!'})
 
 # Rota de login
-@app.route('/login', methods=['POST'])
+@api.route('/login', methods=['POST'])
 def login_professor():
     data = request.json
     email = data['email']
     senha = data['senha']
 
+    # Acima do limite, recusa sem consultar o banco nem gastar bcrypt
+    espera = limitador_login.tentar(email, request.remote_addr)
+    if espera:
+        response = jsonify({'message': 'Muitas tentativas de login, tente novamente mais tarde',
+                            'type': 'TOO_MANY_REQUESTS'})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(math.ceil(espera))
+        return response
+
     tokens = authenticate_professor(professor_service, email, senha)
 
     if tokens is None:
@@ -133,7 +458,7 @@ def login_professor():
         return jsonify({'access_token': access_token, 'refresh_token': refresh_token}), 200
 
 # Rota de refresh token
-@app.route('/refresh', methods=['POST'])
+@api.route('/refresh', methods=['POST'])
 @jwt_required(refresh=True)
 def refresh():
     current_user = get_jwt_identity()
@@ -142,83 +467,175 @@ def refresh():
 
 
 # Rotas de agendamento
-@app.route('/agendamentos', methods=['POST'])
+@api.route('/agendamentos', methods=['POST'])
 @jwt_required()
+@idempotente
 def create_agendamento():
     if not request.is_json:
-            app.logger.error("Requisição negada: Content-Type não é application/json")
+            current_app.logger.error("Requisição negada: Content-Type não é application/json")
             return jsonify({'message': 'Content-Type deve ser application/json'}), 415 
     try:
-        print("--- DEBUG: Rota Agendamentos Acessada ---")
-        app.logger.info(f"--- DEBUG: Rota Agendamentos Acessada ---")
         current_user = get_jwt_identity()
         
         data = request.json
-        app.logger.info(f"Payload Recebido no POST /agendamentos: {data}")
-        print(request.json)
         id_laboratorio = data.get('id_laboratorio')
         id_professor = current_user
         data_agendamento = data.get('data')
         hora_inicio = data.get('hora_inicio')
         hora_fim = data.get('hora_fim')
 
-        agendamento_id = agendamento_service.create_agendamento(id_laboratorio, id_professor, data_agendamento, hora_inicio, hora_fim)
+        # "auto_laboratorio": true escolhe o laboratório livre mais justo para min_capacidade
+        if data.get('auto_laboratorio') and not id_laboratorio:
+            agendamento_id = agendamento_service.create_agendamento_automatico(
+                id_professor, data_agendamento, hora_inicio, hora_fim, data.get('min_capacidade'))
+        else:
+            agendamento_id = agendamento_service.create_agendamento(id_laboratorio, id_professor, data_agendamento, hora_inicio, hora_fim)
 
         return jsonify(agendamento_id), 201
 
 
     except CustomException as e:
-        app.logger.error(f"Erro CustomException: {e.message} ({e.error_type.name})")
+        current_app.logger.error(f"Erro CustomException: {e.message} ({e.error_type.name})")
         return jsonify({'message': e.message, 'type': e.error_type.name}), 400
     except Exception as e:
-        app.logger.error(f"Erro interno não tratado: {e}")
+        current_app.logger.error(f"Erro interno não tratado: {e}")
         return jsonify({'message': 'Erro interno do servidor', 'type': 'INTERNAL_ERROR'}), 500
 
 
-@app.route('/agendamentos', methods=['GET'])
+@api.route('/agendamentos/lote', methods=['POST'])
+@jwt_required()
+def create_agendamentos_lote():
+    """Cria vários agendamentos de uma vez.
+
+    Aceita {"itens": [{id_laboratorio, data, hora_inicio, hora_fim}, ...]} ou uma
+    recorrência semanal {"recorrencia": {id_laboratorio, dia_semana, hora_inicio,
+    hora_fim, data_inicio, data_fim}}.
+    """
+    if not request.is_json:
+        return jsonify({'message': 'Content-Type deve ser application/json'}), 415
+    data = request.json
+    if not isinstance(data, dict):
+        raise CustomException(ErrorType.INVALID_OPERATION, "The body must be a JSON object")
+    if data.get('recorrencia') is not None:
+        itens = agendamento_service.expandir_recorrencia(data['recorrencia'])
+    else:
+        itens = data.get('itens')
+        if itens is not None and not isinstance(itens, list):
+            raise CustomException(ErrorType.INVALID_OPERATION, "itens must be a list")
+
+    resultado = agendamento_service.create_agendamentos_em_lote(get_jwt_identity(), itens)
+    return jsonify(resultado), 201 if resultado['criados'] else 200
+
+
+@api.route('/agendamentos', methods=['GET'])
 @jwt_required()
 def get_all_agendamentos():
+    """Lista agendamentos com filtros opcionais, em streaming.
+
+    Filtros: id_professor, id_laboratorio, data_inicio, data_fim (YYYY-MM-DD) e
+    mine=true (professor do token). Paginação por chave: after_id e limit; a
+    próxima página começa após o id do último item recebido. Com render=db cada
+    item já vem serializado pelo PostgreSQL. include=professor,laboratorio embute
+    as entidades relacionadas (uma consulta por relação, não por linha; ignora
+    render=db). Suporta If-None-Match/If-Modified-Since.
+    """
     try:
-        agendamentos = agendamento_service.get_all_agendamentos()
-        
-        agendamentos_dict = []
-        for a in agendamentos:
-            agendamentos_dict.append({
-                'id': a.id,
-                'id_laboratorio': a.id_laboratorio,
-                'id_professor': a.id_professor,
-                'data_agendamento': a.data_agendamento,
-                'hora_inicio': a.hora_inicio.strftime('%H:%M:%S') if hasattr(a.hora_inicio, 'strftime') else str(a.hora_inicio),
-                'hora_fim': a.hora_fim.strftime('%H:%M:%S') if hasattr(a.hora_fim, 'strftime') else str(a.hora_fim)
-            })
-            
-        return jsonify(agendamentos_dict)
+        id_professor = request.args.get('id_professor')
+        if request.args.get('mine', '').lower() == 'true':
+            id_professor = get_jwt_identity()
+
+        filtros = {
+            'id_professor': id_professor,
+            'id_laboratorio': request.args.get('id_laboratorio'),
+            'data_inicio': request.args.get('data_inicio'),
+            'data_fim': request.args.get('data_fim'),
+            'after_id': request.args.get('after_id'),
+            'limit': request.args.get('limit'),
+            'render': request.args.get('render'),
+            'include': request.args.get('include')
+        }
+        include = agendamento_service.validar_include(filtros['include'])
+        # Com include, o corpo também muda quando um professor ou laboratório muda
+        tabelas = ('agendamentos',) + tuple(agendamento_service.INCLUDES[relacao] for relacao in include)
+
+        def gerar_corpo():
+            consulta = {nome: valor for nome, valor in filtros.items() if nome not in ('render', 'include')}
+            if include:
+                agendamentos = agendamento_service.listar_agendamentos_expandidos(filtros['include'], primario=True,
+                                                                                  **consulta)
+                serializar = dict
+            elif filtros['render'] == 'db':
+                agendamentos = agendamento_service.listar_agendamentos_json(**consulta)
+                serializar = None
+            else:
+                agendamentos = agendamento_service.listar_agendamentos(**consulta)
+                serializar = Agendamento.to_dict
+
+            # Busca o primeiro item antes de responder, para que erros de banco virem status HTTP
+            primeiro = next(agendamentos, None)
+            itens = agendamentos if primeiro is None else chain([primeiro], agendamentos)
+            return stream_json_array(itens, serializar)
+
+        return resposta_condicional('/agendamentos', filtros, tabelas, gerar_corpo)
         
     except CustomException as e:
-        app.logger.error(f"Erro CustomException no GET /agendamentos: {e.message}")
+        current_app.logger.error(f"Erro CustomException no GET /agendamentos: {e.message}")
         return jsonify({'message': e.message, 'type': e.error_type.name}), e.http_status_code()
     
     except Exception as e:
         import traceback
-        app.logger.error(f"Erro INESPERADO no GET /agendamentos: {e}")
-        app.logger.error(traceback.format_exc())
+        current_app.logger.error(f"Erro INESPERADO no GET /agendamentos: {e}")
+        current_app.logger.error(traceback.format_exc())
         return jsonify({'message': 'Erro interno ao listar agendamentos', 'type': 'INTERNAL_SERVER_ERROR'}), 500
 
-@app.route('/agendamentos/<int:agendamento_id>', methods=['GET'])
+@api.route('/agendamentos/changes', methods=['GET'])
+@jwt_required()
+def get_mudancas_agendamentos():
+    return jsonify(agendamento_service.listar_mudancas(request.args.get('since'), request.args.get('limit')))
+
+@api.route('/agendamentos/stream', methods=['GET'])
+@jwt_required()
+def stream_agendamentos():
+    """Server-Sent Events com as mudanças de agendamentos.
+
+    Filtros opcionais: id_laboratorio e data (YYYY-MM-DD). Um cliente que não
+    consome os eventos a tempo recebe `event: overflow` e é desconectado; ao
+    reconectar deve recarregar a listagem.
+    """
+    id_laboratorio, data = agendamento_service.filtros_eventos(request.args.get('id_laboratorio'),
+                                                               request.args.get('data'))
+
+    # Objetos reais: o gerador roda depois que o contexto da requisição termina
+    servicos = current_app.extensions['agendamentos']
+    distribuidor = servicos['eventos']
+    servicos['ouvinte'].iniciar()
+    assinatura = distribuidor.assinar(id_laboratorio, data)
+
+    def gerar():
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                eventos = assinatura.aguardar(SSE_HEARTBEAT)
+                for evento in eventos:
+                    yield mensagem_sse(evento)
+                if assinatura.encerrada:
+                    yield 'event: overflow\ndata: {}\n\n'
+                    return
+                if not eventos:
+                    # Comentário SSE: mantém a conexão viva e detecta clientes que saíram
+                    yield ': keepalive\n\n'
+        finally:
+            distribuidor.cancelar(assinatura)
+
+    return Response(gerar(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@api.route('/agendamentos/<int:agendamento_id>', methods=['GET'])
 @jwt_required()
 def get_agendamento_by_id(agendamento_id):
-    agendamento = agendamento_service.get_agendamento_by_id(agendamento_id)
-    agendamento_dict = {
-        'id': agendamento.id,
-        'id_laboratorio': agendamento.id_laboratorio,
-        'id_professor': agendamento.id_professor,
-        'data_agendamento': agendamento.data_agendamento,
-        'hora_inicio': agendamento.hora_inicio.strftime('%H:%M:%S'), 
-        'hora_fim': agendamento.hora_fim.strftime('%H:%M:%S') 
-    }
-    return jsonify(agendamento_dict)
+    return jsonify(agendamento_service.get_agendamento_expandido(agendamento_id, request.args.get('include')))
 
-@app.route('/agendamentos/<int:agendamento_id>', methods=['PUT'])
+@api.route('/agendamentos/<int:agendamento_id>', methods=['PUT'])
 @jwt_required()
 def update_agendamento(agendamento_id):
     current_user = get_jwt_identity()
@@ -231,11 +648,132 @@ def update_agendamento(agendamento_id):
     agendamento_service.update_agendamento(agendamento_id, id_laboratorio, id_professor, data_agendamento, hora_inicio, hora_fim)
     return jsonify({'message': 'Agendamento atualizado com sucesso'})
 
-@app.route('/agendamentos/<int:agendamento_id>', methods=['DELETE'])
+@api.route('/agendamentos/<int:agendamento_id>', methods=['DELETE'])
 @jwt_required()
 def delete_agendamento(agendamento_id):
     agendamento_service.delete_agendamento(agendamento_id)
     return jsonify({'message': 'Agendamento deletado com sucesso'})
 
+# Rotas de laboratório
+@api.route('/laboratorios', methods=['GET'])
+def get_laboratorios():
+    # ?ids=1,2,3: só os laboratórios pedidos, em uma consulta
+    if request.args.get('ids') is not None:
+        ids = ids_da_consulta(request.args['ids'])
+        laboratorios = laboratorio_repository.get_by_ids(ids)
+        return jsonify([laboratorios[id].to_dict() for id in ids if id in laboratorios])
+    return jsonify([laboratorio.to_dict() for laboratorio in laboratorio_repository.get_all()])
+
+@api.route('/laboratorios/livres', methods=['GET'])
+@jwt_required()
+def get_laboratorios_livres():
+    # ?data=AAAA-MM-DD&hora_inicio=HH:MM[&hora_fim=HH:MM][&min_capacidade=N][&limit=N]
+    laboratorios = agendamento_service.laboratorios_livres(
+        request.args.get('data'), request.args.get('hora_inicio'), request.args.get('hora_fim'),
+        request.args.get('min_capacidade'), request.args.get('limit'))
+    return jsonify({
+        'data': request.args.get('data'),
+        'hora_inicio': request.args.get('hora_inicio'),
+        'min_capacidade': int(request.args.get('min_capacidade') or 0),
+        'laboratorios': [laboratorio.to_dict() for laboratorio in laboratorios]
+    })
+
+@api.route('/laboratorios/<int:id_laboratorio>', methods=['GET'])
+def get_laboratorio(id_laboratorio):
+    return jsonify(laboratorio_repository.get_by_id(id_laboratorio).to_dict())
+
+@api.route('/laboratorios/<int:id_laboratorio>/disponibilidade', methods=['GET'])
+@jwt_required()
+def get_disponibilidade_laboratorio(id_laboratorio):
+    data = request.args.get('data')
+    janelas = agendamento_service.horarios_livres(id_laboratorio, data)
+    return jsonify({'id_laboratorio': id_laboratorio, 'data': data, 'janelas': janelas})
+
+# Relatórios de ocupação, lidos dos agregados mantidos pelo banco
+def resposta_relatorio(nome, tabelas, colunas, gerar):
+    """Relatório em JSON ({inicio, fim, linhas}) ou, com formato=csv, em CSV para download."""
+    formato = request.args.get('formato') or 'json'
+    if formato not in ('json', 'csv'):
+        raise CustomException(ErrorType.INVALID_OPERATION, "formato accepts only: json, csv")
+
+    def gerar_corpo():
+        (inicio, fim), linhas = gerar()
+        if formato == 'csv':
+            return stream_csv(linhas, colunas)
+        return iter([json_dumps({'inicio': inicio, 'fim': fim, 'linhas': linhas})])
+
+    response = resposta_condicional(f'/relatorios/{nome}', request.args.to_dict(), tabelas, gerar_corpo,
+                                    'text/csv' if formato == 'csv' else 'application/json')
+    if formato == 'csv':
+        response.headers['Content-Disposition'] = f'attachment; filename="{nome}.csv"'
+    return response
+
+@api.route('/relatorios/utilizacao', methods=['GET'])
+@jwt_required()
+def get_relatorio_utilizacao():
+    # ?inicio=&fim=&agrupar=dia|semana|laboratorio|professor[&id_laboratorio=][&formato=csv]
+    agrupar = request.args.get('agrupar') or 'dia'
+    tabelas = ('agendamentos', 'professores' if agrupar == 'professor' else 'laboratorios')
+    return resposta_relatorio('utilizacao', tabelas, COLUNAS_RELATORIO.get(agrupar, ()),
+                              lambda: relatorio_service.utilizacao(request.args.get('inicio'), request.args.get('fim'),
+                                                                   agrupar, request.args.get('id_laboratorio')))
+
+@api.route('/relatorios/horarios-pico', methods=['GET'])
+@jwt_required()
+def get_relatorio_horarios_pico():
+    return resposta_relatorio('horarios-pico', ('agendamentos', 'laboratorios'), COLUNAS_RELATORIO['horarios_pico'],
+                              lambda: relatorio_service.horarios_pico(request.args.get('inicio'), request.args.get('fim'),
+                                                                      request.args.get('id_laboratorio')))
+
+@api.route('/relatorios/top-professores', methods=['GET'])
+@jwt_required()
+def get_relatorio_top_professores():
+    return resposta_relatorio('top-professores', ('agendamentos', 'laboratorios', 'professores'),
+                              COLUNAS_RELATORIO['top_professores'],
+                              lambda: relatorio_service.top_professores(request.args.get('inicio'), request.args.get('fim'),
+                                                                        request.args.get('top'),
+                                                                        request.args.get('id_laboratorio')))
+
+# Métricas no formato Prometheus
+@api.route('/metrics', methods=['GET'])
+@operacional
+def get_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+# Estatísticas do pool de conexões
+@api.route('/pool/stats', methods=['GET'])
+@operacional
+def get_pool_stats():
+    return jsonify(database.pool_stats())
+
+# Partições mensais de agendamentos (linhas estimadas e tamanho)
+@api.route('/db/particoes', methods=['GET'])
+@operacional
+def get_db_particoes():
+    return jsonify(particoes.listar())
+
+# Tarefas pendentes por tipo (com a idade da mais antiga) e tarefas que falharam
+@api.route('/tarefas/stats', methods=['GET'])
+@operacional
+def get_tarefas_stats():
+    return jsonify(tarefas.stats())
+
+# Execuções e tempo por comando SQL nomeado
+@api.route('/db/statements', methods=['GET'])
+@operacional
+def get_db_statements():
+    return jsonify(database.consultas.stats())
+
+# Estatísticas do cache
+@api.route('/cache/stats', methods=['GET'])
+@operacional
+def get_cache_stats():
+    stats = cache.stats()
+    stats['respostas'] = respostas.stats()
+    stats['idempotencia'] = idempotencia.stats()
+    return jsonify(stats)
+
+app = create_app()
+
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,76 @@
+"""Manutenção das partições mensais de agendamentos, dos agregados de ocupação e da fila de tarefas.
+
+    python manutencao.py particoes --meses 12
+    python manutencao.py arquivar --antes-de 2024-01 --destino arquivo/agendamentos
+    python manutencao.py ocupacao --de 2025-01 --ate 2025-06
+    python manutencao.py tarefas --reprocessar
+
+Usa as mesmas variáveis de ambiente de credenciais da aplicação.
+"""
+import argparse
+import json
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+from src.repository.database import Database
+from src.repository.particao_repository import MESES_A_FRENTE, ParticaoRepository
+from src.repository.relatorio_repository import RelatorioRepository
+from src.repository.tarefa_repository import TarefaRepository
+from src.repository.versao_repository import VersaoRepository
+from src.secret.credentials import credentials_provider_from_env
+
+
+def _mes(texto):
+    try:
+        return datetime.strptime(texto, '%Y-%m').date()
+    except ValueError:
+        raise argparse.ArgumentTypeError("use o formato AAAA-MM")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    particoes = comandos.add_parser('particoes', help='cria as partições dos próximos meses e lista as existentes')
+    particoes.add_argument('--meses', type=int, default=MESES_A_FRENTE)
+
+    arquivar = comandos.add_parser('arquivar', help='exporta para CSV comprimido e remove as partições antigas')
+    arquivar.add_argument('--antes-de', type=_mes, required=True, help='primeiro mês mantido (AAAA-MM)')
+    arquivar.add_argument('--destino', required=True, help='diretório dos arquivos .csv.gz')
+    arquivar.add_argument('--manter-tabela', action='store_true', help='só desliga e exporta, sem remover a tabela')
+
+    ocupacao = comandos.add_parser('ocupacao', help='reconstrói os agregados dos relatórios a partir dos agendamentos')
+    ocupacao.add_argument('--de', type=_mes, required=True, help='primeiro mês (AAAA-MM)')
+    ocupacao.add_argument('--ate', type=_mes, required=True, help='último mês (AAAA-MM)')
+
+    tarefas = comandos.add_parser('tarefas', help='mostra a fila de tarefas do worker.py')
+    tarefas.add_argument('--reprocessar', action='store_true', help='devolve à fila as tarefas que falharam')
+    tarefas.add_argument('--tipo', help='só as tarefas deste tipo')
+    args = parser.parse_args()
+
+    load_dotenv()
+    database = Database(credenciais=credentials_provider_from_env(), minconn=0, maxconn=2)
+    repository = ParticaoRepository(database, VersaoRepository(database))
+    try:
+        if args.comando == 'particoes':
+            repository.garantir(args.meses)
+            resultado = repository.listar()
+        elif args.comando == 'ocupacao':
+            # Meses já arquivados não são recalculados: seus agendamentos não estão mais na tabela
+            resultado = {'meses_recalculados': RelatorioRepository(database).recalcular(args.de, args.ate)}
+        elif args.comando == 'tarefas':
+            tarefa_repository = TarefaRepository(database)
+            resultado = {}
+            if args.reprocessar:
+                resultado['reprocessadas'] = tarefa_repository.reprocessar(args.tipo)
+            resultado.update(tarefa_repository.stats())
+        else:
+            resultado = repository.arquivar(args.antes_de, args.destino, remover=not args.manter_tabela)
+    finally:
+        database.close()
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import jwt
+
+from src.exceptions.custom_exception import CustomException
+from src.enums.enum import ErrorType
+
+# Mesmos padrões do Flask-JWT-Extended, para que os tokens valham nos dois modos
+ACCESS_EXPIRES = timedelta(minutes=15)
+REFRESH_EXPIRES = timedelta(days=30)
+
+
+def criar_token(identity, secret, tipo='access'):
+    agora = datetime.now(timezone.utc)
+    claims = {
+        'iat': agora,
+        'nbf': agora,
+        'jti': str(uuid.uuid4()),
+        'exp': agora + (ACCESS_EXPIRES if tipo == 'access' else REFRESH_EXPIRES),
+        'sub': str(identity),
+        'type': tipo,
+    }
+    if tipo == 'access':
+        claims['fresh'] = False
+    return jwt.encode(claims, secret, algorithm='HS256')
+
+
+def identidade_do_header(authorization, secret, tipo='access'):
+    """Valida o header `Authorization: Bearer <token>` e retorna o `sub`."""
+    if not authorization or not authorization.startswith('Bearer '):
+        raise CustomException(ErrorType.INVALID_CREDENTIALS, "Token de acesso não fornecido no cabeçalho Authorization.")
+    try:
+        claims = jwt.decode(authorization[len('Bearer '):], secret, algorithms=['HS256'])
+    except jwt.ExpiredSignatureError:
+        raise CustomException(ErrorType.INVALID_CREDENTIALS, "Token de acesso expirado.")
+    except jwt.InvalidTokenError as e:
+        raise CustomException(ErrorType.INVALID_CREDENTIALS, f"Token inválido: {e}")
+    if claims.get('type') != tipo:
+        raise CustomException(ErrorType.INVALID_CREDENTIALS, f"Token inválido: esperado token do tipo {tipo}")
+    return claims['sub']
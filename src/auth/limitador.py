@@ -0,0 +1,115 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Balde de tokens atômico no Redis; o relógio é o do servidor Redis, comum a todos os processos
+SCRIPT_BALDE = """
+local capacidade = tonumber(ARGV[1])
+local por_segundo = tonumber(ARGV[2])
+local custo = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local agora = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local dados = redis.call('HMGET', KEYS[1], 'tokens', 'atualizado')
+local tokens = tonumber(dados[1]) or capacidade
+local atualizado = tonumber(dados[2]) or agora
+tokens = math.min(capacidade, tokens + math.max(0, agora - atualizado) * por_segundo)
+local espera = 0
+if tokens >= custo then
+    tokens = tokens - custo
+else
+    espera = (custo - tokens) / por_segundo
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'atualizado', tostring(agora))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacidade / por_segundo) + 1)
+return tostring(espera)
+"""
+
+
+class BaldesMemoria:
+    """Baldes de tokens em memória, válidos só neste processo.
+
+    Guarda no máximo `max_chaves` baldes; os menos usados são descartados
+    (um balde descartado volta cheio).
+    """
+
+    def __init__(self, max_chaves=100000, relogio=time.monotonic):
+        self.max_chaves = max_chaves
+        self.relogio = relogio
+        self._lock = threading.Lock()
+        self._baldes = OrderedDict()
+
+    def consumir(self, chave, capacidade, por_segundo, custo=1):
+        """Retira `custo` tokens; retorna 0 se permitido ou os segundos até haver tokens."""
+        agora = self.relogio()
+        with self._lock:
+            tokens, atualizado = self._baldes.pop(chave, (capacidade, agora))
+            tokens = min(capacidade, tokens + (agora - atualizado) * por_segundo)
+            espera = 0.0
+            if tokens >= custo:
+                tokens -= custo
+            else:
+                espera = (custo - tokens) / por_segundo
+            self._baldes[chave] = (tokens, agora)
+            while len(self._baldes) > self.max_chaves:
+                self._baldes.popitem(last=False)
+        return espera
+
+    def __len__(self):
+        return len(self._baldes)
+
+
+class BaldesRedis:
+    """Baldes de tokens compartilhados entre processos, em um cliente compatível com Redis.
+
+    Só usa `eval`. Se o Redis falhar, a tentativa é permitida: o limitador não
+    deve derrubar o login.
+    """
+
+    def __init__(self, cliente, prefixo='limite:'):
+        self.cliente = cliente
+        self.prefixo = prefixo
+
+    def consumir(self, chave, capacidade, por_segundo, custo=1):
+        try:
+            return float(self.cliente.eval(SCRIPT_BALDE, 1, self.prefixo + chave, capacidade, por_segundo, custo))
+        except Exception as e:
+            logger.warning("Limitador indisponível, tentativa permitida: %s", e)
+            return 0.0
+
+
+class LimitadorLogin:
+    """Limite de tentativas de login por IP e por e-mail.
+
+    Cada limite é um balde com `capacidade` tentativas que se recompõe por
+    completo em `janela` segundos. Toda tentativa consome um token de cada
+    balde, antes de qualquer consulta ao banco ou verificação bcrypt; recusar
+    custa só a consulta aos baldes. Capacidade 0 desliga o limite.
+    """
+
+    def __init__(self, baldes, por_ip=(20, 60.0), por_email=(5, 300.0), metrics=None):
+        self.baldes = baldes
+        self.por_ip = por_ip
+        self.por_email = por_email
+        self._recusas = None
+        if metrics is not None:
+            self._recusas = metrics.counter('login_throttled_total', 'Tentativas de login recusadas por limite')
+
+    def _consumir(self, tipo, valor, limite):
+        capacidade, janela = limite
+        if not capacidade or not valor:
+            return 0.0
+        espera = self.baldes.consumir(f'login:{tipo}:{valor}', capacidade, capacidade / janela)
+        if espera and self._recusas is not None:
+            self._recusas.inc(motivo=tipo)
+        return espera
+
+    def tentar(self, email, ip):
+        """Retorna 0 se a tentativa pode seguir ou os segundos a esperar."""
+        # O balde do IP vem primeiro: um IP bloqueado não consome as tentativas do e-mail
+        espera = self._consumir('ip', ip, self.por_ip)
+        if espera:
+            return espera
+        return self._consumir('email', (email or '').strip().lower(), self.por_email)
@@ -0,0 +1,89 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.exceptions.custom_exception import CustomException
+from src.enums.enum import ErrorType
+
+
+class SenhaHasher:
+    """Executa o hash e a verificação bcrypt em um pool de threads limitado.
+
+    O bcrypt libera o GIL, então as threads usam vários núcleos sem bloquear o
+    worker do Flask. Quando há mais de `max_pendentes` operações na fila, novas
+    chamadas são recusadas com 503 em vez de acumular latência.
+    """
+
+    def __init__(self, rounds=12, workers=None, max_pendentes=None, metrics=None):
+        self.rounds = rounds
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pendentes = max_pendentes or self.workers * 8
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bcrypt')
+        self._vagas = threading.BoundedSemaphore(self.max_pendentes)
+        self._duracao = None
+        self._recusas = None
+        if metrics is not None:
+            self._duracao = metrics.histogram('bcrypt_duration_seconds', 'Duração das operações bcrypt')
+            self._recusas = metrics.counter('bcrypt_rejected_total', 'Operações bcrypt recusadas por fila cheia')
+
+    def _submeter(self, funcao, *args):
+        if not self._vagas.acquire(blocking=False):
+            if self._recusas is not None:
+                self._recusas.inc()
+            raise CustomException(ErrorType.SERVICE_UNAVAILABLE,
+                                  "Servidor ocupado processando autenticações, tente novamente em instantes.")
+        try:
+            future = self._executor.submit(funcao, *args)
+        except Exception:
+            self._vagas.release()
+            raise
+        future.add_done_callback(lambda _: self._vagas.release())
+        return future
+
+    @staticmethod
+    def _hash(senha, rounds):
+        # Importação tardia: o bcrypt só é carregado no primeiro uso
+        import bcrypt
+        return bcrypt.hashpw(senha.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+    @staticmethod
+    def _verificar(senha, senha_hash):
+        import bcrypt
+        try:
+            return bcrypt.checkpw(senha.encode('utf-8'), senha_hash.encode('utf-8'))
+        except ValueError:
+            # Hash armazenado em formato inválido
+            return False
+
+    def _medido(self, operacao, funcao):
+        if self._duracao is None:
+            return funcao
+
+        def executar(*args):
+            with self._duracao.time(operation=operacao):
+                return funcao(*args)
+        return executar
+
+    def submeter_hash(self, senha):
+        # Retorna um Future; usado pelo modo assíncrono via asyncio.wrap_future
+        return self._submeter(self._medido('hash', self._hash), senha, self.rounds)
+
+    def submeter_verificacao(self, senha, senha_hash):
+        return self._submeter(self._medido('verify', self._verificar), senha, senha_hash)
+
+    def hash(self, senha):
+        return self.submeter_hash(senha).result()
+
+    def verificar(self, senha, senha_hash):
+        return self.submeter_verificacao(senha, senha_hash).result()
+
+    def precisa_rehash(self, senha_hash):
+        # Formato: $2b$<custo>$<salt+hash>
+        partes = senha_hash.split('$')
+        try:
+            return int(partes[2]) != self.rounds
+        except (IndexError, ValueError):
+            return False
+
+    def close(self):
+        self._executor.shutdown(wait=True)
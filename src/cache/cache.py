@@ -0,0 +1,188 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+
+class Cache:
+    """Interface comum dos backends de cache.
+
+    `get` retorna uma tupla (encontrado, valor) para que `None` possa ser
+    guardado como resultado negativo (registro inexistente).
+    """
+
+    def __init__(self, ttl=60.0, ttl_negativo=5.0):
+        self.ttl = ttl
+        self.ttl_negativo = ttl_negativo
+        self._lock_stats = threading.Lock()
+        self._hits = 0
+        self._negative_hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    def get(self, chave):
+        raise NotImplementedError
+
+    def set(self, chave, valor, ttl=None):
+        raise NotImplementedError
+
+    def delete(self, *chaves):
+        raise NotImplementedError
+
+    def adicionar(self, chave, valor, ttl=None):
+        """Guarda `valor` só se a chave não existir; retorna True se guardou."""
+        raise NotImplementedError
+
+    def _contar(self, encontrado, valor):
+        with self._lock_stats:
+            if not encontrado:
+                self._misses += 1
+            elif valor is None:
+                self._negative_hits += 1
+            else:
+                self._hits += 1
+
+    def get_or_load(self, chave, carregar):
+        encontrado, valor = self.get(chave)
+        self._contar(encontrado, valor)
+        if encontrado:
+            return valor
+        valor = carregar()
+        self.set(chave, valor, self.ttl if valor is not None else self.ttl_negativo)
+        return valor
+
+    def get_or_load_many(self, chaves, carregar):
+        """Como `get_or_load` para várias chaves.
+
+        `carregar(faltando)` recebe só as chaves ausentes e retorna um dict
+        chave -> valor; as que ficarem de fora são guardadas como negativas.
+        """
+        valores = {}
+        faltando = []
+        for chave in chaves:
+            encontrado, valor = self.get(chave)
+            self._contar(encontrado, valor)
+            if encontrado:
+                valores[chave] = valor
+            else:
+                faltando.append(chave)
+        if faltando:
+            carregados = carregar(faltando)
+            for chave in faltando:
+                valor = carregados.get(chave)
+                self.set(chave, valor, self.ttl if valor is not None else self.ttl_negativo)
+                valores[chave] = valor
+        return valores
+
+    def invalidate(self, *chaves):
+        with self._lock_stats:
+            self._invalidations += len(chaves)
+        self.delete(*chaves)
+
+    def stats(self):
+        with self._lock_stats:
+            return {
+                'hits': self._hits,
+                'negative_hits': self._negative_hits,
+                'misses': self._misses,
+                'invalidations': self._invalidations,
+            }
+
+
+class TTLCache(Cache):
+    """Cache em memória com expiração por tempo e limite de itens (LRU)."""
+
+    def __init__(self, max_itens=1024, ttl=60.0, ttl_negativo=5.0):
+        super().__init__(ttl, ttl_negativo)
+        self.max_itens = max_itens
+        self._lock = threading.Lock()
+        self._itens = OrderedDict()
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return False, None
+            expira_em, valor = item
+            if expira_em <= time.monotonic():
+                del self._itens[chave]
+                self._expirations += 1
+                return False, None
+            self._itens.move_to_end(chave)
+            return True, valor
+
+    def set(self, chave, valor, ttl=None):
+        expira_em = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._guardar(chave, valor, expira_em)
+
+    def adicionar(self, chave, valor, ttl=None):
+        agora = time.monotonic()
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None and item[0] > agora:
+                return False
+            self._guardar(chave, valor, agora + (self.ttl if ttl is None else ttl))
+            return True
+
+    def _guardar(self, chave, valor, expira_em):
+        self._itens[chave] = (expira_em, valor)
+        self._itens.move_to_end(chave)
+        while len(self._itens) > self.max_itens:
+            self._itens.popitem(last=False)
+            self._evictions += 1
+
+    def delete(self, *chaves):
+        with self._lock:
+            for chave in chaves:
+                self._itens.pop(chave, None)
+
+    def stats(self):
+        stats = super().stats()
+        with self._lock:
+            stats.update({
+                'backend': 'memory',
+                'size': len(self._itens),
+                'max_size': self.max_itens,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+            })
+        return stats
+
+
+class RedisCache(Cache):
+    """Cache compartilhado sobre um cliente compatível com Redis.
+
+    Só usa `get`, `set(ex=..., nx=...)` e `delete`, então qualquer cliente com essa
+    interface (por exemplo um substituto local em testes) pode ser usado.
+    """
+
+    def __init__(self, cliente, prefixo='agendamentos:', ttl=60.0, ttl_negativo=5.0):
+        super().__init__(ttl, ttl_negativo)
+        self.cliente = cliente
+        self.prefixo = prefixo
+
+    def get(self, chave):
+        dados = self.cliente.get(self.prefixo + chave)
+        if dados is None:
+            return False, None
+        return True, pickle.loads(dados)
+
+    def set(self, chave, valor, ttl=None):
+        segundos = max(int(self.ttl if ttl is None else ttl), 1)
+        self.cliente.set(self.prefixo + chave, pickle.dumps(valor), ex=segundos)
+
+    def delete(self, *chaves):
+        if chaves:
+            self.cliente.delete(*[self.prefixo + chave for chave in chaves])
+
+    def adicionar(self, chave, valor, ttl=None):
+        segundos = max(int(self.ttl if ttl is None else ttl), 1)
+        return bool(self.cliente.set(self.prefixo + chave, pickle.dumps(valor), ex=segundos, nx=True))
+
+    def stats(self):
+        stats = super().stats()
+        stats['backend'] = 'redis'
+        return stats
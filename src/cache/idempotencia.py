@@ -0,0 +1,118 @@
+import hashlib
+import threading
+import time
+
+from src.cache.cache import TTLCache
+from src.exceptions.custom_exception import CustomException
+from src.enums.enum import ErrorType
+
+# Valor guardado enquanto a primeira requisição com a chave ainda está executando
+EM_ANDAMENTO = 'em_andamento'
+MAX_TAMANHO_CHAVE = 255
+
+
+def impressao_digital(*partes):
+    """Resumo do pedido (rota, usuário e corpo) para detectar uma chave reutilizada em outro pedido."""
+    resumo = hashlib.sha256()
+    for parte in partes:
+        resumo.update(parte if isinstance(parte, bytes) else str(parte).encode('utf-8'))
+        resumo.update(b'\0')
+    return resumo.hexdigest()
+
+
+class ArmazemIdempotencia:
+    """Resultados de POSTs por `Idempotency-Key`.
+
+    A primeira requisição com a chave reserva a entrada e executa; as repetições
+    recebem o resultado guardado sem executar de novo. Repetições que chegam
+    enquanto a primeira ainda executa esperam por ela (até `espera` segundos).
+    Com um `RedisCache` a reserva e os resultados valem entre processos.
+    """
+
+    def __init__(self, cache=None, ttl=86400.0, espera=30.0, intervalo=0.05):
+        self.cache = cache if cache is not None else TTLCache(max_itens=10000, ttl=ttl)
+        self.ttl = ttl
+        self.espera = espera
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        # Chave -> Event das execuções em andamento neste processo, para acordar quem espera
+        self._em_andamento = {}
+        self._executadas = 0
+        self._repetidas = 0
+        self._aguardadas = 0
+        self._conflitos = 0
+
+    def executar(self, chave, impressao, funcao):
+        """Retorna (status, corpo, mimetype, repetida).
+
+        `funcao()` deve retornar (status, corpo, mimetype). Respostas 5xx e
+        exceções não são guardadas: a reserva é liberada para uma nova tentativa.
+        """
+        if len(chave) > MAX_TAMANHO_CHAVE:
+            raise CustomException(ErrorType.INVALID_OPERATION,
+                                  f"Idempotency-Key must be at most {MAX_TAMANHO_CHAVE} characters")
+
+        aguardou = False
+        limite = time.monotonic() + self.espera
+        while True:
+            encontrado, registro = self.cache.get(chave)
+            if encontrado and registro != EM_ANDAMENTO:
+                return self._repetir(registro, impressao, aguardou)
+            if not encontrado and self.cache.adicionar(chave, EM_ANDAMENTO, self.espera):
+                break
+            # Outra requisição com a mesma chave está executando
+            if time.monotonic() >= limite:
+                raise CustomException(ErrorType.CONFLICT,
+                                      "A request with this Idempotency-Key is still being processed")
+            aguardou = True
+            with self._lock:
+                sinal = self._em_andamento.get(chave)
+            if sinal is not None:
+                sinal.wait(min(self.intervalo * 20, max(limite - time.monotonic(), 0)))
+            else:
+                time.sleep(self.intervalo)
+
+        sinal = threading.Event()
+        with self._lock:
+            self._em_andamento[chave] = sinal
+            self._executadas += 1
+        try:
+            status, corpo, mimetype = funcao()
+            if status >= 500:
+                self.cache.delete(chave)
+            else:
+                self.cache.set(chave, (impressao, status, corpo, mimetype), self.ttl)
+        except BaseException:
+            self.cache.delete(chave)
+            raise
+        finally:
+            # O resultado já está guardado quando quem espera acorda
+            with self._lock:
+                self._em_andamento.pop(chave, None)
+            sinal.set()
+        return status, corpo, mimetype, False
+
+    def _repetir(self, registro, impressao, aguardou):
+        impressao_original, status, corpo, mimetype = registro
+        with self._lock:
+            if impressao_original != impressao:
+                self._conflitos += 1
+            else:
+                self._repetidas += 1
+                self._aguardadas += aguardou
+        if impressao_original != impressao:
+            raise CustomException(ErrorType.INVALID_OPERATION,
+                                  "Idempotency-Key was already used with a different request")
+        return status, corpo, mimetype, True
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                'executadas': self._executadas,
+                'repetidas': self._repetidas,
+                'aguardadas': self._aguardadas,
+                'chaves_reutilizadas': self._conflitos,
+                'em_andamento': len(self._em_andamento),
+            }
+        stats['armazenamento'] = self.cache.stats()
+        return stats
@@ -0,0 +1,44 @@
+from src.cache.cache import TTLCache
+
+
+class RespostaCache:
+    """Corpos de resposta já comprimidos, por (rota, filtros, versão, codificação).
+
+    Como a versão da tabela faz parte da chave, uma escrita não precisa invalidar
+    nada: as entradas antigas deixam de ser consultadas e saem pelo LRU/TTL.
+    Corpos maiores que `max_bytes_item` são enviados mas não guardados.
+    """
+
+    def __init__(self, max_itens=256, max_bytes_item=1024 * 1024, ttl=300.0):
+        self._cache = TTLCache(max_itens=max_itens, ttl=ttl, ttl_negativo=ttl)
+        self.max_bytes_item = max_bytes_item
+
+    @staticmethod
+    def chave(rota, filtros, versao, codificacao):
+        parametros = '&'.join(f'{nome}={valor}' for nome, valor in sorted(filtros.items()) if valor is not None)
+        return f'{rota}?{parametros}#{versao}:{codificacao}'
+
+    def get(self, chave):
+        encontrado, corpo = self._cache.get(chave)
+        self._cache._contar(encontrado, corpo)
+        return corpo if encontrado else None
+
+    def armazenar_stream(self, chave, pedacos):
+        # Repassa os pedaços ao cliente e guarda o corpo completo se couber no limite
+        guardados = []
+        tamanho = 0
+        for pedaco in pedacos:
+            if guardados is not None:
+                tamanho += len(pedaco)
+                if tamanho > self.max_bytes_item:
+                    guardados = None
+                else:
+                    guardados.append(pedaco)
+            yield pedaco
+        if guardados is not None:
+            self._cache.set(chave, b''.join(guardados))
+
+    def stats(self):
+        stats = self._cache.stats()
+        stats['max_bytes_item'] = self.max_bytes_item
+        return stats
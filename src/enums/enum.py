@@ -6,6 +6,8 @@ class ErrorType(Enum):
     DATABASE_ERROR = "Database error"
     INVALID_CREDENTIALS = "Credentials invalid"
     INVALID_OPERATION = "Invalid operation"
+    SERVICE_UNAVAILABLE = "Service unavailable"
+    CONFLICT = "Conflict"
 
     def http_status_code(self):
         # Mapeamento entre o tipo de erro e o código HTTP correspondente
@@ -14,6 +16,8 @@ class ErrorType(Enum):
             ErrorType.NOT_FOUND: 404,  # Not Found
             ErrorType.DATABASE_ERROR: 500,  # Internal Server Error
             ErrorType.INVALID_CREDENTIALS: 401,  # Unauthorized
-            ErrorType.INVALID_OPERATION: 400  # Bad Request
+            ErrorType.INVALID_OPERATION: 400,  # Bad Request
+            ErrorType.SERVICE_UNAVAILABLE: 503,  # Service Unavailable
+            ErrorType.CONFLICT: 409  # Conflict
         }
         return status_codes.get(self, 500)
@@ -0,0 +1,171 @@
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from inspect import isgenerator
+
+# Limites (em segundos) usados pelos histogramas de latência
+BUCKETS_PADRAO = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _formatar_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{chave}="{str(valor)}"' for chave, valor in labels) + '}'
+
+
+class Counter:
+    def __init__(self, nome, descricao):
+        self.nome = nome
+        self.descricao = descricao
+        self._lock = threading.Lock()
+        self._valores = {}
+
+    def inc(self, valor=1, **labels):
+        chave = tuple(sorted(labels.items()))
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+
+    def render(self):
+        linhas = [f'# HELP {self.nome} {self.descricao}', f'# TYPE {self.nome} counter']
+        with self._lock:
+            for labels, valor in sorted(self._valores.items()):
+                linhas.append(f'{self.nome}{_formatar_labels(labels)} {valor}')
+        return linhas
+
+
+class Histogram:
+    def __init__(self, nome, descricao, buckets=BUCKETS_PADRAO):
+        self.nome = nome
+        self.descricao = descricao
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # labels -> [contagens por bucket..., +Inf], soma
+        self._series = {}
+
+    def observe(self, valor, **labels):
+        chave = tuple(sorted(labels.items()))
+        posicao = bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = [[0] * (len(self.buckets) + 1), 0.0]
+            serie[0][posicao] += 1
+            serie[1] += valor
+
+    def time(self, **labels):
+        return _Cronometro(self, labels)
+
+    def render(self):
+        linhas = [f'# HELP {self.nome} {self.descricao}', f'# TYPE {self.nome} histogram']
+        with self._lock:
+            for labels, (contagens, soma) in sorted(self._series.items()):
+                acumulado = 0
+                for limite, contagem in zip(self.buckets + ('+Inf',), contagens):
+                    acumulado += contagem
+                    linhas.append(f'{self.nome}_bucket{_formatar_labels(labels + (("le", limite),))} {acumulado}')
+                linhas.append(f'{self.nome}_sum{_formatar_labels(labels)} {soma:.6f}')
+                linhas.append(f'{self.nome}_count{_formatar_labels(labels)} {acumulado}')
+        return linhas
+
+
+class _Cronometro:
+    def __init__(self, histograma, labels):
+        self.histograma = histograma
+        self.labels = labels
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histograma.observe(time.perf_counter() - self.inicio, **self.labels)
+        return False
+
+
+class Metrics:
+    """Registro de métricas exportado no formato de texto do Prometheus."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metricas = {}
+        self._gauges = []
+
+    def _registrar(self, classe, nome, descricao, *args):
+        with self._lock:
+            if nome not in self._metricas:
+                self._metricas[nome] = classe(nome, descricao, *args)
+            return self._metricas[nome]
+
+    def counter(self, nome, descricao):
+        return self._registrar(Counter, nome, descricao)
+
+    def histogram(self, nome, descricao, buckets=BUCKETS_PADRAO):
+        return self._registrar(Histogram, nome, descricao, buckets)
+
+    def gauge_callback(self, prefixo, descricao, coletar):
+        """Registra gauges lidos na hora da coleta; `coletar` retorna um dict nome -> número."""
+        with self._lock:
+            self._gauges.append((prefixo, descricao, coletar))
+
+    def render(self):
+        with self._lock:
+            metricas = list(self._metricas.values())
+            gauges = list(self._gauges)
+        linhas = []
+        for metrica in metricas:
+            linhas.extend(metrica.render())
+        for prefixo, descricao, coletar in gauges:
+            for nome, valor in coletar().items():
+                if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+                    continue
+                linhas.append(f'# HELP {prefixo}_{nome} {descricao}')
+                linhas.append(f'# TYPE {prefixo}_{nome} gauge')
+                linhas.append(f'{prefixo}_{nome} {valor}')
+        return '\n'.join(linhas) + '\n'
+
+
+class RepositorioInstrumentado:
+    """Envolve um repositório e mede a duração de cada método público.
+
+    Métodos que retornam geradores são medidos até o fim da iteração.
+    """
+
+    def __init__(self, repositorio, metrics, nome=None):
+        self._repositorio = repositorio
+        self._nome = nome or type(repositorio).__name__
+        self._histograma = metrics.histogram('repository_call_duration_seconds',
+                                             'Duração das chamadas aos repositórios')
+        self._erros = metrics.counter('repository_call_errors_total', 'Chamadas aos repositórios que falharam')
+
+    def __getattr__(self, atributo):
+        valor = getattr(self._repositorio, atributo)
+        if atributo.startswith('_') or not callable(valor):
+            return valor
+
+        labels = {'repository': self._nome, 'method': atributo}
+
+        @wraps(valor)
+        def medido(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                resultado = valor(*args, **kwargs)
+            except Exception:
+                self._erros.inc(**labels)
+                self._histograma.observe(time.perf_counter() - inicio, **labels)
+                raise
+            if isgenerator(resultado):
+                return self._medir_gerador(resultado, inicio, labels)
+            self._histograma.observe(time.perf_counter() - inicio, **labels)
+            return resultado
+
+        return medido
+
+    def _medir_gerador(self, gerador, inicio, labels):
+        try:
+            yield from gerador
+        except Exception:
+            self._erros.inc(**labels)
+            raise
+        finally:
+            self._histograma.observe(time.perf_counter() - inicio, **labels)
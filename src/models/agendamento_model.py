@@ -1,4 +1,10 @@
+def _formatar_hora(hora):
+    return hora.strftime('%H:%M:%S') if hasattr(hora, 'strftime') else hora
+
+
 class Agendamento:
+    __slots__ = ('id', 'id_laboratorio', 'id_professor', 'data_agendamento', 'hora_inicio', 'hora_fim', 'criado_em')
+
     def __init__(self, id, id_laboratorio, id_professor, data_agendamento, hora_inicio, hora_fim, criado_em=''):
         self.id = id
         self.id_laboratorio = id_laboratorio
@@ -13,7 +19,8 @@ class Agendamento:
             'id': self.id,
             'id_laboratorio': self.id_laboratorio,
             'id_professor': self.id_professor,
-            'data_agendamento': self.data_agendamento,
-            'hora_inicio': self.hora_inicio,
-            'hora_fim': self.hora_fim
-        }
\ No newline at end of file
+            'data_agendamento': self.data_agendamento.isoformat()
+                if hasattr(self.data_agendamento, 'isoformat') else self.data_agendamento,
+            'hora_inicio': _formatar_hora(self.hora_inicio),
+            'hora_fim': _formatar_hora(self.hora_fim)
+        }
@@ -1,5 +1,15 @@
 class Laboratorio:
-    def __init__(self, id, nome, capacidade):
+    __slots__ = ('id', 'nome', 'capacidade', 'criado_em')
+
+    def __init__(self, id, nome, capacidade, criado_em=''):
         self.id = id
         self.nome = nome
-        self.capacidade = capacidade
\ No newline at end of file
+        self.capacidade = capacidade
+        self.criado_em = criado_em
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'nome': self.nome,
+            'capacidade': self.capacidade
+        }
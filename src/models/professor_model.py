@@ -1,5 +1,7 @@
 
 class Professor:
+    __slots__ = ('id', 'nome', 'email', 'senha', 'criado_em')
+
     def __init__(self, id, nome, email, senha='', criado_em=''):
         self.id = id
         self.nome = nome
@@ -7,3 +9,10 @@ class Professor:
         self.senha = senha
         self.criado_em = criado_em
 
+    def to_dict(self):
+        # A senha (hash) nunca é exposta
+        return {
+            'id': self.id,
+            'nome': self.nome,
+            'email': self.email
+        }
@@ -1,92 +1,272 @@
 # src/repositories/agendamento_repository.py
 
-from datetime import datetime, timedelta
+from datetime import datetime
 from src.models.agendamento_model import Agendamento
 from src.exceptions.custom_exception import CustomException
 from src.enums.enum import ErrorType
-from psycopg2 import IntegrityError
+from psycopg2 import IntegrityError, errors
+from psycopg2.extras import execute_values
+from src.repository.consultas import Consulta
+from src.repository.ouvinte_notificacoes import CANAL_AGENDAMENTOS, evento_agendamento, sql_evento
+from src.repository.particao_repository import inicio_do_mes
+
+COLUNAS = "id, id_laboratorio, id_professor, data_agendamento, hora_inicio, hora_fim, criado_em"
+
+# Mesmo formato de Agendamento.to_dict, montado no banco
+JSON_AGENDAMENTO = """json_build_object(
+    'id', id, 'id_laboratorio', id_laboratorio, 'id_professor', id_professor,
+    'data_agendamento', data_agendamento,
+    'hora_inicio', to_char(hora_inicio, 'HH24:MI:SS'), 'hora_fim', to_char(hora_fim, 'HH24:MI:SS')
+)::text"""
+
+# INSERT, tarefas da outbox e NOTIFY em um único comando: os bloqueios tomados pelos triggers
+# (contador de mudanças e versão da tabela) ficam retidos só por este comando e pelo COMMIT
+CRIAR = Consulta('agendamento_criar', f"""
+    WITH novo AS (
+        INSERT INTO agendamentos (id_laboratorio, id_professor, data_agendamento, hora_inicio, hora_fim)
+        VALUES (%s, %s, %s, %s, %s) RETURNING {COLUNAS}
+    ), evento AS MATERIALIZED (
+        SELECT {COLUNAS}, {sql_evento('criado')} AS evento FROM novo
+    ), enfileiradas AS (
+        INSERT INTO tarefas (tipo, dados)
+        SELECT t.tipo, e.evento::jsonb || jsonb_build_object('por', %s::text, 'ocorrido_em', now())
+        FROM evento e CROSS JOIN unnest(%s::text[]) AS t(tipo)
+    )
+    SELECT {COLUNAS}, pg_notify(%s, evento) FROM evento
+""")
+NOTIFICAR = Consulta('agendamento_notificar', "SELECT pg_notify(%s, evento) FROM unnest(%s::text[]) AS evento")
+# Uma tarefa por evento e tipo, com o usuário da requisição e o horário da transação
+ENFILEIRAR = Consulta('agendamento_enfileirar', """
+    INSERT INTO tarefas (tipo, dados)
+    SELECT t.tipo, e.evento::jsonb || jsonb_build_object('por', %s::text, 'ocorrido_em', now())
+    FROM unnest(%s::text[]) AS e(evento) CROSS JOIN unnest(%s::text[]) AS t(tipo)
+""")
+TODOS = Consulta('agendamento_todos', f"SELECT {COLUNAS} FROM agendamentos")
+# A data vem de agendamentos_datas: com ela na condição, o PostgreSQL lê só a partição do mês
+DATA_POR_ID = "(SELECT data_agendamento FROM agendamentos_datas WHERE id = %s)"
+MUDANCAS_DESDE = Consulta('agendamento_mudancas_desde', """
+    SELECT seq, id_agendamento, operacao, dados FROM agendamentos_mudancas
+    WHERE seq > %s ORDER BY seq LIMIT %s
+""")
+POR_ID = Consulta('agendamento_por_id',
+                  f"SELECT {COLUNAS} FROM agendamentos WHERE id = %s AND data_agendamento = {DATA_POR_ID}")
+# O FROM com a própria tabela devolve também o laboratório e a data anteriores
+ATUALIZAR = Consulta('agendamento_atualizar', f"""
+    UPDATE agendamentos a SET id_laboratorio = %s, id_professor = %s, data_agendamento = %s, hora_inicio = %s, hora_fim = %s
+    FROM agendamentos antigo
+    WHERE a.id = %s AND a.data_agendamento = {DATA_POR_ID}
+    AND antigo.id = a.id AND antigo.data_agendamento = {DATA_POR_ID}
+    RETURNING a.id, a.id_laboratorio, a.id_professor, a.data_agendamento, a.hora_inicio, a.hora_fim, a.criado_em,
+              antigo.id_laboratorio, antigo.data_agendamento
+""")
+REMOVER = Consulta('agendamento_remover', f"""
+    DELETE FROM agendamentos WHERE id = %s AND data_agendamento = {DATA_POR_ID} RETURNING {COLUNAS}
+""")
 
 class AgendamentoRepository:
-    def __init__(self, database):
+    def __init__(self, database, particoes=None):
         self.database = database
+        self.particoes = particoes
+
+    def _notificar(self, cursor, operacao, linhas, anteriores=None):
+        # O PostgreSQL só entrega o NOTIFY no commit; em rollback nada é enviado
+        eventos = [evento_agendamento(operacao, linha, anteriores[indice] if anteriores else None)
+                   for indice, linha in enumerate(linhas)]
+        if eventos:
+            self.database.executar(cursor, NOTIFICAR, (CANAL_AGENDAMENTOS, eventos))
+        return eventos
 
+    def _enfileirar(self, cursor, eventos, tarefas):
+        # Outbox: as tarefas só existem se o agendamento for gravado, e vice-versa
+        if eventos and tarefas:
+            self.database.executar(cursor, ENFILEIRAR, (self.database.sessao.get(), eventos, list(tarefas)))
 
-    def create(self, agendamento: Agendamento):
+    def _com_particao(self, escrever, datas):
+        # Sem partição para o mês, o INSERT falha com check_violation sem nome de restrição
         try:
-            with self.database.connect() as conn:
+            return escrever()
+        except errors.CheckViolation as e:
+            if e.diag.constraint_name is not None:
+                raise
+        if self.particoes is None:
+            raise CustomException(ErrorType.INVALID_OPERATION, "Não há partição de agendamentos para a data informada.")
+        for mes in sorted({inicio_do_mes(data) for data in datas}):
+            self.particoes.garantir_mes(mes)
+        return escrever()
+
+    def create(self, agendamento: Agendamento, tarefas=()):
+        # A restrição de exclusão do schema garante, no próprio INSERT, que não há sobreposição
+        def inserir():
+            with self.database.connection() as conn:
                 with conn.cursor() as cursor:
-                    sql = """
-                    INSERT INTO agendamentos (id_laboratorio, id_professor, data_agendamento, hora_inicio, hora_fim)
-                    VALUES (%s, %s, %s, %s, %s) RETURNING id
-                    """
-                    cursor.execute(sql, (agendamento.id_laboratorio, agendamento.id_professor, 
-                                         agendamento.data_agendamento, agendamento.hora_inicio, 
-                                         agendamento.hora_fim))
-                    agendamento_id = cursor.fetchone()[0]
+                    self.database.executar(cursor, CRIAR, (agendamento.id_laboratorio, agendamento.id_professor,
+                                                           agendamento.data_agendamento, agendamento.hora_inicio,
+                                                           agendamento.hora_fim, self.database.sessao.get(),
+                                                           list(tarefas or ()), CANAL_AGENDAMENTOS))
+                    linha = cursor.fetchone()
                     conn.commit()
-                    return agendamento_id
-        except IntegrityError as e:
+                    return linha[0]
+
+        try:
+            agendamento_id = self._com_particao(inserir, [agendamento.data_agendamento])
+        except errors.ExclusionViolation:
+            raise CustomException(ErrorType.INVALID_OPERATION, "O horário especificado não está disponível")
+        except errors.ForeignKeyViolation:
+            raise CustomException(ErrorType.INVALID_OPERATION, "Laboratório ou professor inexistente.")
+        except IntegrityError:
             raise CustomException(ErrorType.INVALID_OPERATION, "Já existe um agendamento para o mesmo laboratório e horário.")
+        return agendamento_id
 
-    def fazer_agendamento(self, agendamento):
-        horario_inicio = datetime.strptime(agendamento.hora_inicio, "%H:%M").time()
-        horario_fim = datetime.strptime(agendamento.hora_fim, "%H:%M").time()
+    def create_em_lote(self, agendamentos, tarefas=()):
+        """Insere vários agendamentos em um único comando.
 
-        # Ajusta horários para considerar intervalo de 15 minutos
-        inicio_intervalo = (datetime.combine(datetime.today(), horario_inicio) - timedelta(minutes=15)).time()
-        fim_intervalo = (datetime.combine(datetime.today(), horario_fim) + timedelta(minutes=15)).time()
+        Linhas que violam a restrição de sobreposição (com o banco ou entre si) são
+        ignoradas pelo ON CONFLICT; retorna os ids na ordem recebida, com None
+        para as que não foram inseridas.
+        """
+        sql = """
+        INSERT INTO agendamentos (id_laboratorio, id_professor, data_agendamento, hora_inicio, hora_fim)
+        VALUES %s
+        ON CONFLICT DO NOTHING
+        RETURNING {COLUNAS}
+        """.format(COLUNAS=COLUNAS)
+        valores = [(a.id_laboratorio, a.id_professor, a.data_agendamento, a.hora_inicio, a.hora_fim)
+                   for a in agendamentos]
 
-        # Verifica se o horário especificado está disponível
-        if self.existe_agendamento_no_intervalo(agendamento.id_laboratorio, 
-                                                agendamento.data_agendamento, 
-                                                inicio_intervalo, fim_intervalo):
-            raise CustomException(ErrorType.INVALID_OPERATION, "O horário especificado não está disponível")
+        def inserir():
+            with self.database.connection() as conn:
+                with conn.cursor() as cursor:
+                    linhas = execute_values(
+                        cursor, sql, valores,
+                        template="(%s::bigint, %s::bigint, %s::date, %s::time, %s::time)",
+                        page_size=max(len(valores), 1),
+                        fetch=True
+                    )
+                    self._enfileirar(cursor, self._notificar(cursor, 'criado', linhas), tarefas)
+                    return linhas
 
-        agendamento_id = self.create(agendamento)
-        return {"id": agendamento_id, "mensagem": "Agendamento criado com sucesso."}
+        try:
+            inseridos = self._com_particao(inserir, [a.data_agendamento for a in agendamentos])
+        except IntegrityError:
+            raise CustomException(ErrorType.INVALID_OPERATION, "Laboratório ou professor inexistente.")
 
+        ids = {(id_laboratorio, data, hora_inicio): agendamento_id
+               for agendamento_id, id_laboratorio, _, data, hora_inicio, _, _ in inseridos}
+        # Cada id vai para a primeira entrada do horário; repetições no lote foram ignoradas pelo ON CONFLICT
+        return [ids.pop((a.id_laboratorio, a.data_agendamento, a.hora_inicio), None) for a in agendamentos]
+
+    def fazer_agendamento(self, agendamento, tarefas=()):
+        # Valida o formato dos horários; o conflito é detectado pelo banco em um único INSERT
+        datetime.strptime(agendamento.hora_inicio, "%H:%M")
+        datetime.strptime(agendamento.hora_fim, "%H:%M")
+
+        agendamento_id = self.create(agendamento, tarefas)
+        return {"id": agendamento_id, "mensagem": "Agendamento criado com sucesso."}
 
-    def existe_agendamento_no_intervalo(self, id_laboratorio, data, inicio, fim):
-        with self.database.connect() as conn:
-            with conn.cursor() as cursor:
-                sql = """
-                SELECT COUNT(*) FROM agendamentos 
-                WHERE id_laboratorio = %s 
-                AND data_agendamento = %s 
-                AND (hora_inicio < %s::time AND hora_fim > %s::time)
-                """
-                cursor.execute(sql, (id_laboratorio, data, fim, inicio))
-                return cursor.fetchone()[0] > 0
 
     def get_all(self):
-        with self.database.connect() as conn:
+        with self.database.connection(leitura=True) as conn:
             with conn.cursor() as cursor:
-                cursor.execute("SELECT * FROM agendamentos")
+                self.database.executar(cursor, TODOS)
                 return [Agendamento(*row) for row in cursor.fetchall()]
 
+    def _consulta_filtrada(self, colunas, id_professor=None, id_laboratorio=None, data_inicio=None, data_fim=None,
+                           after_id=None, limit=None):
+        condicoes = []
+        params = []
+        if id_professor is not None:
+            condicoes.append("id_professor = %s")
+            params.append(id_professor)
+        if id_laboratorio is not None:
+            condicoes.append("id_laboratorio = %s")
+            params.append(id_laboratorio)
+        if data_inicio is not None:
+            condicoes.append("data_agendamento >= %s")
+            params.append(data_inicio)
+        if data_fim is not None:
+            condicoes.append("data_agendamento <= %s")
+            params.append(data_fim)
+        if after_id is not None:
+            condicoes.append("id > %s")
+            params.append(after_id)
+
+        sql = f"SELECT {colunas} FROM agendamentos"
+        if condicoes:
+            sql += " WHERE " + " AND ".join(condicoes)
+        sql += " ORDER BY id"
+        if limit is not None:
+            sql += " LIMIT %s"
+            params.append(limit)
+        return sql, params
+
+    def _iter_cursor(self, sql, params, chunk_size, leitura):
+        with self.database.connection(leitura=leitura) as conn:
+            with conn.cursor(name="agendamentos_stream") as cursor:
+                cursor.itersize = chunk_size
+                cursor.execute(sql, params)
+                yield from cursor
+
+    def iter_filtrados(self, chunk_size=500, primario=False, **filtros):
+        """Percorre os agendamentos filtrados em ordem de id, sem materializar a tabela.
+
+        Os filtros são aplicados no SQL (aproveitando os índices por professor/laboratório
+        e data), a paginação é por chave (`id > after_id`) e as linhas chegam em blocos
+        de `chunk_size` através de um cursor nomeado no servidor. Lê de uma réplica,
+        salvo com `primario=True`.
+        """
+        sql, params = self._consulta_filtrada(COLUNAS, **filtros)
+        for row in self._iter_cursor(sql, params, chunk_size, leitura=not primario):
+            yield Agendamento(*row)
+
+    def iter_json_filtrados(self, chunk_size=500, **filtros):
+        # Igual a iter_filtrados, mas cada linha já vem serializada em JSON pelo PostgreSQL
+        sql, params = self._consulta_filtrada(JSON_AGENDAMENTO, **filtros)
+        for row in self._iter_cursor(sql, params, chunk_size, leitura=True):
+            yield row[0]
+
+    def mudancas_desde(self, seq, limit):
+        # Usa a chave primária em seq: o custo depende do número de mudanças, não do tamanho da tabela
+        with self.database.connection(leitura=True) as conn:
+            with conn.cursor() as cursor:
+                self.database.executar(cursor, MUDANCAS_DESDE, (seq, limit))
+                return cursor.fetchall()
+
     def get_by_id(self, agendamento_id):
-        with self.database.connect() as conn:
+        with self.database.connection(leitura=True) as conn:
             with conn.cursor() as cursor:
-                cursor.execute("SELECT * FROM agendamentos WHERE id = %s", (agendamento_id,))
+                self.database.executar(cursor, POR_ID, (agendamento_id, agendamento_id))
                 agendamento = cursor.fetchone()
                 if not agendamento:
                     raise CustomException(ErrorType.NOT_FOUND, f"Agendamento with id {agendamento_id} not found")
                 return Agendamento(*agendamento)
 
-    def update(self, agendamento):
-        with self.database.connect() as conn:
-            with conn.cursor() as cursor:
-                sql = """
-                UPDATE agendamentos SET id_laboratorio = %s, id_professor = %s, data_agendamento = %s, hora_inicio = %s, hora_fim = %s
-                WHERE id = %s
-                """
-                cursor.execute(sql, (agendamento.id_laboratorio, agendamento.id_professor, agendamento.data_agendamento, agendamento.hora_inicio, agendamento.hora_fim, agendamento.id))
-                conn.commit()
+    def update(self, agendamento, tarefas=()):
+        def atualizar():
+            with self.database.connection() as conn:
+                with conn.cursor() as cursor:
+                    self.database.executar(cursor, ATUALIZAR, (agendamento.id_laboratorio, agendamento.id_professor, agendamento.data_agendamento, agendamento.hora_inicio, agendamento.hora_fim,
+                                                               agendamento.id, agendamento.id, agendamento.id))
+                    linhas = cursor.fetchall()
+                    if not linhas:
+                        raise CustomException(ErrorType.NOT_FOUND, f"Agendamento with id {agendamento.id} not found")
+                    eventos = self._notificar(cursor, 'atualizado', [linha[:7] for linha in linhas],
+                                              [linha[7:] for linha in linhas])
+                    self._enfileirar(cursor, eventos, tarefas)
+                    conn.commit()
+
+        try:
+            self._com_particao(atualizar, [agendamento.data_agendamento])
+        except errors.ExclusionViolation:
+            raise CustomException(ErrorType.INVALID_OPERATION, "O horário especificado não está disponível")
+        except errors.ForeignKeyViolation:
+            raise CustomException(ErrorType.INVALID_OPERATION, "Laboratório ou professor inexistente.")
 
-    def delete(self, agendamento_id):
-        with self.database.connect() as conn:
+    def delete(self, agendamento_id, tarefas=()):
+        with self.database.connection() as conn:
             with conn.cursor() as cursor:
-                cursor.execute("DELETE FROM agendamentos WHERE id = %s", (agendamento_id,))
-                if cursor.rowcount == 0:
+                self.database.executar(cursor, REMOVER, (agendamento_id, agendamento_id))
+                linhas = cursor.fetchall()
+                if not linhas:
                     raise CustomException(ErrorType.NOT_FOUND, f"Agendamento with id {agendamento_id} not found")
+                self._enfileirar(cursor, self._notificar(cursor, 'removido', linhas), tarefas)
                 conn.commit()
@@ -0,0 +1,167 @@
+from datetime import date, datetime, time
+
+import asyncpg
+
+from src.repository.ouvinte_notificacoes import CANAL_AGENDAMENTOS, evento_agendamento, sql_evento
+from src.repository.particao_repository import MESES_A_FRENTE, inicio_do_mes, somar_meses
+from src.models.agendamento_model import Agendamento
+from src.exceptions.custom_exception import CustomException
+from src.enums.enum import ErrorType
+
+COLUNAS = "id, id_laboratorio, id_professor, data_agendamento, hora_inicio, hora_fim, criado_em"
+# Leva o predicado de data às consultas por id, para que só a partição do mês seja lida
+DATA_POR_ID = "(SELECT data_agendamento FROM agendamentos_datas WHERE id = $1)"
+
+
+def _para_data(valor):
+    return valor if isinstance(valor, date) else datetime.strptime(valor, '%Y-%m-%d').date()
+
+
+def _para_hora(valor):
+    return valor if isinstance(valor, time) else datetime.strptime(valor, '%H:%M').time()
+
+
+class AsyncAgendamentoRepository:
+    """Versão asyncpg do `AgendamentoRepository` (mesmas consultas e erros)."""
+
+    def __init__(self, database):
+        self.database = database
+
+    async def _notificar(self, conn, operacao, linhas, anteriores=None):
+        # Entregue no commit da transação aberta por `connection()`
+        eventos = [evento_agendamento(operacao, tuple(linha), anteriores[indice] if anteriores else None)
+                   for indice, linha in enumerate(linhas)]
+        if eventos:
+            await conn.execute("SELECT pg_notify($1, evento) FROM unnest($2::text[]) AS evento",
+                               CANAL_AGENDAMENTOS, eventos)
+        return eventos
+
+    async def _enfileirar(self, conn, eventos, tarefas):
+        # Mesma outbox do modo WSGI, sem o usuário da requisição
+        if eventos and tarefas:
+            await conn.execute(
+                """
+                INSERT INTO tarefas (tipo, dados)
+                SELECT t.tipo, e.evento::jsonb || jsonb_build_object('por', NULL::text, 'ocorrido_em', now())
+                FROM unnest($1::text[]) AS e(evento) CROSS JOIN unnest($2::text[]) AS t(tipo)
+                """,
+                eventos, list(tarefas))
+
+    async def garantir_particoes(self, meses_a_frente=MESES_A_FRENTE):
+        mes = inicio_do_mes(date.today())
+        async with self.database.connection() as conn:
+            for deslocamento in range(meses_a_frente + 1):
+                await conn.fetchval("SELECT criar_particao_agendamentos($1)", somar_meses(mes, deslocamento))
+
+    def _valores(self, agendamento):
+        # O asyncpg exige tipos Python nativos nos parâmetros
+        return (int(agendamento.id_laboratorio), int(agendamento.id_professor),
+                _para_data(agendamento.data_agendamento),
+                _para_hora(agendamento.hora_inicio), _para_hora(agendamento.hora_fim))
+
+    async def create(self, agendamento, tarefas=()):
+        try:
+            async with self.database.connection() as conn:
+                # Mesmo comando único do modo WSGI: INSERT, outbox e NOTIFY
+                linha = await conn.fetchrow(
+                    f"""
+                    WITH novo AS (
+                        INSERT INTO agendamentos (id_laboratorio, id_professor, data_agendamento, hora_inicio, hora_fim)
+                        VALUES ($1, $2, $3, $4, $5) RETURNING {COLUNAS}
+                    ), evento AS MATERIALIZED (
+                        SELECT {COLUNAS}, {sql_evento('criado')} AS evento FROM novo
+                    ), enfileiradas AS (
+                        INSERT INTO tarefas (tipo, dados)
+                        SELECT t.tipo, e.evento::jsonb || jsonb_build_object('por', NULL::text, 'ocorrido_em', now())
+                        FROM evento e CROSS JOIN unnest($6::text[]) AS t(tipo)
+                    )
+                    SELECT {COLUNAS}, pg_notify($7, evento) FROM evento
+                    """,
+                    *self._valores(agendamento), list(tarefas or ()), CANAL_AGENDAMENTOS
+                )
+                agendamento_id = linha['id']
+        except asyncpg.ExclusionViolationError:
+            raise CustomException(ErrorType.INVALID_OPERATION, "O horário especificado não está disponível")
+        except asyncpg.ForeignKeyViolationError:
+            raise CustomException(ErrorType.INVALID_OPERATION, "Laboratório ou professor inexistente.")
+        except asyncpg.CheckViolationError as e:
+            if e.constraint_name is None:
+                raise CustomException(ErrorType.INVALID_OPERATION, "Não há partição de agendamentos para a data informada.")
+            raise CustomException(ErrorType.INVALID_OPERATION, "Já existe um agendamento para o mesmo laboratório e horário.")
+        except asyncpg.IntegrityConstraintViolationError:
+            raise CustomException(ErrorType.INVALID_OPERATION, "Já existe um agendamento para o mesmo laboratório e horário.")
+        return agendamento_id
+
+    async def fazer_agendamento(self, agendamento, tarefas=()):
+        agendamento_id = await self.create(agendamento, tarefas)
+        return {"id": agendamento_id, "mensagem": "Agendamento criado com sucesso."}
+
+    async def iter_filtrados(self, id_professor=None, id_laboratorio=None, data_inicio=None, data_fim=None,
+                             after_id=None, limit=None, chunk_size=500):
+        condicoes = []
+        params = []
+        for coluna, operador, valor in (('id_professor', '=', id_professor),
+                                        ('id_laboratorio', '=', id_laboratorio),
+                                        ('data_agendamento', '>=', data_inicio),
+                                        ('data_agendamento', '<=', data_fim),
+                                        ('id', '>', after_id)):
+            if valor is not None:
+                params.append(valor)
+                condicoes.append(f"{coluna} {operador} ${len(params)}")
+
+        sql = f"SELECT {COLUNAS} FROM agendamentos"
+        if condicoes:
+            sql += " WHERE " + " AND ".join(condicoes)
+        sql += " ORDER BY id"
+        if limit is not None:
+            params.append(limit)
+            sql += f" LIMIT ${len(params)}"
+
+        async with self.database.connection() as conn:
+            async for row in conn.cursor(sql, *params, prefetch=chunk_size):
+                yield Agendamento(*row)
+
+    async def get_by_id(self, agendamento_id):
+        async with self.database.connection() as conn:
+            row = await conn.fetchrow(f"SELECT {COLUNAS} FROM agendamentos WHERE id = $1 AND data_agendamento = {DATA_POR_ID}",
+                                      agendamento_id)
+        if not row:
+            raise CustomException(ErrorType.NOT_FOUND, f"Agendamento with id {agendamento_id} not found")
+        return Agendamento(*row)
+
+    async def update(self, agendamento, tarefas=()):
+        try:
+            async with self.database.connection() as conn:
+                linhas = await conn.fetch(
+                    """
+                    UPDATE agendamentos a SET id_laboratorio = $1, id_professor = $2, data_agendamento = $3, hora_inicio = $4, hora_fim = $5
+                    FROM agendamentos antigo
+                    WHERE a.id = $6 AND a.data_agendamento = (SELECT data_agendamento FROM agendamentos_datas WHERE id = $6)
+                    AND antigo.id = a.id AND antigo.data_agendamento = (SELECT data_agendamento FROM agendamentos_datas WHERE id = $6)
+                    RETURNING a.id, a.id_laboratorio, a.id_professor, a.data_agendamento, a.hora_inicio, a.hora_fim, a.criado_em,
+                              antigo.id_laboratorio, antigo.data_agendamento
+                    """,
+                    *self._valores(agendamento), int(agendamento.id)
+                )
+                if not linhas:
+                    raise CustomException(ErrorType.NOT_FOUND, f"Agendamento with id {agendamento.id} not found")
+                eventos = await self._notificar(conn, 'atualizado', [tuple(linha)[:7] for linha in linhas],
+                                                [tuple(linha)[7:] for linha in linhas])
+                await self._enfileirar(conn, eventos, tarefas)
+        except asyncpg.ExclusionViolationError:
+            raise CustomException(ErrorType.INVALID_OPERATION, "O horário especificado não está disponível")
+        except asyncpg.ForeignKeyViolationError:
+            raise CustomException(ErrorType.INVALID_OPERATION, "Laboratório ou professor inexistente.")
+        except asyncpg.CheckViolationError as e:
+            if e.constraint_name is not None:
+                raise
+            raise CustomException(ErrorType.INVALID_OPERATION, "Não há partição de agendamentos para a data informada.")
+
+    async def delete(self, agendamento_id, tarefas=()):
+        async with self.database.connection() as conn:
+            linhas = await conn.fetch(
+                f"DELETE FROM agendamentos WHERE id = $1 AND data_agendamento = {DATA_POR_ID} RETURNING {COLUNAS}",
+                agendamento_id)
+            await self._enfileirar(conn, await self._notificar(conn, 'removido', linhas), tarefas)
+        if not linhas:
+            raise CustomException(ErrorType.NOT_FOUND, f"Agendamento with id {agendamento_id} not found")
@@ -0,0 +1,105 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import asyncpg
+
+from src.exceptions.custom_exception import CustomException
+from src.enums.enum import ErrorType
+
+
+class AsyncDatabase:
+    """Pool de conexões asyncpg para o modo ASGI.
+
+    Espelha as opções do `Database` síncrono: tamanho mínimo/máximo, tempo
+    limite para obter conexão e reciclagem por número de usos e por ociosidade.
+    """
+
+    def __init__(self, dbname=None, user=None, password=None, host=None, port=5432, minconn=1, maxconn=10,
+                 timeout=30.0, max_uses=1000, max_age=3600.0, credenciais=None):
+        self.credenciais = credenciais
+        self.dbname = dbname
+        self.user = user
+        self.password = password
+        self.host = host
+        self.port = port
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self.pool = None
+        self._acquires = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+
+    async def open(self):
+        if self.pool is None:
+            if self.credenciais is not None:
+                credenciais = self.credenciais.get()
+                self.dbname = credenciais['dbname']
+                self.user = credenciais['username']
+                self.password = credenciais['password']
+                self.host = credenciais['host']
+                self.port = credenciais.get('port', 5432)
+            self.pool = await asyncpg.create_pool(
+                database=self.dbname,
+                user=self.user,
+                password=self.password,
+                host=self.host,
+                port=self.port,
+                min_size=self.minconn,
+                max_size=self.maxconn,
+                max_queries=self.max_uses,
+                max_inactive_connection_lifetime=self.max_age
+            )
+
+    async def connect(self):
+        # Conexão avulsa, fora do pool (usada pelo LISTEN)
+        await self.open()
+        return await asyncpg.connect(database=self.dbname, user=self.user, password=self.password,
+                                     host=self.host, port=self.port)
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    @asynccontextmanager
+    async def connection(self):
+        """Empresta uma conexão do pool dentro de uma transação."""
+        if self.pool is None:
+            await self.open()
+        inicio = time.monotonic()
+        esperou = self.pool.get_idle_size() == 0 and self.pool.get_size() >= self.maxconn
+        try:
+            conn = await self.pool.acquire(timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self._timeouts += 1
+            raise CustomException(ErrorType.SERVICE_UNAVAILABLE,
+                                  "Tempo esgotado aguardando uma conexão com o banco de dados.")
+        self._acquires += 1
+        if esperou:
+            self._waits += 1
+            self._wait_time += time.monotonic() - inicio
+        try:
+            async with conn.transaction():
+                yield conn
+        finally:
+            await self.pool.release(conn)
+
+    def pool_stats(self):
+        tamanho = self.pool.get_size() if self.pool is not None else 0
+        ociosas = self.pool.get_idle_size() if self.pool is not None else 0
+        return {
+            'min_size': self.minconn,
+            'max_size': self.maxconn,
+            'size': tamanho,
+            'in_use': tamanho - ociosas,
+            'idle': ociosas,
+            'acquires': self._acquires,
+            'waits': self._waits,
+            'wait_time_seconds': round(self._wait_time, 6),
+            'timeouts': self._timeouts,
+        }
@@ -0,0 +1,47 @@
+from src.models.professor_model import Professor
+from src.repository.professor_repository import COLUNAS, COLUNAS_PUBLICAS, professor_publico
+
+
+class AsyncProfessorRepository:
+    """Versão asyncpg do `ProfessorRepository`."""
+
+    def __init__(self, database):
+        self.database = database
+
+    async def create(self, professor):
+        async with self.database.connection() as conn:
+            professor_id = await conn.fetchval(
+                "INSERT INTO professores (nome, email, senha_hash) VALUES ($1, $2, $3) RETURNING id",
+                professor.nome, professor.email, professor.senha
+            )
+        return professor_id
+
+    async def get_all(self):
+        async with self.database.connection() as conn:
+            rows = await conn.fetch(f"SELECT {COLUNAS_PUBLICAS} FROM professores")
+        return [professor_publico(row) for row in rows]
+
+    async def get_by_id(self, professor_id):
+        async with self.database.connection() as conn:
+            row = await conn.fetchrow(f"SELECT {COLUNAS_PUBLICAS} FROM professores WHERE id = $1", professor_id)
+        return professor_publico(row) if row else None
+
+    async def get_by_email(self, email):
+        async with self.database.connection() as conn:
+            row = await conn.fetchrow(f"SELECT {COLUNAS} FROM professores WHERE email = $1", email)
+        return Professor(*row) if row else None
+
+    async def update(self, professor):
+        async with self.database.connection() as conn:
+            await conn.execute(
+                "UPDATE professores SET nome = $1, email = $2, senha_hash = $3 WHERE id = $4",
+                professor.nome, professor.email, professor.senha, professor.id
+            )
+
+    async def update_senha(self, professor_id, senha_hash):
+        async with self.database.connection() as conn:
+            await conn.execute("UPDATE professores SET senha_hash = $1 WHERE id = $2", senha_hash, professor_id)
+
+    async def delete(self, professor_id):
+        async with self.database.connection() as conn:
+            await conn.execute("DELETE FROM professores WHERE id = $1", professor_id)
@@ -0,0 +1,110 @@
+import threading
+import time
+
+from psycopg2 import errors, extensions
+
+
+class ConexaoPreparada(extensions.connection):
+    """Conexão que lembra quais comandos já foram preparados nela."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.preparadas = set()
+
+
+class Consulta:
+    """Comando SQL nomeado, escrito com %s como no resto dos repositórios.
+
+    Na primeira execução em cada conexão vira um `PREPARE nome AS ...` e, daí
+    em diante, só `EXECUTE nome(...)` é enviado: o texto não é reanalisado e o
+    PostgreSQL pode reaproveitar o plano.
+    """
+
+    __slots__ = ('nome', 'sql', 'sql_prepare', 'sql_execute')
+
+    def __init__(self, nome, sql):
+        self.nome = nome
+        self.sql = sql
+        partes = sql.split('%s')
+        quantidade = len(partes) - 1
+        self.sql_prepare = f"PREPARE {nome} AS " + ''.join(
+            parte + (f"${indice + 1}" if indice < quantidade else '') for indice, parte in enumerate(partes))
+        self.sql_execute = f"EXECUTE {nome}" + (f"({', '.join(['%s'] * quantidade)})" if quantidade else '')
+
+
+class _Estatistica:
+    __slots__ = ('execucoes', 'preparacoes', 'erros', 'total', 'maximo')
+
+    def __init__(self):
+        self.execucoes = 0
+        self.preparacoes = 0
+        self.erros = 0
+        self.total = 0.0
+        self.maximo = 0.0
+
+
+class RegistroConsultas:
+    """Executa `Consulta`s e acumula contagem e tempo por comando."""
+
+    def __init__(self, preparar=True, metrics=None):
+        self.preparar = preparar
+        self._lock = threading.Lock()
+        self._estatisticas = {}
+        self._duracao = None
+        if metrics is not None:
+            self._duracao = metrics.histogram('db_statement_duration_seconds', 'Duração de cada comando SQL nomeado')
+
+    def executar(self, cursor, consulta, params=()):
+        preparadas = getattr(cursor.connection, 'preparadas', None)
+        preparou = False
+        inicio = time.perf_counter()
+        try:
+            if not self.preparar or preparadas is None:
+                cursor.execute(consulta.sql, params)
+            else:
+                if consulta.nome not in preparadas:
+                    cursor.execute(consulta.sql_prepare)
+                    preparadas.add(consulta.nome)
+                    preparou = True
+                cursor.execute(consulta.sql_execute, params)
+        except errors.InvalidSqlStatementName:
+            # O comando sumiu da sessão: prepara de novo na próxima execução
+            preparadas.discard(consulta.nome)
+            self._registrar(consulta.nome, time.perf_counter() - inicio, preparou, erro=True)
+            raise
+        except errors.DuplicatePreparedStatement:
+            preparadas.add(consulta.nome)
+            self._registrar(consulta.nome, time.perf_counter() - inicio, preparou, erro=True)
+            raise
+        except Exception:
+            self._registrar(consulta.nome, time.perf_counter() - inicio, preparou, erro=True)
+            raise
+        self._registrar(consulta.nome, time.perf_counter() - inicio, preparou)
+        return cursor
+
+    def _registrar(self, nome, duracao, preparou, erro=False):
+        with self._lock:
+            estatistica = self._estatisticas.get(nome)
+            if estatistica is None:
+                estatistica = self._estatisticas[nome] = _Estatistica()
+            estatistica.execucoes += 1
+            estatistica.preparacoes += preparou
+            estatistica.erros += erro
+            estatistica.total += duracao
+            estatistica.maximo = max(estatistica.maximo, duracao)
+        if self._duracao is not None:
+            self._duracao.observe(duracao, statement=nome)
+
+    def stats(self):
+        with self._lock:
+            return {
+                nome: {
+                    'execucoes': e.execucoes,
+                    'preparacoes': e.preparacoes,
+                    'erros': e.erros,
+                    'total_ms': round(e.total * 1000, 3),
+                    'media_ms': round(e.total / e.execucoes * 1000, 4) if e.execucoes else 0.0,
+                    'max_ms': round(e.maximo * 1000, 3),
+                }
+                for nome, e in sorted(self._estatisticas.items())
+            }
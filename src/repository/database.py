@@ -1,16 +1,449 @@
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
 import psycopg2
+from psycopg2 import extensions
+
+from src.cache.cache import TTLCache
+from src.repository.consultas import ConexaoPreparada, RegistroConsultas
+from src.exceptions.custom_exception import CustomException
+from src.enums.enum import ErrorType
+
+logger = logging.getLogger(__name__)
+
+
+class SlowQueryCursor(extensions.cursor):
+    """Cursor que registra consultas lentas sem expor os valores dos parâmetros."""
+
+    limite = 0.5
+
+    def execute(self, query, vars=None):
+        inicio = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            duracao = time.perf_counter() - inicio
+            if duracao >= self.limite:
+                texto = query.decode('utf-8', 'replace') if isinstance(query, bytes) else str(query)
+                quantidade = len(vars) if vars is not None else 0
+                logger.warning("Consulta lenta (%.1f ms, %d parâmetros ocultados): %s",
+                               duracao * 1000, quantidade, ' '.join(texto.split()))
+
+
+class _PooledConnection:
+    def __init__(self, conn):
+        self.conn = conn
+        self.criado_em = time.monotonic()
+        self.ultimo_uso = self.criado_em
+        self.usos = 0
+
+
+class ConnectionPool:
+    """Pool de conexões limitado e thread-safe.
+
+    As conexões são reaproveitadas entre requisições, validadas na retirada
+    e recicladas depois de `max_uses` usos ou `max_age` segundos de vida.
+    """
+
+    def __init__(self, factory, minconn=1, maxconn=10, timeout=30.0,
+                 max_uses=1000, max_age=3600.0, health_check_after=30.0):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("Configuração de pool inválida: 0 <= minconn <= maxconn e maxconn >= 1")
+        self._factory = factory
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self.health_check_after = health_check_after
+
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._total = 0
+        self._in_use = 0
+        self._closed = False
+
+        # Estatísticas
+        self._acquires = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._recycled = 0
+        self._discarded = 0
+
+    def open(self):
+        # Abre as conexões mínimas antecipadamente
+        with self._cond:
+            faltando = max(self.minconn - self._total, 0)
+            self._total += faltando
+        for aberta in range(faltando):
+            try:
+                pooled = self._new_connection()
+            except Exception:
+                # Devolve as vagas reservadas que não chegaram a ter conexão
+                with self._cond:
+                    self._total -= faltando - aberta
+                    self._cond.notify_all()
+                raise
+            with self._cond:
+                self._idle.append(pooled)
+                self._cond.notify()
+
+    def _new_connection(self):
+        pooled = _PooledConnection(self._factory())
+        with self._cond:
+            self._created += 1
+        return pooled
+
+    def _expired(self, pooled):
+        if self.max_uses and pooled.usos >= self.max_uses:
+            return True
+        if self.max_age and time.monotonic() - pooled.criado_em >= self.max_age:
+            return True
+        return False
+
+    def _healthy(self, pooled):
+        conn = pooled.conn
+        if conn.closed:
+            return False
+        if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        # Só faz o round trip de verificação se a conexão ficou ociosa por um tempo
+        if time.monotonic() - pooled.ultimo_uso < self.health_check_after:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    @staticmethod
+    def _close_quietly(pooled):
+        try:
+            pooled.conn.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        inicio = time.monotonic()
+        deadline = inicio + self.timeout
+        esperou = False
+        pooled = None
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise CustomException(ErrorType.DATABASE_ERROR, "O pool de conexões está fechado.")
+                if self._idle:
+                    pooled = self._idle.pop()
+                    break
+                if self._total < self.maxconn:
+                    self._total += 1
+                    break
+                if not esperou:
+                    self._waits += 1
+                    esperou = True
+                restante = deadline - time.monotonic()
+                if restante <= 0:
+                    self._timeouts += 1
+                    self._wait_time += time.monotonic() - inicio
+                    raise CustomException(ErrorType.SERVICE_UNAVAILABLE,
+                                          "Tempo esgotado aguardando uma conexão com o banco de dados.")
+                self._cond.wait(restante)
+            self._in_use += 1
+            self._acquires += 1
+            if esperou:
+                self._wait_time += time.monotonic() - inicio
+
+        try:
+            if pooled is not None and (self._expired(pooled) or not self._healthy(pooled)):
+                with self._cond:
+                    if self._expired(pooled):
+                        self._recycled += 1
+                    else:
+                        self._discarded += 1
+                self._close_quietly(pooled)
+                pooled = None
+            if pooled is None:
+                pooled = self._new_connection()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._total -= 1
+                self._cond.notify()
+            raise
+
+        pooled.usos += 1
+        return pooled
+
+    def release(self, pooled, discard=False):
+        pooled.ultimo_uso = time.monotonic()
+        if not discard and (pooled.conn.closed or self._expired(pooled)):
+            discard = True
+        with self._cond:
+            self._in_use -= 1
+            if discard or self._closed:
+                self._total -= 1
+                self._discarded += 1
+            else:
+                self._idle.append(pooled)
+            self._cond.notify()
+        if discard or self._closed:
+            self._close_quietly(pooled)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            ociosas = list(self._idle)
+            self._idle.clear()
+            self._total -= len(ociosas)
+            self._cond.notify_all()
+        for pooled in ociosas:
+            self._close_quietly(pooled)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'min_size': self.minconn,
+                'max_size': self.maxconn,
+                'size': self._total,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'acquires': self._acquires,
+                'waits': self._waits,
+                'wait_time_seconds': round(self._wait_time, 6),
+                'timeouts': self._timeouts,
+                'created': self._created,
+                'recycled': self._recycled,
+                'discarded': self._discarded,
+            }
+
+
+# Atraso de replicação em segundos; 0 quando a réplica já aplicou tudo o que recebeu (ou é o primário)
+SQL_ATRASO_REPLICA = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+
+class _Replica:
+    def __init__(self, host, port, pool):
+        self.host = host
+        self.port = port
+        self.pool = pool
+        self.saudavel = True
+        self.atraso = 0.0
+        self.verificado_em = 0.0
+        self.falhas = 0
+
+    def stats(self):
+        stats = self.pool.stats()
+        stats.update({'host': self.host, 'port': self.port, 'saudavel': self.saudavel,
+                      'atraso_segundos': round(self.atraso, 3), 'falhas': self.falhas})
+        return stats
+
 
 class Database:
-    def __init__(self, dbname, user, password, host):
+    """Pool do primário e, opcionalmente, pools de réplicas de leitura.
+
+    Só os métodos que pedem `connection(leitura=True)` vão para as réplicas,
+    em rodízio entre as saudáveis com atraso até `max_atraso` segundos. Depois
+    de `registrar_escrita()`, a sessão atual lê do primário por
+    `janela_escrita` segundos, para enxergar o que acabou de gravar.
+    """
+
+    sessao = ContextVar('sessao_banco', default=None)
+    # Réplica escolhida na requisição atual (False = primário), para que todas as leituras
+    # dela, como a versão da tabela e o corpo da listagem, venham do mesmo servidor
+    replica_fixa = ContextVar('replica_fixa', default=None)
+
+    def __init__(self, dbname=None, user=None, password=None, host=None, port=5432, minconn=1, maxconn=10,
+                 timeout=30.0, max_uses=1000, max_age=3600.0, credenciais=None, metrics=None,
+                 slow_query_ms=None, preparar=True, replicas=None, max_atraso=5.0, janela_escrita=5.0,
+                 escritas_recentes=None, intervalo_verificacao=5.0):
         self.dbname = dbname
         self.user = user
         self.password = password
         self.host = host
+        self.port = port
+        # Provedor opcional (src.secret.credentials) consultado só na hora de conectar
+        self.credenciais = credenciais
+        self.cursor_factory = None
+        if slow_query_ms:
+            self.cursor_factory = type('SlowQueryCursor', (SlowQueryCursor,), {'limite': slow_query_ms / 1000})
+        # Comandos nomeados dos repositórios, preparados uma vez por conexão
+        self.consultas = RegistroConsultas(preparar=preparar, metrics=metrics)
+        self._aquisicao = None
+        if metrics is not None:
+            self._aquisicao = metrics.histogram('db_connection_acquire_seconds',
+                                                'Tempo para obter uma conexão do pool')
+            metrics.gauge_callback('db_pool', 'Estado do pool de conexões', self.pool_stats)
+        self.pool = ConnectionPool(self.connect, minconn=minconn, maxconn=maxconn, timeout=timeout,
+                                   max_uses=max_uses, max_age=max_age)
+
+        # Réplicas: lista de (host, porta); usam as mesmas credenciais do primário
+        self.max_atraso = max_atraso
+        self.janela_escrita = janela_escrita
+        self.intervalo_verificacao = intervalo_verificacao
+        self.replicas = [
+            _Replica(host_replica, porta_replica, ConnectionPool(
+                lambda h=host_replica, p=porta_replica: self.connect(h, p), minconn=0, maxconn=maxconn,
+                timeout=min(timeout, 5.0), max_uses=max_uses, max_age=max_age))
+            for host_replica, porta_replica in (replicas or ())
+        ]
+        self._rodizio = itertools.count()
+        self._lock_replicas = threading.Lock()
+        # Qualquer Cache serve; com o RedisCache a janela vale entre processos
+        self.escritas_recentes = escritas_recentes or TTLCache(max_itens=10000, ttl=janela_escrita)
+
+    def _parametros(self, host=None, port=None):
+        if self.credenciais is None:
+            parametros = dict(dbname=self.dbname, user=self.user, password=self.password, host=self.host, port=self.port)
+        else:
+            credenciais = self.credenciais.get()
+            parametros = dict(dbname=credenciais['dbname'], user=credenciais['username'],
+                              password=credenciais['password'], host=credenciais['host'],
+                              port=credenciais.get('port', 5432))
+        if host is not None:
+            parametros['host'] = host
+            parametros['port'] = port or parametros['port']
+        if self.cursor_factory is not None:
+            parametros['cursor_factory'] = self.cursor_factory
+        parametros['connection_factory'] = ConexaoPreparada
+        return parametros
+
+    def connect(self, host=None, port=None):
+        # Abre uma conexão nova (no primário, salvo host/port); os repositórios devem usar `connection()`
+        try:
+            return psycopg2.connect(**self._parametros(host, port))
+        except psycopg2.OperationalError:
+            # A senha pode ter sido rotacionada: busca as credenciais de novo e tenta uma vez
+            if self.credenciais is None or not hasattr(self.credenciais, 'invalidate'):
+                raise
+            self.credenciais.invalidate()
+            return psycopg2.connect(**self._parametros(host, port))
+
+    def registrar_escrita(self):
+        # Abre a janela de leitura no primário para a sessão atual
+        sessao = self.sessao.get()
+        if sessao is not None and self.replicas:
+            self.escritas_recentes.set(f'escrita_recente:{sessao}', True, self.janela_escrita)
+
+    def _escreveu_recentemente(self):
+        sessao = self.sessao.get()
+        if sessao is None:
+            return False
+        encontrado, _ = self.escritas_recentes.get(f'escrita_recente:{sessao}')
+        return encontrado
+
+    def _verificar_replica(self, replica):
+        pooled = None
+        try:
+            pooled = replica.pool.acquire()
+            with pooled.conn.cursor() as cursor:
+                cursor.execute(SQL_ATRASO_REPLICA)
+                replica.atraso = float(cursor.fetchone()[0])
+            pooled.conn.rollback()
+            replica.pool.release(pooled)
+            replica.saudavel = replica.atraso <= self.max_atraso
+        except Exception as e:
+            if pooled is not None:
+                replica.pool.release(pooled, discard=True)
+            replica.saudavel = False
+            replica.falhas += 1
+            logger.warning("Réplica %s:%s indisponível: %s", replica.host, replica.port, e)
+        replica.verificado_em = time.monotonic()
+
+    def _escolher_replica(self):
+        if not self.replicas:
+            return None
+        fixa = self.replica_fixa.get()
+        if fixa is not None:
+            if fixa is not False and fixa.saudavel:
+                return fixa
+            # Depois de ler do primário, não volta para uma réplica na mesma requisição
+            self.replica_fixa.set(False)
+            return None
+        replica = None if self._escreveu_recentemente() else self._proxima_replica()
+        self.replica_fixa.set(replica if replica is not None else False)
+        return replica
+
+    def _proxima_replica(self):
+        agora = time.monotonic()
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._rodizio) % len(self.replicas)]
+            if agora - replica.verificado_em >= self.intervalo_verificacao:
+                # Uma thread verifica; as demais usam o último resultado
+                if self._lock_replicas.acquire(blocking=False):
+                    try:
+                        self._verificar_replica(replica)
+                    finally:
+                        self._lock_replicas.release()
+            if replica.saudavel:
+                return replica
+        return None
+
+    @contextmanager
+    def connection(self, leitura=False):
+        """Empresta uma conexão do pool e a devolve ao sair do bloco.
+
+        Faz commit se o bloco terminar sem erro e rollback caso contrário.
+        Com `leitura=True` a conexão pode vir de uma réplica; se ela falhar,
+        o primário é usado.
+        """
+        inicio = time.perf_counter()
+        replica = self._escolher_replica() if leitura else None
+        pool = self.pool
+        if replica is not None:
+            try:
+                pooled = replica.pool.acquire()
+                pool = replica.pool
+            except Exception as e:
+                replica.saudavel = False
+                replica.falhas += 1
+                replica.verificado_em = time.monotonic()
+                logger.warning("Réplica %s:%s indisponível, lendo do primário: %s", replica.host, replica.port, e)
+                self.replica_fixa.set(False)
+                pooled = self.pool.acquire()
+        else:
+            pooled = self.pool.acquire()
+        if self._aquisicao is not None:
+            self._aquisicao.observe(time.perf_counter() - inicio)
+        conn = pooled.conn
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            discard = False
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+            pool.release(pooled, discard=discard)
+            raise
+        else:
+            pool.release(pooled)
+
+    def executar(self, cursor, consulta, params=()):
+        return self.consultas.executar(cursor, consulta, params)
+
+    def pool_stats(self):
+        stats = self.pool.stats()
+        if self.replicas:
+            stats['replicas'] = [replica.stats() for replica in self.replicas]
+        return stats
 
-    def connect(self):
-        return psycopg2.connect(
-            dbname=self.dbname,
-            user=self.user,
-            password=self.password,
-            host=self.host
-        )
+    def close(self):
+        self.pool.close()
+        for replica in self.replicas:
+            replica.pool.close()
@@ -0,0 +1,86 @@
+import csv
+import io
+
+# COPY não pode ser preparado: os comandos ficam fora do registro de Consultas
+TEMPORARIA_PROFESSORES = """
+    CREATE TEMP TABLE importacao_professores (linha INTEGER, nome TEXT, email TEXT, senha_hash TEXT) ON COMMIT DROP
+"""
+TEMPORARIA_LABORATORIOS = """
+    CREATE TEMP TABLE importacao_laboratorios (linha INTEGER, nome TEXT, capacidade INTEGER) ON COMMIT DROP
+"""
+# E-mails já cadastrados ficam fora do RETURNING e voltam como erro da linha
+INSERIR_PROFESSORES = """
+    INSERT INTO professores (nome, email, senha_hash)
+    SELECT nome, email, senha_hash FROM importacao_professores ORDER BY linha
+    ON CONFLICT (email) DO NOTHING
+    RETURNING id, email
+"""
+# Os ids são reservados antes do INSERT para devolver o par (linha, id); nomes já cadastrados
+# são ignorados, para que a mesma planilha possa ser importada de novo
+INSERIR_LABORATORIOS = """
+    WITH novos AS MATERIALIZED (
+        SELECT i.linha, i.nome, i.capacidade, nextval(pg_get_serial_sequence('laboratorios', 'id')) AS id
+        FROM importacao_laboratorios i
+        WHERE NOT EXISTS (SELECT 1 FROM laboratorios l WHERE l.nome = i.nome)
+    ), inseridos AS (
+        INSERT INTO laboratorios (id, nome, capacidade) SELECT id, nome, capacidade FROM novos
+    )
+    SELECT linha, id FROM novos
+"""
+
+EXPORTAR = {
+    'professores': "SELECT id, nome, email, criado_em FROM professores ORDER BY id",
+    'laboratorios': "SELECT id, nome, capacidade, criado_em FROM laboratorios ORDER BY id",
+    # Com o período na condição, só as partições dos meses pedidos são lidas
+    'agendamentos': """
+        SELECT id, id_laboratorio, id_professor, data_agendamento, hora_inicio, hora_fim, criado_em
+        FROM agendamentos
+        WHERE (%s::date IS NULL OR data_agendamento >= %s) AND (%s::date IS NULL OR data_agendamento <= %s)
+        ORDER BY data_agendamento, id
+    """,
+}
+
+
+def _buffer_csv(linhas):
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\n').writerows(linhas)
+    buffer.seek(0)
+    return buffer
+
+
+class ImportacaoRepository:
+    """Carga e exportação em massa com COPY.
+
+    Cada lote vai para uma tabela temporária com um único COPY e dela para a
+    tabela final com um INSERT ... SELECT, em uma transação por lote.
+    """
+
+    def __init__(self, database):
+        self.database = database
+
+    def _copiar(self, temporaria, tabela, linhas, inserir):
+        with self.database.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(temporaria)
+                cursor.copy_expert(f"COPY {tabela} FROM STDIN WITH (FORMAT csv)", _buffer_csv(linhas))
+                cursor.execute(inserir)
+                return cursor.fetchall()
+
+    def inserir_professores(self, linhas):
+        """Insere [(linha, nome, email, senha_hash)]; retorna {email: id} dos inseridos."""
+        return {email: professor_id for professor_id, email in
+                self._copiar(TEMPORARIA_PROFESSORES, 'importacao_professores', linhas, INSERIR_PROFESSORES)}
+
+    def inserir_laboratorios(self, linhas):
+        """Insere [(linha, nome, capacidade)]; retorna {linha: id} dos inseridos."""
+        return dict(self._copiar(TEMPORARIA_LABORATORIOS, 'importacao_laboratorios', linhas, INSERIR_LABORATORIOS))
+
+    def exportar(self, tabela, arquivo, de=None, ate=None):
+        """Escreve a tabela em CSV (com cabeçalho) em `arquivo`, à medida que o PostgreSQL envia."""
+        with self.database.connection(leitura=True) as conn:
+            with conn.cursor() as cursor:
+                sql = EXPORTAR[tabela]
+                if tabela == 'agendamentos':
+                    sql = cursor.mogrify(sql, (de, de, ate, ate)).decode('utf-8')
+                cursor.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER)", arquivo)
+                return cursor.rowcount
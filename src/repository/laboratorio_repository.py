@@ -0,0 +1,132 @@
+from src.models.laboratorio_model import Laboratorio
+from src.exceptions.custom_exception import CustomException
+from src.enums.enum import ErrorType
+from src.repository.consultas import Consulta
+
+COLUNAS = "id, nome, capacidade, criado_em"
+
+CRIAR = Consulta('laboratorio_criar', "INSERT INTO laboratorios (nome, capacidade) VALUES (%s, %s) RETURNING id")
+TODOS = Consulta('laboratorio_todos', f"SELECT {COLUNAS} FROM laboratorios ORDER BY id")
+POR_ID = Consulta('laboratorio_por_id', f"SELECT {COLUNAS} FROM laboratorios WHERE id = %s")
+POR_IDS = Consulta('laboratorio_por_ids', f"SELECT {COLUNAS} FROM laboratorios WHERE id = ANY(%s::bigint[])")
+ATUALIZAR = Consulta('laboratorio_atualizar', "UPDATE laboratorios SET nome = %s, capacidade = %s WHERE id = %s")
+REMOVER = Consulta('laboratorio_remover', "DELETE FROM laboratorios WHERE id = %s")
+# Anti-join de todos os laboratórios contra os agendamentos do dia, com a mesma regra da
+# restrição de exclusão (15 minutos de intervalo). Cada laboratório é verificado pelo
+# índice (id_laboratorio, data_agendamento) da partição do mês; o mais justo vem primeiro.
+LIVRES = Consulta('laboratorio_livres', f"""
+    SELECT {COLUNAS} FROM laboratorios l
+    WHERE l.capacidade >= %s
+    AND NOT EXISTS (
+        SELECT 1 FROM agendamentos a
+        WHERE a.id_laboratorio = l.id AND a.data_agendamento = %s
+        AND tsrange(a.data_agendamento + a.hora_inicio, a.data_agendamento + a.hora_fim + interval '15 minutes')
+            && tsrange(%s::date + %s::time, %s::date + %s::time + interval '15 minutes')
+    )
+    ORDER BY l.capacidade, l.id
+    LIMIT %s
+""")
+
+class LaboratorioRepository:
+    def __init__(self, database, cache=None):
+        self.database = database
+        self.cache = cache
+
+    def _invalidar(self, laboratorio_id=None):
+        if self.cache is None:
+            return
+        chaves = ['laboratorios:todos']
+        if laboratorio_id is not None:
+            chaves.append(f'laboratorio:{laboratorio_id}')
+        self.cache.invalidate(*chaves)
+
+    def create(self, laboratorio):
+        with self.database.connection() as conn:
+            with conn.cursor() as cursor:
+                self.database.executar(cursor, CRIAR, (laboratorio.nome, laboratorio.capacidade))
+                laboratorio_id = cursor.fetchone()[0]
+                conn.commit()
+        self._invalidar(laboratorio_id)
+        return laboratorio_id
+
+    def get_all(self, primario=False):
+        # primario=True: direto do primário, sem passar pelo cache
+        if self.cache is not None and not primario:
+            return self.cache.get_or_load('laboratorios:todos', self._get_all)
+        return self._get_all()
+
+    def _get_all(self):
+        # Carga do cache: lida do primário para não guardar dados de uma réplica atrasada
+        with self.database.connection() as conn:
+            with conn.cursor() as cursor:
+                self.database.executar(cursor, TODOS)
+                return [Laboratorio(*row) for row in cursor.fetchall()]
+
+    def get_by_id(self, laboratorio_id):
+        if self.cache is not None:
+            laboratorio = self.cache.get_or_load(f'laboratorio:{laboratorio_id}', lambda: self._get_by_id(laboratorio_id))
+        else:
+            laboratorio = self._get_by_id(laboratorio_id)
+        if laboratorio is None:
+            raise CustomException(ErrorType.NOT_FOUND, f"Laboratório com ID {laboratorio_id} não encontrado.")
+        return laboratorio
+
+    def _get_by_id(self, laboratorio_id):
+        with self.database.connection() as conn:
+            with conn.cursor() as cursor:
+                self.database.executar(cursor, POR_ID, (laboratorio_id,))
+                row = cursor.fetchone()
+                return Laboratorio(*row) if row else None
+
+    def get_by_ids(self, ids, primario=False):
+        """Laboratórios dos `ids` em uma única consulta, como dict id -> Laboratorio.
+
+        Os que já estão no cache não vão ao banco, salvo com `primario=True`, que lê
+        todos do primário; ids inexistentes ficam de fora.
+        """
+        ids = list(dict.fromkeys(ids))
+        if self.cache is None or primario:
+            return self._get_by_ids(ids)
+        chaves = {f'laboratorio:{laboratorio_id}': laboratorio_id for laboratorio_id in ids}
+        valores = self.cache.get_or_load_many(list(chaves), lambda faltando: {
+            f'laboratorio:{laboratorio_id}': laboratorio
+            for laboratorio_id, laboratorio in self._get_by_ids([chaves[chave] for chave in faltando]).items()
+        })
+        return {chaves[chave]: laboratorio for chave, laboratorio in valores.items() if laboratorio is not None}
+
+    def _get_by_ids(self, ids):
+        if not ids:
+            return {}
+        with self.database.connection() as conn:
+            with conn.cursor() as cursor:
+                self.database.executar(cursor, POR_IDS, (ids,))
+                return {row[0]: Laboratorio(*row) for row in cursor.fetchall()}
+
+    def livres(self, data, hora_inicio, hora_fim, min_capacidade=0, limit=None, primario=False):
+        """Laboratórios com ao menos `min_capacidade` lugares e sem agendamento no horário.
+
+        Uma única consulta para todos os laboratórios, em ordem de capacidade
+        (o menor que comporta a turma primeiro). Lê de uma réplica, salvo com `primario=True`.
+        """
+        with self.database.connection(leitura=not primario) as conn:
+            with conn.cursor() as cursor:
+                self.database.executar(cursor, LIVRES, (min_capacidade, data, data, hora_inicio, data, hora_fim, limit))
+                return [Laboratorio(*row) for row in cursor.fetchall()]
+
+    def update(self, laboratorio):
+        with self.database.connection() as conn:
+            with conn.cursor() as cursor:
+                self.database.executar(cursor, ATUALIZAR, (laboratorio.nome, laboratorio.capacidade, laboratorio.id))
+                if cursor.rowcount == 0:
+                    raise CustomException(ErrorType.NOT_FOUND, f"Laboratório com ID {laboratorio.id} não encontrado.")
+                conn.commit()
+        self._invalidar(laboratorio.id)
+
+    def delete(self, laboratorio_id):
+        with self.database.connection() as conn:
+            with conn.cursor() as cursor:
+                self.database.executar(cursor, REMOVER, (laboratorio_id,))
+                if cursor.rowcount == 0:
+                    raise CustomException(ErrorType.NOT_FOUND, f"Laboratório com ID {laboratorio_id} não encontrado.")
+                conn.commit()
+        self._invalidar(laboratorio_id)
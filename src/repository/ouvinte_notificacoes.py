@@ -0,0 +1,148 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+
+from src.models.agendamento_model import Agendamento
+from src.utils.utils import json_dumps
+
+logger = logging.getLogger(__name__)
+
+CANAL_AGENDAMENTOS = 'agendamentos'
+
+
+def evento_agendamento(operacao, linha, anterior=None):
+    """Texto JSON do evento de uma linha de agendamento (colunas na ordem do modelo).
+
+    `anterior` é o par (id_laboratorio, data) antes de uma atualização.
+    """
+    evento = Agendamento(*linha).to_dict()
+    evento['operacao'] = operacao
+    if anterior is not None:
+        evento['anterior'] = {'id_laboratorio': anterior[0], 'data_agendamento': anterior[1].isoformat()}
+    return json_dumps(evento)
+
+
+def sql_evento(operacao):
+    """Expressão SQL com o mesmo JSON de `evento_agendamento`, sobre as colunas de um agendamento."""
+    return f"""json_build_object(
+        'id', id, 'id_laboratorio', id_laboratorio, 'id_professor', id_professor,
+        'data_agendamento', data_agendamento,
+        'hora_inicio', to_char(hora_inicio, 'HH24:MI:SS'), 'hora_fim', to_char(hora_fim, 'HH24:MI:SS'),
+        'operacao', '{operacao}'
+    )::text"""
+
+
+class OuvinteNotificacoes:
+    """Uma única conexão LISTEN que repassa as notificações ao distribuidor.
+
+    Roda em uma thread própria, fora do pool, e reconecta com espera
+    crescente se a conexão cair.
+    """
+
+    def __init__(self, database, distribuidor, canal=CANAL_AGENDAMENTOS, espera_maxima=30.0):
+        self.database = database
+        self.distribuidor = distribuidor
+        self.canal = canal
+        self.espera_maxima = espera_maxima
+        self._parar = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def iniciar(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._executar, name=f'listen-{self.canal}', daemon=True)
+            self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+
+    def _executar(self):
+        espera = 1.0
+        while not self._parar.is_set():
+            try:
+                self._ouvir()
+                espera = 1.0
+            except Exception as e:
+                logger.error("Conexão LISTEN %s perdida: %s; reconectando em %.0fs", self.canal, e, espera)
+                self._parar.wait(espera)
+                espera = min(espera * 2, self.espera_maxima)
+
+    def _ouvir(self):
+        conn = self.database.connect()
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {self.canal}")
+            while not self._parar.is_set():
+                # Acorda periodicamente só para verificar se deve parar
+                if select.select([conn], [], [], 5.0) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notificacao = conn.notifies.pop(0)
+                    try:
+                        evento = json.loads(notificacao.payload)
+                    except ValueError:
+                        logger.warning("Notificação inválida no canal %s ignorada", self.canal)
+                        continue
+                    self.distribuidor.publicar(evento)
+        finally:
+            conn.close()
+
+
+class OuvinteNotificacoesAsync:
+    """Versão asyncpg do `OuvinteNotificacoes`, executada como tarefa no loop."""
+
+    def __init__(self, database, distribuidor, canal=CANAL_AGENDAMENTOS, espera_maxima=30.0):
+        self.database = database
+        self.distribuidor = distribuidor
+        self.canal = canal
+        self.espera_maxima = espera_maxima
+        self._tarefa = None
+
+    def iniciar(self):
+        if self._tarefa is None:
+            self._tarefa = asyncio.get_running_loop().create_task(self._executar())
+
+    async def parar(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+
+    def _receber(self, conn, pid, canal, payload):
+        try:
+            evento = json.loads(payload)
+        except ValueError:
+            logger.warning("Notificação inválida no canal %s ignorada", canal)
+            return
+        self.distribuidor.publicar(evento)
+
+    async def _executar(self):
+        espera = 1.0
+        while True:
+            conn = None
+            try:
+                conn = await self.database.connect()
+                perdida = asyncio.Event()
+                conn.add_termination_listener(lambda _: perdida.set())
+                await conn.add_listener(self.canal, self._receber)
+                espera = 1.0
+                await perdida.wait()
+                logger.error("Conexão LISTEN %s perdida; reconectando em %.0fs", self.canal, espera)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Conexão LISTEN %s falhou: %s; reconectando em %.0fs", self.canal, e, espera)
+            finally:
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+            await asyncio.sleep(espera)
+            espera = min(espera * 2, self.espera_maxima)
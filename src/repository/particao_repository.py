@@ -0,0 +1,139 @@
+import gzip
+import logging
+import os
+import re
+from datetime import date
+
+from src.repository.consultas import Consulta
+from src.exceptions.custom_exception import CustomException
+from src.enums.enum import ErrorType
+
+logger = logging.getLogger(__name__)
+
+# Partições criadas à frente do mês atual na inicialização e pelo comando de manutenção
+MESES_A_FRENTE = 12
+# Limite para a criação sob demanda, quando uma escrita cai em um mês sem partição
+MESES_MAXIMO = 24
+
+NOME_PARTICAO = re.compile(r'^agendamentos_(\d{4})_(\d{2})$')
+
+CRIAR = Consulta('particao_criar', "SELECT criar_particao_agendamentos(%s)")
+# Partições ligadas e tabelas de mês já desligadas (arquivamento interrompido)
+LISTAR = Consulta('particao_listar', r"""
+    SELECT c.relname, c.relispartition, c.reltuples::bigint, pg_total_relation_size(c.oid)
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = current_schema() AND c.relkind = 'r' AND c.relname ~ '^agendamentos_\d{4}_\d{2}$'
+    ORDER BY c.relname
+""")
+
+
+def inicio_do_mes(data):
+    if isinstance(data, str):
+        data = date.fromisoformat(data)
+    return data.replace(day=1)
+
+
+def somar_meses(mes, meses):
+    indice = mes.year * 12 + mes.month - 1 + meses
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+class ParticaoRepository:
+    """Partições mensais da tabela `agendamentos`.
+
+    Cria as partições dos meses seguintes e arquiva as antigas: cada partição
+    arquivada é desligada da tabela, exportada para um CSV comprimido e removida.
+    """
+
+    def __init__(self, database, versoes=None):
+        self.database = database
+        self.versoes = versoes
+
+    def garantir(self, meses_a_frente=MESES_A_FRENTE, inicio=None):
+        """Cria as partições de `inicio` (mês atual por padrão) até `meses_a_frente` meses depois."""
+        mes = inicio_do_mes(inicio or date.today())
+        with self.database.connection() as conn:
+            with conn.cursor() as cursor:
+                nomes = []
+                for deslocamento in range(meses_a_frente + 1):
+                    self.database.executar(cursor, CRIAR, (somar_meses(mes, deslocamento),))
+                    nomes.append(cursor.fetchone()[0])
+                conn.commit()
+        return nomes
+
+    def garantir_mes(self, data):
+        # Meses passados não são recriados aqui, para não reabrir um mês já arquivado
+        mes = inicio_do_mes(data)
+        atual = inicio_do_mes(date.today())
+        if not atual <= mes <= somar_meses(atual, MESES_MAXIMO):
+            raise CustomException(ErrorType.INVALID_OPERATION,
+                                  f"Agendamentos são aceitos apenas até {MESES_MAXIMO} meses à frente.")
+        logger.info("Criando sob demanda a partição de agendamentos de %s", mes.strftime('%Y-%m'))
+        return self.garantir(0, mes)[0]
+
+    def listar(self):
+        with self.database.connection() as conn:
+            with conn.cursor() as cursor:
+                self.database.executar(cursor, LISTAR)
+                linhas = cursor.fetchall()
+        particoes = []
+        for nome, ligada, linhas_estimadas, tamanho in linhas:
+            ano, mes = NOME_PARTICAO.match(nome).groups()
+            particoes.append({
+                'nome': nome,
+                'mes': f'{ano}-{mes}',
+                'ligada': ligada,
+                # reltuples é -1 em tabelas que ainda não passaram por ANALYZE
+                'linhas_estimadas': max(linhas_estimadas, 0),
+                'bytes': tamanho,
+            })
+        return particoes
+
+    def arquivar(self, antes_de, diretorio, remover=True):
+        """Arquiva as partições dos meses anteriores a `antes_de`.
+
+        Cada partição é desligada com DETACH ... CONCURRENTLY (sem bloquear as
+        leituras e escritas dos outros meses), exportada para
+        `diretorio/<partição>.csv.gz` e então removida, salvo com `remover=False`.
+        Tabelas já desligadas por uma execução interrompida são retomadas.
+        Os agendamentos arquivados saem da tabela sem gerar remoções no
+        registro de mudanças.
+        """
+        limite = inicio_do_mes(antes_de)
+        os.makedirs(diretorio, exist_ok=True)
+        arquivadas = []
+        for particao in self.listar():
+            ano, mes = particao['mes'].split('-')
+            if date(int(ano), int(mes), 1) >= limite:
+                continue
+            arquivadas.append(self._arquivar(particao['nome'], particao['ligada'], diretorio, remover))
+        return arquivadas
+
+    def _arquivar(self, nome, ligada, diretorio, remover):
+        caminho = os.path.join(diretorio, f'{nome}.csv.gz')
+        # DETACH CONCURRENTLY não roda dentro de transação: conexão própria em autocommit
+        conn = self.database.connect()
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                if ligada:
+                    cursor.execute(f'ALTER TABLE agendamentos DETACH PARTITION "{nome}" CONCURRENTLY')
+                # O trigger não dispara no DETACH; limpa o índice de datas pelos ids da partição
+                cursor.execute(f'DELETE FROM agendamentos_datas d USING "{nome}" p WHERE d.id = p.id')
+                # Nem o de versão: as listagens já não têm as linhas do mês, então a ETag precisa mudar.
+                # Também em uma execução retomada, caso a anterior tenha parado antes daqui
+                if self.versoes is not None:
+                    self.versoes.incrementar('agendamentos')
+
+                temporario = caminho + '.parcial'
+                with gzip.open(temporario, 'wb') as arquivo:
+                    cursor.copy_expert(f'COPY "{nome}" TO STDOUT WITH (FORMAT csv, HEADER)', arquivo)
+                os.replace(temporario, caminho)
+
+                if remover:
+                    cursor.execute(f'DROP TABLE "{nome}"')
+        finally:
+            conn.close()
+        logger.info("Partição %s arquivada em %s", nome, caminho)
+        return {'nome': nome, 'arquivo': caminho, 'bytes': os.path.getsize(caminho), 'removida': remover}
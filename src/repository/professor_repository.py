@@ -1,62 +1,160 @@
 from src.models.professor_model import Professor
+from src.repository.consultas import Consulta
+
+COLUNAS = "id, nome, email, senha_hash, criado_em"
+# Sem o hash da senha: o que vai para o cache (inclusive no Redis) e para as respostas
+COLUNAS_PUBLICAS = "id, nome, email, criado_em"
+
+CRIAR = Consulta('professor_criar', "INSERT INTO professores (nome, email, senha_hash) VALUES (%s, %s, %s) RETURNING id")
+TODOS = Consulta('professor_todos', f"SELECT {COLUNAS_PUBLICAS} FROM professores")
+TODOS_JSON = Consulta('professor_todos_json', """
+    SELECT coalesce(json_agg(json_build_object('id', id, 'nome', nome, 'email', email) ORDER BY id), '[]')::text
+    FROM professores
+""")
+POR_ID = Consulta('professor_por_id', f"SELECT {COLUNAS_PUBLICAS} FROM professores WHERE id = %s")
+POR_IDS = Consulta('professor_por_ids', f"SELECT {COLUNAS_PUBLICAS} FROM professores WHERE id = ANY(%s::bigint[])")
+POR_EMAIL = Consulta('professor_por_email', f"SELECT {COLUNAS} FROM professores WHERE email = %s")
+POR_CREDENCIAIS = Consulta('professor_por_credenciais',
+                           f"SELECT {COLUNAS} FROM professores WHERE email = %s AND senha_hash = %s")
+ATUALIZAR = Consulta('professor_atualizar', "UPDATE professores SET nome = %s, email = %s, senha_hash = %s WHERE id = %s")
+ATUALIZAR_SENHA = Consulta('professor_atualizar_senha', "UPDATE professores SET senha_hash = %s WHERE id = %s")
+REMOVER = Consulta('professor_remover', "DELETE FROM professores WHERE id = %s")
+
+def professor_publico(linha):
+    professor_id, nome, email, criado_em = linha
+    return Professor(professor_id, nome, email, criado_em=criado_em)
 
 class ProfessorRepository:
-    def __init__(self, database):
+    def __init__(self, database, cache=None):
         self.database = database
+        self.cache = cache
+
+    def _invalidar(self, professor_id=None, email=None):
+        if self.cache is None:
+            return
+        chaves = ['professores:todos']
+        if professor_id is not None:
+            chaves.append(f'professor:{professor_id}')
+        if email is not None:
+            chaves.append(f'email_inexistente:{email}')
+        self.cache.invalidate(*chaves)
 
     def create(self, professor):
-        with self.database.connect() as conn:
+        with self.database.connection() as conn:
             with conn.cursor() as cursor:
-                sql = "INSERT INTO professores (nome, email, senha_hash) VALUES (%s, %s, %s) RETURNING ID"
-                cursor.execute(sql, (professor.nome, professor.email, professor.senha))
+                self.database.executar(cursor, CRIAR, (professor.nome, professor.email, professor.senha))
                 conn.commit()
-                return cursor.fetchone()[0]
+                professor_id = cursor.fetchone()[0]
+        self._invalidar(professor_id, email=professor.email)
+        return professor_id
 
-    def get_all(self):
-        with self.database.connect() as conn:
+    def get_all(self, primario=False):
+        # primario=True: direto do primário, sem passar pelo cache
+        if self.cache is not None and not primario:
+            return self.cache.get_or_load('professores:todos', self._get_all)
+        return self._get_all()
+
+    def _get_all(self):
+        # Carga do cache: lida do primário para não guardar dados de uma réplica atrasada
+        with self.database.connection() as conn:
             with conn.cursor() as cursor:
-                cursor.execute("SELECT id, nome, email, criado_em FROM professores")
-                return [Professor(*row) for row in cursor.fetchall()]
+                self.database.executar(cursor, TODOS)
+                return [professor_publico(row) for row in cursor.fetchall()]
     
+    def get_all_json(self):
+        # Lista já serializada pelo PostgreSQL, no formato de Professor.to_dict
+        with self.database.connection(leitura=True) as conn:
+            with conn.cursor() as cursor:
+                self.database.executar(cursor, TODOS_JSON)
+                return cursor.fetchone()[0]
+
     def get_by_id(self, professor_id):
-        with self.database.connect() as conn:
+        if self.cache is not None:
+            return self.cache.get_or_load(f'professor:{professor_id}', lambda: self._get_by_id(professor_id))
+        return self._get_by_id(professor_id)
+
+    def _get_by_id(self, professor_id):
+        with self.database.connection() as conn:
             with conn.cursor() as cursor:
-                sql = "SELECT * FROM professores WHERE id = %s"
-                cursor.execute(sql, (professor_id,))
+                self.database.executar(cursor, POR_ID, (professor_id,))
                 professor = cursor.fetchone()
                 if professor:
-                    return Professor(*professor)
+                    return professor_publico(professor)
                 else:
                     return None
 
+    def get_by_ids(self, ids, primario=False):
+        """Professores dos `ids` em uma única consulta, como dict id -> Professor.
+
+        Os que já estão no cache não vão ao banco, salvo com `primario=True`, que lê
+        todos do primário; ids inexistentes ficam de fora.
+        """
+        ids = list(dict.fromkeys(ids))
+        if self.cache is None or primario:
+            return self._get_by_ids(ids)
+        chaves = {f'professor:{professor_id}': professor_id for professor_id in ids}
+        valores = self.cache.get_or_load_many(list(chaves), lambda faltando: {
+            f'professor:{professor_id}': professor
+            for professor_id, professor in self._get_by_ids([chaves[chave] for chave in faltando]).items()
+        })
+        return {chaves[chave]: professor for chave, professor in valores.items() if professor is not None}
+
+    def _get_by_ids(self, ids):
+        if not ids:
+            return {}
+        with self.database.connection() as conn:
+            with conn.cursor() as cursor:
+                self.database.executar(cursor, POR_IDS, (ids,))
+                return {row[0]: professor_publico(row) for row in cursor.fetchall()}
+
     def update(self, professor):
-        with self.database.connect() as conn:
+        with self.database.connection() as conn:
             with conn.cursor() as cursor:
-                sql = "UPDATE professores SET nome = %s, email = %s, senha_hash = %s WHERE id = %s"
-                cursor.execute(sql, (professor.nome, professor.email, professor.senha, professor.id))
+                self.database.executar(cursor, ATUALIZAR, (professor.nome, professor.email, professor.senha, professor.id))
                 conn.commit()
+        self._invalidar(professor.id, email=professor.email)
+
+    def update_senha(self, professor_id, senha_hash):
+        with self.database.connection() as conn:
+            with conn.cursor() as cursor:
+                self.database.executar(cursor, ATUALIZAR_SENHA, (senha_hash, professor_id))
+                conn.commit()
+        self._invalidar(professor_id)
 
     def delete(self, professor_id):
-        with self.database.connect() as conn:
+        with self.database.connection() as conn:
             with conn.cursor() as cursor:
-                sql = "DELETE FROM professores WHERE id = %s"
-                cursor.execute(sql, (professor_id,))
+                self.database.executar(cursor, REMOVER, (professor_id,))
                 conn.commit()
+        self._invalidar(professor_id)
     
     def loginProfessor(self, email, senha): 
         # Verifica se as credenciais estão corretas
-        with self.database.connect() as conn:
+        with self.database.connection() as conn:
             with conn.cursor() as cursor:
-                sql = "SELECT * FROM professores WHERE email = %s AND senha_hash = %s"
-                cursor.execute(sql, (email, senha))
+                self.database.executar(cursor, POR_CREDENCIAIS, (email, senha))
                 professor = cursor.fetchone()
                 return professor
             
     def get_by_email(self, email):
-        with self.database.connect() as conn:
+        # Único caminho que lê o hash (login e rehash). Só e-mails inexistentes ficam em cache
+        # (resultado negativo curto), nunca o hash da senha:
+        # logins repetidos com um e-mail desconhecido não vão ao banco
+        if self.cache is None:
+            return self._get_by_email(email)
+        chave = f'email_inexistente:{email}'
+        encontrado, _ = self.cache.get(chave)
+        if encontrado:
+            return None
+        professor = self._get_by_email(email)
+        if professor is None:
+            self.cache.set(chave, True, self.cache.ttl_negativo)
+        return professor
+
+    def _get_by_email(self, email):
+        with self.database.connection() as conn:
             with conn.cursor() as cursor:
-                sql = f"SELECT * FROM professores WHERE email = '{email}'"
-                cursor.execute(sql)
+                self.database.executar(cursor, POR_EMAIL, (email,))
                 result = cursor.fetchone()
                 if result:
                     professor = Professor(*result)
@@ -0,0 +1,89 @@
+from src.repository.consultas import Consulta
+
+# Todas as consultas leem os agregados de ocupação (ocupacao_*), nunca a tabela de agendamentos:
+# o custo depende do período pedido, não do tamanho do histórico.
+FILTRO_LABORATORIO = "(%s::bigint IS NULL OR o.id_laboratorio = %s)"
+
+UTILIZACAO_DIA = Consulta('relatorio_utilizacao_dia', f"""
+    SELECT o.data_agendamento, sum(o.minutos), sum(o.agendamentos) FROM ocupacao_diaria o
+    WHERE o.data_agendamento BETWEEN %s AND %s AND {FILTRO_LABORATORIO}
+    GROUP BY o.data_agendamento ORDER BY o.data_agendamento
+""")
+UTILIZACAO_LABORATORIO = Consulta('relatorio_utilizacao_laboratorio', f"""
+    SELECT o.id_laboratorio, l.nome, sum(o.minutos), sum(o.agendamentos) FROM ocupacao_diaria o
+    LEFT JOIN laboratorios l ON l.id = o.id_laboratorio
+    WHERE o.data_agendamento BETWEEN %s AND %s AND {FILTRO_LABORATORIO}
+    GROUP BY o.id_laboratorio, l.nome ORDER BY sum(o.minutos) DESC, o.id_laboratorio
+""")
+UTILIZACAO_PROFESSOR = Consulta('relatorio_utilizacao_professor', f"""
+    SELECT o.id_professor, p.nome, sum(o.minutos), sum(o.agendamentos) FROM ocupacao_professores o
+    LEFT JOIN professores p ON p.id = o.id_professor
+    WHERE o.mes BETWEEN %s AND %s AND {FILTRO_LABORATORIO}
+    GROUP BY o.id_professor, p.nome ORDER BY sum(o.minutos) DESC, o.id_professor
+""")
+HORARIOS_PICO = Consulta('relatorio_horarios_pico', f"""
+    SELECT o.dia_semana, o.hora, sum(o.minutos) FROM ocupacao_horaria o
+    WHERE o.mes BETWEEN %s AND %s AND {FILTRO_LABORATORIO}
+    GROUP BY o.dia_semana, o.hora
+""")
+TOP_PROFESSORES = Consulta('relatorio_top_professores', f"""
+    SELECT t.id_laboratorio, l.nome, t.posicao, t.id_professor, p.nome, t.minutos, t.agendamentos
+    FROM (
+        SELECT o.id_laboratorio, o.id_professor, sum(o.minutos) AS minutos, sum(o.agendamentos) AS agendamentos,
+               row_number() OVER (PARTITION BY o.id_laboratorio
+                                  ORDER BY sum(o.minutos) DESC, o.id_professor) AS posicao
+        FROM ocupacao_professores o
+        WHERE o.mes BETWEEN %s AND %s AND {FILTRO_LABORATORIO}
+        GROUP BY o.id_laboratorio, o.id_professor
+    ) t
+    LEFT JOIN laboratorios l ON l.id = t.id_laboratorio
+    LEFT JOIN professores p ON p.id = t.id_professor
+    WHERE t.posicao <= %s
+    ORDER BY t.id_laboratorio, t.posicao
+""")
+CONTAR_LABORATORIOS = Consulta('relatorio_contar_laboratorios', "SELECT count(*) FROM laboratorios")
+RECALCULAR = Consulta('relatorio_recalcular', "SELECT recalcular_ocupacao(%s, %s)")
+
+
+class RelatorioRepository:
+    """Relatórios de ocupação a partir das tabelas agregadas.
+
+    Os agregados são mantidos pelo trigger `trg_agendamentos_ocupacao` na mesma
+    transação de cada escrita; `recalcular` os reconstrói a partir dos agendamentos.
+    """
+
+    def __init__(self, database):
+        self.database = database
+
+    def _consultar(self, consulta, params):
+        with self.database.connection(leitura=True) as conn:
+            with conn.cursor() as cursor:
+                self.database.executar(cursor, consulta, params)
+                return cursor.fetchall()
+
+    def utilizacao_por_dia(self, inicio, fim, id_laboratorio=None):
+        return self._consultar(UTILIZACAO_DIA, (inicio, fim, id_laboratorio, id_laboratorio))
+
+    def utilizacao_por_laboratorio(self, inicio, fim, id_laboratorio=None):
+        return self._consultar(UTILIZACAO_LABORATORIO, (inicio, fim, id_laboratorio, id_laboratorio))
+
+    def utilizacao_por_professor(self, mes_inicio, mes_fim, id_laboratorio=None):
+        return self._consultar(UTILIZACAO_PROFESSOR, (mes_inicio, mes_fim, id_laboratorio, id_laboratorio))
+
+    def horarios_pico(self, mes_inicio, mes_fim, id_laboratorio=None):
+        return self._consultar(HORARIOS_PICO, (mes_inicio, mes_fim, id_laboratorio, id_laboratorio))
+
+    def top_professores(self, mes_inicio, mes_fim, top, id_laboratorio=None):
+        return self._consultar(TOP_PROFESSORES, (mes_inicio, mes_fim, id_laboratorio, id_laboratorio, top))
+
+    def contar_laboratorios(self):
+        return self._consultar(CONTAR_LABORATORIOS, ())[0][0]
+
+    def recalcular(self, de, ate):
+        """Reconstrói os agregados dos meses de `de` a `ate`; meses já arquivados são mantidos."""
+        with self.database.connection() as conn:
+            with conn.cursor() as cursor:
+                self.database.executar(cursor, RECALCULAR, (de, ate))
+                recalculados = cursor.fetchone()[0]
+                conn.commit()
+        return recalculados
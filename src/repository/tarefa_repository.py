@@ -0,0 +1,105 @@
+from psycopg2.extras import Json
+
+from src.repository.consultas import Consulta
+
+CANAL_TAREFAS = 'tarefas'
+
+# Reserva um lote: as linhas retiradas ficam invisíveis aos outros workers até `disponivel_em`.
+# Se o worker morrer no meio, a tarefa volta sozinha à fila quando a reserva vence.
+RESERVAR = Consulta('tarefa_reservar', """
+    UPDATE tarefas t SET tentativas = t.tentativas + 1, disponivel_em = now() + %s * interval '1 second'
+    WHERE t.id IN (
+        SELECT id FROM tarefas WHERE disponivel_em <= now()
+        ORDER BY disponivel_em, id LIMIT %s FOR UPDATE SKIP LOCKED
+    )
+    RETURNING t.id, t.tipo, t.dados, t.tentativas
+""")
+CONCLUIR = Consulta('tarefa_concluir', "DELETE FROM tarefas WHERE id = ANY(%s)")
+REAGENDAR = Consulta('tarefa_reagendar', """
+    UPDATE tarefas SET disponivel_em = now() + %s * interval '1 second', ultimo_erro = %s WHERE id = %s
+""")
+MOVER_PARA_FALHAS = Consulta('tarefa_mover_para_falhas', """
+    WITH removida AS (DELETE FROM tarefas WHERE id = %s RETURNING id, tipo, dados, tentativas, criado_em)
+    INSERT INTO tarefas_falhas (id, tipo, dados, tentativas, ultimo_erro, criado_em)
+    SELECT id, tipo, dados, tentativas, %s, criado_em FROM removida
+    ON CONFLICT (id) DO NOTHING
+""")
+REPROCESSAR = Consulta('tarefa_reprocessar', """
+    WITH devolvidas AS (
+        DELETE FROM tarefas_falhas WHERE %s::text IS NULL OR tipo = %s
+        RETURNING id, tipo, dados, ultimo_erro, criado_em
+    )
+    INSERT INTO tarefas (id, tipo, dados, ultimo_erro, criado_em)
+    SELECT id, tipo, dados, ultimo_erro, criado_em FROM devolvidas
+""")
+REGISTRAR_AUDITORIA = Consulta('tarefa_registrar_auditoria', """
+    INSERT INTO auditoria (id_tarefa, evento, id_agendamento, id_professor, por, dados, ocorrido_em)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    ON CONFLICT (id_tarefa) DO NOTHING
+""")
+ESTATISTICAS = Consulta('tarefa_estatisticas', """
+    SELECT tipo, count(*), count(*) FILTER (WHERE disponivel_em <= now()),
+           coalesce(extract(epoch FROM now() - min(criado_em)), 0)
+    FROM tarefas GROUP BY tipo
+""")
+ESTATISTICAS_FALHAS = Consulta('tarefa_estatisticas_falhas', "SELECT tipo, count(*) FROM tarefas_falhas GROUP BY tipo")
+
+
+class TarefaRepository:
+    """Fila de tarefas (outbox) gravada junto com os agendamentos.
+
+    Vários workers podem retirar tarefas ao mesmo tempo: `reservar` usa
+    SKIP LOCKED e cada tarefa é entregue ao menos uma vez.
+    """
+
+    def __init__(self, database):
+        self.database = database
+
+    def reservar(self, quantidade, reserva_segundos):
+        """Retira até `quantidade` tarefas disponíveis como [(id, tipo, dados, tentativas)]."""
+        with self.database.connection() as conn:
+            with conn.cursor() as cursor:
+                self.database.executar(cursor, RESERVAR, (reserva_segundos, quantidade))
+                return cursor.fetchall()
+
+    def concluir(self, ids):
+        if not ids:
+            return
+        with self.database.connection() as conn:
+            with conn.cursor() as cursor:
+                self.database.executar(cursor, CONCLUIR, (list(ids),))
+
+    def reagendar(self, tarefa_id, espera, erro):
+        with self.database.connection() as conn:
+            with conn.cursor() as cursor:
+                self.database.executar(cursor, REAGENDAR, (espera, erro, tarefa_id))
+
+    def mover_para_falhas(self, tarefa_id, erro):
+        with self.database.connection() as conn:
+            with conn.cursor() as cursor:
+                self.database.executar(cursor, MOVER_PARA_FALHAS, (tarefa_id, erro))
+
+    def reprocessar(self, tipo=None):
+        """Devolve à fila as tarefas que falharam (todas ou só do `tipo`); retorna quantas."""
+        with self.database.connection() as conn:
+            with conn.cursor() as cursor:
+                self.database.executar(cursor, REPROCESSAR, (tipo, tipo))
+                return cursor.rowcount
+
+    def registrar_auditoria(self, tarefa_id, evento):
+        with self.database.connection() as conn:
+            with conn.cursor() as cursor:
+                self.database.executar(cursor, REGISTRAR_AUDITORIA, (
+                    tarefa_id, evento['operacao'], evento['id'], evento.get('id_professor'), evento.get('por'),
+                    Json(evento), evento['ocorrido_em']
+                ))
+
+    def stats(self):
+        with self.database.connection(leitura=True) as conn:
+            with conn.cursor() as cursor:
+                self.database.executar(cursor, ESTATISTICAS)
+                pendentes = {tipo: {'total': total, 'disponiveis': disponiveis, 'mais_antiga_s': round(float(idade), 1)}
+                             for tipo, total, disponiveis, idade in cursor.fetchall()}
+                self.database.executar(cursor, ESTATISTICAS_FALHAS)
+                falhas = dict(cursor.fetchall())
+        return {'pendentes': pendentes, 'falhas': falhas}
@@ -0,0 +1,35 @@
+from src.repository.consultas import Consulta
+
+INCREMENTAR = Consulta('versao_incrementar', """
+    UPDATE versoes_tabelas SET versao = versao + 1, modificado_em = now() WHERE tabela = ANY(%s::text[])
+""")
+# Last-Modified tem resolução de segundos; If-Modified-Since é comparado com este valor
+ATUAL = Consulta('versao_atual', """
+    SELECT versao, date_trunc('second', modificado_em) FROM versoes_tabelas WHERE tabela = %s
+""")
+
+
+class VersaoRepository:
+    """Versão de cada tabela, usada nas respostas condicionais (ETag/Last-Modified).
+
+    A versão é incrementada por triggers na própria transação de cada escrita,
+    então só fica visível junto com os dados e não se perde se o processo cair
+    depois do commit. Lê-la não toca nas linhas da tabela.
+    """
+
+    def __init__(self, database):
+        self.database = database
+
+    def incrementar(self, *tabelas):
+        """Para as mudanças que não disparam os triggers (como desanexar uma partição)."""
+        with self.database.connection() as conn:
+            with conn.cursor() as cursor:
+                self.database.executar(cursor, INCREMENTAR, (list(tabelas),))
+
+    def atual(self, tabela):
+        """Retorna (versão, modificado_em) da tabela."""
+        # Sempre do primário: uma réplica atrasada devolveria uma versão anterior à última escrita
+        with self.database.connection() as conn:
+            with conn.cursor() as cursor:
+                self.database.executar(cursor, ATUAL, (tabela,))
+                return cursor.fetchone()
@@ -0,0 +1,153 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from src.secret.get_rds_credentials import get_secret
+
+logger = logging.getLogger(__name__)
+
+
+class EnvCredentialsProvider:
+    """Credenciais a partir de DB_NAME, DB_USER, DB_PASSWORD, DB_HOST e DB_PORT."""
+
+    def get(self):
+        return {
+            'dbname': os.getenv('DB_NAME'),
+            'username': os.getenv('DB_USER'),
+            'password': os.getenv('DB_PASSWORD'),
+            'host': os.getenv('DB_HOST', 'localhost'),
+            'port': int(os.getenv('DB_PORT', '5432')),
+        }
+
+
+class FileCredentialsProvider:
+    """Credenciais de um arquivo JSON no mesmo formato do segredo do Secrets Manager."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def get(self):
+        with open(self.path, encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+
+
+class SecretsManagerCredentialsProvider:
+    def __init__(self, secret_name="app/postgres/credentials", region_name="sa-east-1"):
+        self.secret_name = secret_name
+        self.region_name = region_name
+
+    def get(self):
+        return get_secret(self.secret_name, self.region_name)
+
+
+class CachedCredentialsProvider:
+    """Guarda as credenciais em memória (e opcionalmente em disco) por `ttl` segundos.
+
+    Com `refresh_interval`, uma thread de fundo renova as credenciais
+    periodicamente para acompanhar a rotação do segredo; se a renovação falhar,
+    as credenciais anteriores continuam em uso.
+    """
+
+    def __init__(self, provider, ttl=3600.0, cache_path=None, refresh_interval=None):
+        self.provider = provider
+        self.ttl = ttl
+        self.cache_path = cache_path
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._credenciais = None
+        self._obtidas_em = 0.0
+        self._thread = None
+
+    def _ler_disco(self):
+        if not self.cache_path:
+            return None
+        try:
+            if time.time() - os.path.getmtime(self.cache_path) >= self.ttl:
+                return None
+            with open(self.cache_path, encoding='utf-8') as arquivo:
+                return json.load(arquivo)
+        except (OSError, ValueError):
+            return None
+
+    def _gravar_disco(self, credenciais):
+        if not self.cache_path:
+            return
+        try:
+            # Arquivo legível apenas pelo dono, pois contém a senha do banco
+            descritor = os.open(self.cache_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(descritor, 'w', encoding='utf-8') as arquivo:
+                json.dump(credenciais, arquivo)
+        except OSError as e:
+            logger.warning(f"Não foi possível gravar o cache de credenciais: {e}")
+
+    def _buscar(self):
+        credenciais = self.provider.get()
+        with self._lock:
+            self._credenciais = credenciais
+            self._obtidas_em = time.monotonic()
+        self._gravar_disco(credenciais)
+        return credenciais
+
+    def get(self):
+        with self._lock:
+            if self._credenciais is not None and time.monotonic() - self._obtidas_em < self.ttl:
+                return self._credenciais
+        credenciais = self._ler_disco()
+        if credenciais is not None:
+            with self._lock:
+                self._credenciais = credenciais
+                self._obtidas_em = time.monotonic()
+            self._iniciar_renovacao()
+            return credenciais
+        credenciais = self._buscar()
+        self._iniciar_renovacao()
+        return credenciais
+
+    def invalidate(self):
+        # Chamado quando o banco recusa a senha (segredo rotacionado)
+        with self._lock:
+            self._credenciais = None
+        if self.cache_path:
+            try:
+                os.remove(self.cache_path)
+            except OSError:
+                pass
+
+    def _iniciar_renovacao(self):
+        if not self.refresh_interval or self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._renovar, name='credentials-refresh', daemon=True)
+        self._thread.start()
+
+    def _renovar(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            try:
+                self._buscar()
+            except Exception as e:
+                logger.warning(f"Falha ao renovar credenciais, mantendo as anteriores: {e}")
+
+
+def credentials_provider_from_env():
+    """Monta o provedor de credenciais a partir de CREDENTIALS_SOURCE (env, file ou secretsmanager)."""
+    origem = os.getenv('CREDENTIALS_SOURCE', 'secretsmanager')
+    if origem == 'env':
+        return EnvCredentialsProvider()
+    if origem == 'file':
+        provider = FileCredentialsProvider(os.getenv('CREDENTIALS_FILE', 'credentials.json'))
+    else:
+        provider = SecretsManagerCredentialsProvider(
+            os.getenv('SECRET_NAME', 'app/postgres/credentials'),
+            os.getenv('SECRET_REGION', 'sa-east-1')
+        )
+    return CachedCredentialsProvider(
+        provider,
+        ttl=float(os.getenv('CREDENTIALS_CACHE_TTL', '3600')),
+        cache_path=os.getenv('CREDENTIALS_CACHE_PATH') or None,
+        refresh_interval=float(os.getenv('CREDENTIALS_REFRESH_INTERVAL', '0')) or None
+    )
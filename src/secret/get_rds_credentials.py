@@ -1,11 +1,10 @@
-import boto3
 import json
-from botocore.exceptions import ClientError
 
-def get_secret():
 
-    secret_name = "app/postgres/credentials"
-    region_name = "sa-east-1"
+def get_secret(secret_name="app/postgres/credentials", region_name="sa-east-1"):
+    # boto3 é importado aqui para não pesar na inicialização quando não é usado
+    import boto3
+    from botocore.exceptions import ClientError
 
     # Create a Secrets Manager client
     session = boto3.session.Session()
@@ -1,28 +1,227 @@
 # src/services/agendamento_service.py
 
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from itertools import islice
 from src.models.agendamento_model import Agendamento
 from src.exceptions.custom_exception import CustomException
 from src.enums.enum import ErrorType
 
 class AgendamentoService:
-    def __init__(self, agendamento_repository):
+    MAX_LIMIT = 1000
+    MAX_LOTE = 500
+    # Relações aceitas em include e a tabela de cada uma
+    INCLUDES = {'professor': 'professores', 'laboratorio': 'laboratorios'}
+    # Agendamentos expandidos por consulta de professores/laboratórios
+    BLOCO_INCLUDE = 1000
+    # Laboratórios tentados, em ordem de capacidade, na escolha automática
+    CANDIDATOS_AUTO = 5
+    # Tarefas gravadas na mesma transação de cada escrita e executadas pelo worker.py;
+    # o lote não envia e-mail de confirmação por item
+    TAREFAS = {
+        'criado': ('confirmacao_email', 'auditoria', 'invalidar_cache'),
+        'lote': ('auditoria', 'invalidar_cache'),
+        'atualizado': ('auditoria', 'invalidar_cache'),
+        'removido': ('auditoria', 'invalidar_cache'),
+    }
+
+    def __init__(self, agendamento_repository, disponibilidade=None, professor_repository=None,
+                 laboratorio_repository=None):
         self.agendamento_repository = agendamento_repository
+        self.disponibilidade = disponibilidade
+        self.professor_repository = professor_repository
+        self.laboratorio_repository = laboratorio_repository
 
-    def create_agendamento(self, id_laboratorio, id_professor, data, hora_inicio, hora_fim):
-        if not id_laboratorio or not id_professor or not data or not hora_inicio or not hora_fim:
-            raise CustomException(ErrorType.INVALID_OPERATION, "All fields are required")
+    def aquecer_disponibilidade(self):
+        # Carrega no índice os agendamentos de hoje em diante
+        if self.disponibilidade is None:
+            return
+        hoje = date.today()
+        # Lido do primário, para não aquecer com o atraso de uma réplica
+        self.disponibilidade.aquecer(self.agendamento_repository.iter_filtrados(primario=True, data_inicio=hoje), hoje)
+
+    def _garantir_disponibilidade(self, id_laboratorio, data):
+        # Dia fora do aquecimento ou lido há mais tempo que a validade do índice
+        if not self.disponibilidade.cobre(id_laboratorio, data):
+            self._ressincronizar(id_laboratorio, data)
+
+    def horarios_livres(self, id_laboratorio, data):
+        if self.disponibilidade is None:
+            raise CustomException(ErrorType.INVALID_OPERATION, "Availability index is disabled")
+        if not data:
+            raise CustomException(ErrorType.INVALID_OPERATION, "data is required")
+        data = self._validar_data(data)
+        self._garantir_disponibilidade(id_laboratorio, data)
+        return self.disponibilidade.janelas_livres(id_laboratorio, data)
+
+    def laboratorios_livres(self, data, hora_inicio, hora_fim=None, min_capacidade=None, limit=None, primario=False):
+        """Laboratórios livres no horário com ao menos `min_capacidade` lugares, o mais justo primeiro.
 
+        Sem `hora_fim`, considera a duração padrão de 1h.
+        """
+        if not data or not hora_inicio:
+            raise CustomException(ErrorType.INVALID_OPERATION, "data and hora_inicio are required")
+        data = self._validar_data(data)
+        if not hora_fim:
+            try:
+                hora_fim = (datetime.strptime(hora_inicio, '%H:%M') + timedelta(hours=1)).strftime('%H:%M')
+            except (TypeError, ValueError):
+                raise CustomException(ErrorType.INVALID_OPERATION, "Times must use the HH:MM format")
+        hora_inicio, hora_fim = self._validar_horario(hora_inicio, hora_fim)
+        try:
+            min_capacidade = int(min_capacidade) if min_capacidade not in (None, '') else 0
+            limit = int(limit) if limit is not None else None
+        except (TypeError, ValueError):
+            raise CustomException(ErrorType.INVALID_OPERATION, "min_capacidade and limit must be integers")
+        if min_capacidade < 0:
+            raise CustomException(ErrorType.INVALID_OPERATION, "min_capacidade must not be negative")
+        if limit is not None and not 1 <= limit <= self.MAX_LIMIT:
+            raise CustomException(ErrorType.INVALID_OPERATION, f"limit must be between 1 and {self.MAX_LIMIT}")
+        return self.laboratorio_repository.livres(data, hora_inicio, hora_fim, min_capacidade, limit, primario)
+
+    def _validar_horario(self, hora_inicio, hora_fim):
         # Validação da hora_inicio e hora_fim
-        hora_inicio_dt = datetime.strptime(hora_inicio, '%H:%M')
-        hora_fim_dt = datetime.strptime(hora_fim, '%H:%M')
+        try:
+            hora_inicio_dt = datetime.strptime(hora_inicio, '%H:%M')
+            hora_fim_dt = datetime.strptime(hora_fim, '%H:%M')
+        except (TypeError, ValueError):
+            raise CustomException(ErrorType.INVALID_OPERATION, "Times must use the HH:MM format")
 
         # Verificação da duração do agendamento (1h por padrão)
         if (hora_fim_dt - hora_inicio_dt).total_seconds() / 3600 != 1:
             raise CustomException(ErrorType.INVALID_OPERATION, "Each appointment must be 1 hour long")
+        return hora_inicio_dt.time(), hora_fim_dt.time()
+
+    def _validar_data(self, data):
+        try:
+            return datetime.strptime(data, '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            raise CustomException(ErrorType.INVALID_OPERATION, "Dates must use the YYYY-MM-DD format")
+
+    def expandir_recorrencia(self, recorrencia):
+        """Gera os itens de um agendamento semanal.
+
+        `dia_semana` segue `date.weekday()` (0 = segunda-feira, 6 = domingo).
+        """
+        campos = ('id_laboratorio', 'dia_semana', 'hora_inicio', 'hora_fim', 'data_inicio', 'data_fim')
+        if not isinstance(recorrencia, dict):
+            raise CustomException(ErrorType.INVALID_OPERATION, "recorrencia must be an object")
+        if any(recorrencia.get(campo) in (None, '') for campo in campos):
+            raise CustomException(ErrorType.INVALID_OPERATION, "All fields are required")
+        try:
+            dia_semana = int(recorrencia['dia_semana'])
+        except (TypeError, ValueError):
+            dia_semana = -1
+        if not 0 <= dia_semana <= 6:
+            raise CustomException(ErrorType.INVALID_OPERATION, "dia_semana must be between 0 (Monday) and 6 (Sunday)")
+
+        data_inicio = self._validar_data(recorrencia['data_inicio'])
+        data_fim = self._validar_data(recorrencia['data_fim'])
+        if data_fim < data_inicio:
+            raise CustomException(ErrorType.INVALID_OPERATION, "data_fim must not be before data_inicio")
+
+        dia = data_inicio + timedelta(days=(dia_semana - data_inicio.weekday()) % 7)
+        itens = []
+        while dia <= data_fim:
+            itens.append({
+                'id_laboratorio': recorrencia['id_laboratorio'],
+                'data': dia.isoformat(),
+                'hora_inicio': recorrencia['hora_inicio'],
+                'hora_fim': recorrencia['hora_fim']
+            })
+            dia += timedelta(days=7)
+        return itens
+
+    def create_agendamentos_em_lote(self, id_professor, itens):
+        """Valida e grava vários agendamentos em uma única ida ao banco.
+
+        Itens inválidos ou em conflito não interrompem o lote; cada item recebe
+        seu próprio resultado, na mesma ordem do pedido. Laboratório e professor são
+        conferidos antes do INSERT, para que um id inexistente não derrube o lote.
+        """
+        if not id_professor:
+            raise CustomException(ErrorType.INVALID_OPERATION, "All fields are required")
+        if not itens:
+            raise CustomException(ErrorType.INVALID_OPERATION, "At least one item is required")
+        if len(itens) > self.MAX_LOTE:
+            raise CustomException(ErrorType.INVALID_OPERATION, f"A batch may contain at most {self.MAX_LOTE} items")
+
+        resultados = [None] * len(itens)
+        lidos = []
+        for indice, item in enumerate(itens):
+            try:
+                if not isinstance(item, dict) or any(not item.get(campo) for campo in ('id_laboratorio', 'data', 'hora_inicio', 'hora_fim')):
+                    raise CustomException(ErrorType.INVALID_OPERATION, "All fields are required")
+                try:
+                    id_laboratorio = int(item['id_laboratorio'])
+                except (TypeError, ValueError):
+                    raise CustomException(ErrorType.INVALID_OPERATION, "id_laboratorio must be an integer")
+                data = self._validar_data(item['data'])
+                hora_inicio, hora_fim = self._validar_horario(item['hora_inicio'], item['hora_fim'])
+            except CustomException as e:
+                resultados[indice] = {'indice': indice, 'status': 'invalido', 'mensagem': e.message}
+                continue
+            lidos.append((indice, id_laboratorio, data, hora_inicio, hora_fim))
+
+        inexistentes = self._referencias_inexistentes(id_professor, {item[1] for item in lidos})
+        validos = []
+        horarios = set()
+        for indice, id_laboratorio, data, hora_inicio, hora_fim in lidos:
+            if id_laboratorio in inexistentes:
+                resultados[indice] = {'indice': indice, 'status': 'invalido', 'mensagem': inexistentes[id_laboratorio]}
+                continue
+            # O mesmo horário repetido no lote: só o primeiro é enviado ao banco
+            if (id_laboratorio, data, hora_inicio) in horarios:
+                resultados[indice] = {'indice': indice, 'status': 'conflito', 'mensagem': "O horário especificado não está disponível"}
+                continue
+            horarios.add((id_laboratorio, data, hora_inicio))
+
+            validos.append((indice, Agendamento(None, id_laboratorio, id_professor, data, hora_inicio, hora_fim, None)))
+
+        # Todos os itens válidos vão ao banco: o índice pode estar desatualizado
+        suspeitos = [self._conflito_no_indice(agendamento) for _, agendamento in validos]
+        ids = self.agendamento_repository.create_em_lote([agendamento for _, agendamento in validos],
+                                                         self.TAREFAS['lote']) if validos else []
+        divergentes = set()
+        for (indice, agendamento), agendamento_id, suspeito in zip(validos, ids, suspeitos):
+            if (agendamento_id is None) != suspeito:
+                divergentes.add((agendamento.id_laboratorio, agendamento.data_agendamento))
+            if agendamento_id is None:
+                resultados[indice] = {'indice': indice, 'status': 'conflito', 'mensagem': "O horário especificado não está disponível"}
+                continue
+            resultados[indice] = {'indice': indice, 'status': 'criado', 'id': agendamento_id}
+            self._registrar_disponibilidade(agendamento_id, agendamento)
+        for id_laboratorio, data in divergentes:
+            self._ressincronizar(id_laboratorio, data)
+
+        return {
+            'criados': sum(1 for r in resultados if r['status'] == 'criado'),
+            'conflitos': sum(1 for r in resultados if r['status'] == 'conflito'),
+            'invalidos': sum(1 for r in resultados if r['status'] == 'invalido'),
+            'resultados': resultados
+        }
+
+    def _referencias_inexistentes(self, id_professor, ids_laboratorios):
+        # Laboratório -> motivo para os itens que violariam a chave estrangeira no INSERT.
+        # Do primário: o cache pode não conhecer um laboratório recém-criado
+        if not ids_laboratorios:
+            return {}
+        if self.professor_repository is not None and \
+                not self.professor_repository.get_by_ids({int(id_professor)}, primario=True):
+            return dict.fromkeys(ids_laboratorios, "Professor inexistente.")
+        if self.laboratorio_repository is None:
+            return {}
+        existentes = self.laboratorio_repository.get_by_ids(ids_laboratorios, primario=True)
+        return {id_laboratorio: "Laboratório inexistente." for id_laboratorio in ids_laboratorios
+                if id_laboratorio not in existentes}
+
+    def _novo_agendamento(self, id_laboratorio, id_professor, data, hora_inicio, hora_fim):
+        if not id_laboratorio or not id_professor or not data or not hora_inicio or not hora_fim:
+            raise CustomException(ErrorType.INVALID_OPERATION, "All fields are required")
+
+        self._validar_horario(hora_inicio, hora_fim)
 
         # Criação do agendamento
-        agendamento = Agendamento(
+        return Agendamento(
             id=None,
             id_laboratorio=id_laboratorio,
             id_professor=id_professor,
@@ -31,20 +230,197 @@ class AgendamentoService:
             hora_fim=hora_fim,
             criado_em=None
         )
-        return self.agendamento_repository.fazer_agendamento(agendamento)
+
+    def _conflito_no_indice(self, agendamento):
+        # Só uma suspeita: o INSERT e a restrição de exclusão decidem
+        return self.disponibilidade is not None and self.disponibilidade.conflita(
+            agendamento.id_laboratorio, agendamento.data_agendamento, agendamento.hora_inicio, agendamento.hora_fim)
+
+    def _ressincronizar(self, id_laboratorio, data):
+        # O banco discordou do índice (escrita de outro processo, remoção em cascata, arquivamento)
+        self.disponibilidade.recarregar(
+            id_laboratorio, data,
+            self.agendamento_repository.iter_filtrados(primario=True, id_laboratorio=id_laboratorio,
+                                                        data_inicio=data, data_fim=data)
+        )
+
+    def _registrar_disponibilidade(self, agendamento_id, agendamento):
+        if self.disponibilidade is not None:
+            self.disponibilidade.adicionar(agendamento_id, agendamento.id_laboratorio, agendamento.data_agendamento,
+                                           agendamento.hora_inicio, agendamento.hora_fim)
+
+    def create_agendamento(self, id_laboratorio, id_professor, data, hora_inicio, hora_fim):
+        agendamento = self._novo_agendamento(id_laboratorio, id_professor, data, hora_inicio, hora_fim)
+        suspeito = self._conflito_no_indice(agendamento)
+        try:
+            resultado = self.agendamento_repository.fazer_agendamento(agendamento, self.TAREFAS['criado'])
+        except CustomException:
+            if self.disponibilidade is not None and not suspeito:
+                self._ressincronizar(agendamento.id_laboratorio, agendamento.data_agendamento)
+            raise
+        self._registrar_disponibilidade(resultado["id"], agendamento)
+        if suspeito:
+            self._ressincronizar(agendamento.id_laboratorio, agendamento.data_agendamento)
+        return resultado
+
+    def create_agendamento_automatico(self, id_professor, data, hora_inicio, hora_fim=None, min_capacidade=None):
+        """Agenda no laboratório livre de menor capacidade que comporta `min_capacidade`.
+
+        Os candidatos vêm do primário; se outro pedido ocupar o primeiro antes do
+        INSERT, tenta o seguinte.
+        """
+        if not id_professor:
+            raise CustomException(ErrorType.INVALID_OPERATION, "All fields are required")
+        candidatos = self.laboratorios_livres(data, hora_inicio, hora_fim, min_capacidade,
+                                              self.CANDIDATOS_AUTO, primario=True)
+        if not candidatos:
+            raise CustomException(ErrorType.INVALID_OPERATION,
+                                  "Nenhum laboratório com a capacidade pedida está livre nesse horário.")
+        hora_fim = hora_fim or (datetime.strptime(hora_inicio, '%H:%M') + timedelta(hours=1)).strftime('%H:%M')
+        erro = None
+        for laboratorio in candidatos:
+            try:
+                resultado = self.create_agendamento(laboratorio.id, id_professor, data, hora_inicio, hora_fim)
+            except CustomException as e:
+                erro = e
+                continue
+            resultado['id_laboratorio'] = laboratorio.id
+            return resultado
+        raise erro
 
     def get_all_agendamentos(self):
         return self.agendamento_repository.get_all()
 
+    def _filtros_listagem(self, id_professor=None, id_laboratorio=None, data_inicio=None, data_fim=None,
+                          after_id=None, limit=None):
+        # Validação dos filtros antes de chegar ao banco
+        try:
+            id_professor = int(id_professor) if id_professor is not None else None
+            id_laboratorio = int(id_laboratorio) if id_laboratorio is not None else None
+            after_id = int(after_id) if after_id is not None else None
+            limit = int(limit) if limit is not None else None
+        except (TypeError, ValueError):
+            raise CustomException(ErrorType.INVALID_OPERATION, "id_professor, id_laboratorio, after_id and limit must be integers")
+
+        if limit is not None and not 1 <= limit <= self.MAX_LIMIT:
+            raise CustomException(ErrorType.INVALID_OPERATION, f"limit must be between 1 and {self.MAX_LIMIT}")
+
+        return {
+            'id_professor': id_professor,
+            'id_laboratorio': id_laboratorio,
+            'data_inicio': self._validar_data(data_inicio) if data_inicio else None,
+            'data_fim': self._validar_data(data_fim) if data_fim else None,
+            'after_id': after_id,
+            'limit': limit
+        }
+
+    def filtros_eventos(self, id_laboratorio=None, data=None):
+        """Valida os filtros de uma assinatura de eventos: (id_laboratorio, data ISO ou None)."""
+        try:
+            id_laboratorio = int(id_laboratorio) if id_laboratorio is not None else None
+        except (TypeError, ValueError):
+            raise CustomException(ErrorType.INVALID_OPERATION, "id_laboratorio must be an integer")
+        return id_laboratorio, self._validar_data(data).isoformat() if data else None
+
+    def listar_agendamentos(self, id_professor=None, id_laboratorio=None, data_inicio=None, data_fim=None,
+                            after_id=None, limit=None):
+        filtros = self._filtros_listagem(id_professor, id_laboratorio, data_inicio, data_fim, after_id, limit)
+        return self.agendamento_repository.iter_filtrados(**filtros)
+
+    def validar_include(self, include):
+        """Converte `include=professor,laboratorio` em uma tupla de relações."""
+        if not include:
+            return ()
+        relacoes = tuple(dict.fromkeys(parte.strip() for parte in include.split(',') if parte.strip()))
+        invalidas = [relacao for relacao in relacoes if relacao not in self.INCLUDES]
+        if invalidas:
+            raise CustomException(ErrorType.INVALID_OPERATION,
+                                  f"include accepts only: {', '.join(self.INCLUDES)}")
+        return relacoes
+
+    def expandir(self, agendamentos, include, primario=False):
+        """Gera os dicts dos agendamentos com os professores/laboratórios embutidos.
+
+        As relações são buscadas por bloco de agendamentos, uma consulta
+        `id = ANY(...)` por relação, e não uma por linha; com `primario=True`,
+        do primário e sem passar pelo cache.
+        """
+        agendamentos = iter(agendamentos)
+        while True:
+            bloco = list(islice(agendamentos, self.BLOCO_INCLUDE))
+            if not bloco:
+                return
+            professores = laboratorios = {}
+            if 'professor' in include:
+                professores = self.professor_repository.get_by_ids({a.id_professor for a in bloco}, primario=primario)
+            if 'laboratorio' in include:
+                laboratorios = self.laboratorio_repository.get_by_ids({a.id_laboratorio for a in bloco},
+                                                                      primario=primario)
+            for agendamento in bloco:
+                item = agendamento.to_dict()
+                if 'professor' in include:
+                    professor = professores.get(agendamento.id_professor)
+                    item['professor'] = professor.to_dict() if professor is not None else None
+                if 'laboratorio' in include:
+                    laboratorio = laboratorios.get(agendamento.id_laboratorio)
+                    item['laboratorio'] = laboratorio.to_dict() if laboratorio is not None else None
+                yield item
+
+    def listar_agendamentos_expandidos(self, include, id_professor=None, id_laboratorio=None, data_inicio=None,
+                                       data_fim=None, after_id=None, limit=None, primario=False):
+        agendamentos = self.listar_agendamentos(id_professor, id_laboratorio, data_inicio, data_fim, after_id, limit)
+        return self.expandir(agendamentos, self.validar_include(include), primario)
+
+    def listar_agendamentos_json(self, id_professor=None, id_laboratorio=None, data_inicio=None, data_fim=None,
+                                 after_id=None, limit=None):
+        filtros = self._filtros_listagem(id_professor, id_laboratorio, data_inicio, data_fim, after_id, limit)
+        return self.agendamento_repository.iter_json_filtrados(**filtros)
+
+    def listar_mudancas(self, since=None, limit=None):
+        """Mudanças com seq maior que `since`, em ordem de commit.
+
+        Remoções vêm com `agendamento` nulo. O cliente guarda `proximo` e o usa
+        como `since` na chamada seguinte; since=0 reconstrói a tabela inteira.
+        """
+        try:
+            since = int(since) if since is not None else 0
+            limit = int(limit) if limit is not None else self.MAX_LIMIT
+        except (TypeError, ValueError):
+            raise CustomException(ErrorType.INVALID_OPERATION, "since and limit must be integers")
+        if since < 0:
+            raise CustomException(ErrorType.INVALID_OPERATION, "since must not be negative")
+        if not 1 <= limit <= self.MAX_LIMIT:
+            raise CustomException(ErrorType.INVALID_OPERATION, f"limit must be between 1 and {self.MAX_LIMIT}")
+
+        # Um item a mais indica se há outra página
+        linhas = self.agendamento_repository.mudancas_desde(since, limit + 1)
+        mais = len(linhas) > limit
+        linhas = linhas[:limit]
+        return {
+            'mudancas': [
+                {'seq': seq, 'id': id_agendamento, 'operacao': operacao, 'agendamento': dados}
+                for seq, id_agendamento, operacao, dados in linhas
+            ],
+            'proximo': linhas[-1][0] if linhas else since,
+            'mais': mais
+        }
+
     def get_agendamento_by_id(self, agendamento_id):
         if not agendamento_id:
             raise CustomException(ErrorType.INVALID_EMAIL, "Agendamento ID is required")
         return self.agendamento_repository.get_by_id(agendamento_id)
 
-    def update_agendamento(self, agendamento_id, id_laboratorio, id_professor, data, hora_inicio, hora_fim):
+    def get_agendamento_expandido(self, agendamento_id, include=None):
+        agendamento = self.get_agendamento_by_id(agendamento_id)
+        relacoes = self.validar_include(include)
+        if not relacoes:
+            return agendamento.to_dict()
+        return next(self.expandir([agendamento], relacoes))
+
+    def _agendamento_atualizado(self, agendamento_id, id_laboratorio, id_professor, data, hora_inicio, hora_fim):
         if not agendamento_id or not id_laboratorio or not id_professor or not data or not hora_inicio or not hora_fim:
             raise CustomException(ErrorType.INVALID_OPERATION, "All fields are required")
-        agendamento = Agendamento(
+        return Agendamento(
             id=agendamento_id,
             id_laboratorio=id_laboratorio,
             id_professor=id_professor,
@@ -52,9 +428,15 @@ class AgendamentoService:
             hora_inicio=hora_inicio,
             hora_fim=hora_fim
         )
-        self.agendamento_repository.update(agendamento)
+
+    def update_agendamento(self, agendamento_id, id_laboratorio, id_professor, data, hora_inicio, hora_fim):
+        agendamento = self._agendamento_atualizado(agendamento_id, id_laboratorio, id_professor, data, hora_inicio, hora_fim)
+        self.agendamento_repository.update(agendamento, self.TAREFAS['atualizado'])
+        self._registrar_disponibilidade(agendamento_id, agendamento)
 
     def delete_agendamento(self, agendamento_id):
         if not agendamento_id:
             raise CustomException(ErrorType.INVALID_EMAIL, "Agendamento ID is required")
-        self.agendamento_repository.delete(agendamento_id)
+        self.agendamento_repository.delete(agendamento_id, self.TAREFAS['removido'])
+        if self.disponibilidade is not None:
+            self.disponibilidade.remover(agendamento_id)
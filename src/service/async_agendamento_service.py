@@ -0,0 +1,73 @@
+from datetime import date
+
+from src.service.agendamento_service import AgendamentoService
+from src.exceptions.custom_exception import CustomException
+from src.enums.enum import ErrorType
+
+
+class AsyncAgendamentoService(AgendamentoService):
+    """Variante assíncrona do `AgendamentoService`.
+
+    Reaproveita as validações e o índice de disponibilidade da classe base e só
+    troca as chamadas ao repositório por versões `await`.
+    """
+
+    async def aquecer_disponibilidade(self):
+        if self.disponibilidade is None:
+            return
+        hoje = date.today()
+        agendamentos = [a async for a in self.agendamento_repository.iter_filtrados(data_inicio=hoje)]
+        self.disponibilidade.aquecer(agendamentos, hoje)
+
+    async def horarios_livres(self, id_laboratorio, data):
+        if self.disponibilidade is None:
+            raise CustomException(ErrorType.INVALID_OPERATION, "Availability index is disabled")
+        if not data:
+            raise CustomException(ErrorType.INVALID_OPERATION, "data is required")
+        data = self._validar_data(data)
+        if not self.disponibilidade.cobre(id_laboratorio, data):
+            await self._ressincronizar(id_laboratorio, data)
+        return self.disponibilidade.janelas_livres(id_laboratorio, data)
+
+    async def create_agendamento(self, id_laboratorio, id_professor, data, hora_inicio, hora_fim):
+        agendamento = self._novo_agendamento(id_laboratorio, id_professor, data, hora_inicio, hora_fim)
+        suspeito = self._conflito_no_indice(agendamento)
+        try:
+            resultado = await self.agendamento_repository.fazer_agendamento(agendamento, self.TAREFAS['criado'])
+        except CustomException:
+            if self.disponibilidade is not None and not suspeito:
+                await self._ressincronizar(agendamento.id_laboratorio, agendamento.data_agendamento)
+            raise
+        self._registrar_disponibilidade(resultado["id"], agendamento)
+        if suspeito:
+            await self._ressincronizar(agendamento.id_laboratorio, agendamento.data_agendamento)
+        return resultado
+
+    async def _ressincronizar(self, id_laboratorio, data):
+        data = self._validar_data(data) if isinstance(data, str) else data
+        agendamentos = [a async for a in self.agendamento_repository.iter_filtrados(
+            id_laboratorio=int(id_laboratorio), data_inicio=data, data_fim=data)]
+        self.disponibilidade.recarregar(id_laboratorio, data, agendamentos)
+
+    def listar_agendamentos(self, id_professor=None, id_laboratorio=None, data_inicio=None, data_fim=None,
+                            after_id=None, limit=None):
+        # Retorna um gerador assíncrono
+        filtros = self._filtros_listagem(id_professor, id_laboratorio, data_inicio, data_fim, after_id, limit)
+        return self.agendamento_repository.iter_filtrados(**filtros)
+
+    async def get_agendamento_by_id(self, agendamento_id):
+        if not agendamento_id:
+            raise CustomException(ErrorType.INVALID_EMAIL, "Agendamento ID is required")
+        return await self.agendamento_repository.get_by_id(agendamento_id)
+
+    async def update_agendamento(self, agendamento_id, id_laboratorio, id_professor, data, hora_inicio, hora_fim):
+        agendamento = self._agendamento_atualizado(agendamento_id, id_laboratorio, id_professor, data, hora_inicio, hora_fim)
+        await self.agendamento_repository.update(agendamento, self.TAREFAS['atualizado'])
+        self._registrar_disponibilidade(agendamento_id, agendamento)
+
+    async def delete_agendamento(self, agendamento_id):
+        if not agendamento_id:
+            raise CustomException(ErrorType.INVALID_EMAIL, "Agendamento ID is required")
+        await self.agendamento_repository.delete(agendamento_id, self.TAREFAS['removido'])
+        if self.disponibilidade is not None:
+            self.disponibilidade.remover(agendamento_id)
@@ -0,0 +1,65 @@
+import asyncio
+from datetime import datetime
+
+from src.models.professor_model import Professor
+from src.service.professor_service import ProfessorService
+from src.exceptions.custom_exception import CustomException
+from src.enums.enum import ErrorType
+
+
+class AsyncProfessorService(ProfessorService):
+    """Variante assíncrona do `ProfessorService`.
+
+    O bcrypt continua no pool do `SenhaHasher`; o event loop apenas aguarda o
+    Future, sem ocupar uma thread por requisição.
+    """
+
+    async def hash_password(self, senha):
+        return await asyncio.wrap_future(self.senha_hasher.submeter_hash(senha))
+
+    async def criar_professor(self, nome, email, senha):
+        self._validar_novo_professor(nome, email, senha)
+        senha_hash = await self.hash_password(senha)
+        return await self.professor_repository.create(Professor(None, nome, email, senha_hash, datetime.now()))
+
+    async def busca_professor_id(self, id):
+        professor = await self.professor_repository.get_by_id(id)
+        if not professor:
+            raise CustomException(ErrorType.NOT_FOUND, f"Professor com ID {id} não encontrado.")
+        return self._professor_publico(professor)
+
+    async def listar_professores(self):
+        try:
+            return await self.professor_repository.get_all()
+        except Exception:
+            raise CustomException(ErrorType.DATABASE_ERROR, "Erro ao listar os professores, erro genérico na busca destes elementos")
+
+    async def atualizar_professor(self, id, nome, email, senha):
+        if not await self.professor_repository.get_by_id(id):
+            raise CustomException(ErrorType.NOT_FOUND, f"Professor com ID {id} não encontrado.")
+        senha_hash = await self.hash_password(senha)
+        try:
+            await self.professor_repository.update(Professor(id, nome, email, senha_hash))
+        except Exception:
+            raise CustomException(ErrorType.DATABASE_ERROR, f"Erro ao atualizar o professor com o ID {id}")
+
+    async def deletar_professor(self, id):
+        if not await self.professor_repository.get_by_id(id):
+            raise CustomException(ErrorType.NOT_FOUND, f"Professor com ID {id} não encontrado.")
+        try:
+            await self.professor_repository.delete(id)
+        except Exception:
+            raise CustomException(ErrorType.DATABASE_ERROR, f"Erro ao deletar o professor com o ID {id}")
+
+    async def login_professor(self, email, senha):
+        professor = await self.professor_repository.get_by_email(email)
+        if not professor:
+            return None
+        valido = await asyncio.wrap_future(self.senha_hasher.submeter_verificacao(senha, professor.senha))
+        if not valido:
+            return None
+
+        if self.senha_hasher.precisa_rehash(professor.senha):
+            professor.senha = await self.hash_password(senha)
+            await self.professor_repository.update_senha(professor.id, professor.senha)
+        return professor
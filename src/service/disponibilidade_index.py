@@ -0,0 +1,194 @@
+import threading
+from bisect import bisect_left, insort
+from datetime import date, datetime, time
+from time import monotonic
+
+INTERVALO_MINUTOS = 15
+
+
+def _para_minutos(hora):
+    if isinstance(hora, str):
+        hora = datetime.strptime(hora[:5], '%H:%M').time()
+    return hora.hour * 60 + hora.minute
+
+
+def _para_data(data):
+    if isinstance(data, datetime):
+        return data.date()
+    if isinstance(data, date):
+        return data
+    return datetime.strptime(data, '%Y-%m-%d').date()
+
+
+def _formatar_minutos(minutos):
+    return time(minutos // 60, minutos % 60).strftime('%H:%M')
+
+
+class DisponibilidadeIndex:
+    """Índice em memória da ocupação dos laboratórios por (laboratório, data).
+
+    Cada chave guarda intervalos ordenados [inicio, fim + 15min) em minutos; como
+    o banco impede sobreposição, os intervalos são disjuntos e um conflito pode
+    ser verificado com uma busca binária.
+
+    As escritas de outros processos chegam por `aplicar_evento` (notificações do
+    canal de agendamentos); as que não notificam, como remoções em cascata, são
+    corrigidas ao recarregar cada dia consultado depois de `validade` segundos.
+    Um conflito aqui é apenas uma suspeita; quem decide é a restrição de
+    exclusão do banco.
+    """
+
+    def __init__(self, abertura='07:00', fechamento='23:00', passo=INTERVALO_MINUTOS, validade=None,
+                 relogio=monotonic):
+        self.abertura = _para_minutos(abertura)
+        self.fechamento = _para_minutos(fechamento)
+        self.passo = passo
+        self.validade = validade
+        self.relogio = relogio
+        self._lock = threading.Lock()
+        self._intervalos = {}
+        self._por_id = {}
+        # (laboratório, data) -> quando o dia foi lido do banco
+        self._carregados = {}
+        self._aquecido_desde = None
+        self._aquecido_em = None
+        # Leituras do banco em andamento e os ids escritos enquanto elas acontecem
+        self._leituras = 0
+        self._adicionados_na_leitura = set()
+        self._removidos_na_leitura = set()
+
+    def _ler(self, agendamentos):
+        # Consome as linhas (um cursor do banco, no aquecimento) fora do lock, para não travar
+        # as consultas e os agendamentos durante a leitura
+        with self._lock:
+            self._leituras += 1
+        try:
+            return list(agendamentos)
+        except BaseException:
+            with self._lock:
+                self._encerrar_leitura()
+            raise
+
+    def _encerrar_leitura(self):
+        self._leituras -= 1
+        if not self._leituras:
+            self._adicionados_na_leitura.clear()
+            self._removidos_na_leitura.clear()
+
+    def _mesclar(self, linhas):
+        # Escritas feitas durante a leitura são mais novas que as linhas lidas
+        for agendamento in linhas:
+            if agendamento.id in self._removidos_na_leitura or agendamento.id in self._adicionados_na_leitura:
+                continue
+            self._adicionar(agendamento.id, agendamento.id_laboratorio, agendamento.data_agendamento,
+                            agendamento.hora_inicio, agendamento.hora_fim)
+
+    def aquecer(self, agendamentos, desde):
+        # Mescla com o que já foi registrado, pois o aquecimento pode rodar em segundo plano
+        inicio = self.relogio()
+        linhas = self._ler(agendamentos)
+        with self._lock:
+            try:
+                self._mesclar(linhas)
+                self._aquecido_desde = _para_data(desde)
+                self._aquecido_em = inicio
+            finally:
+                self._encerrar_leitura()
+
+    def cobre(self, id_laboratorio, data):
+        """Se o dia está no índice e foi lido do banco há menos de `validade` segundos."""
+        data = _para_data(data)
+        with self._lock:
+            lido_em = self._carregados.get((int(id_laboratorio), data))
+            if lido_em is None and self._aquecido_desde is not None and data >= self._aquecido_desde:
+                lido_em = self._aquecido_em
+        if lido_em is None:
+            return False
+        return self.validade is None or self.relogio() - lido_em < self.validade
+
+    def recarregar(self, id_laboratorio, data, agendamentos):
+        """Substitui o dia do laboratório pelo que está no banco (fora do índice, vencido ou divergente)."""
+        chave = (int(id_laboratorio), _para_data(data))
+        inicio = self.relogio()
+        linhas = self._ler(agendamentos)
+        with self._lock:
+            try:
+                for _, _, agendamento_id in list(self._intervalos.get(chave, [])):
+                    if agendamento_id not in self._adicionados_na_leitura:
+                        self._remover(agendamento_id)
+                self._mesclar(linhas)
+                self._carregados[chave] = inicio
+            finally:
+                self._encerrar_leitura()
+
+    def _adicionar(self, agendamento_id, id_laboratorio, data, hora_inicio, hora_fim):
+        chave = (int(id_laboratorio), _para_data(data))
+        intervalo = (_para_minutos(hora_inicio), _para_minutos(hora_fim) + INTERVALO_MINUTOS, agendamento_id)
+        self._remover(agendamento_id)
+        insort(self._intervalos.setdefault(chave, []), intervalo)
+        self._por_id[agendamento_id] = (chave, intervalo)
+
+    def _remover(self, agendamento_id):
+        existente = self._por_id.pop(agendamento_id, None)
+        if existente is None:
+            return
+        chave, intervalo = existente
+        intervalos = self._intervalos.get(chave, [])
+        posicao = bisect_left(intervalos, intervalo)
+        if posicao < len(intervalos) and intervalos[posicao] == intervalo:
+            del intervalos[posicao]
+        if not intervalos:
+            self._intervalos.pop(chave, None)
+
+    def adicionar(self, agendamento_id, id_laboratorio, data, hora_inicio, hora_fim):
+        with self._lock:
+            if self._leituras:
+                self._adicionados_na_leitura.add(agendamento_id)
+            self._adicionar(agendamento_id, id_laboratorio, data, hora_inicio, hora_fim)
+
+    def remover(self, agendamento_id):
+        with self._lock:
+            if self._leituras:
+                self._removidos_na_leitura.add(agendamento_id)
+            self._remover(agendamento_id)
+
+    def aplicar_evento(self, evento):
+        """Aplica um evento do canal de agendamentos (de qualquer processo)."""
+        if evento.get('operacao') == 'removido':
+            self.remover(evento['id'])
+        elif evento.get('operacao') in ('criado', 'atualizado'):
+            self.adicionar(evento['id'], evento['id_laboratorio'], evento['data_agendamento'],
+                           evento['hora_inicio'], evento['hora_fim'])
+
+    def _conflita(self, intervalos, inicio, fim, ignorar_id=None):
+        # Primeiro intervalo que começa a partir do fim (já com folga) do novo horário
+        posicao = bisect_left(intervalos, (fim + INTERVALO_MINUTOS,))
+        while posicao > 0:
+            existente_inicio, existente_fim, existente_id = intervalos[posicao - 1]
+            if existente_fim <= inicio:
+                return False
+            if existente_id != ignorar_id:
+                return True
+            posicao -= 1
+        return False
+
+    def conflita(self, id_laboratorio, data, hora_inicio, hora_fim, ignorar_id=None):
+        chave = (int(id_laboratorio), _para_data(data))
+        with self._lock:
+            intervalos = self._intervalos.get(chave)
+            if not intervalos:
+                return False
+            return self._conflita(intervalos, _para_minutos(hora_inicio), _para_minutos(hora_fim), ignorar_id)
+
+    def janelas_livres(self, id_laboratorio, data, duracao=60):
+        chave = (int(id_laboratorio), _para_data(data))
+        with self._lock:
+            intervalos = list(self._intervalos.get(chave, []))
+        janelas = []
+        for inicio in range(self.abertura, self.fechamento - duracao + 1, self.passo):
+            if not self._conflita(intervalos, inicio, inicio + duracao):
+                janelas.append({
+                    'hora_inicio': _formatar_minutos(inicio),
+                    'hora_fim': _formatar_minutos(inicio + duracao)
+                })
+        return janelas
@@ -0,0 +1,192 @@
+import asyncio
+import threading
+from collections import deque
+
+from src.exceptions.custom_exception import CustomException
+from src.enums.enum import ErrorType
+from src.utils.utils import json_dumps
+
+# Intervalo dos comentários de keepalive enviados a clientes sem eventos
+SSE_HEARTBEAT = 15.0
+
+
+def mensagem_sse(evento):
+    return f"event: {evento.get('operacao', 'message')}\ndata: {json_dumps(evento)}\n\n"
+
+
+class Assinatura:
+    """Um cliente inscrito nos eventos de agendamento.
+
+    Guarda no máximo `max_pendentes` eventos não lidos; se o cliente não
+    acompanhar, a assinatura é encerrada em vez de crescer sem limite.
+    """
+
+    __slots__ = ('id_laboratorio', 'data', 'max_pendentes', 'encerrada', '_fila', '_sinal')
+
+    def __init__(self, id_laboratorio=None, data=None, max_pendentes=100):
+        self.id_laboratorio = id_laboratorio
+        self.data = data
+        self.max_pendentes = max_pendentes
+        self.encerrada = False
+        self._fila = deque()
+        self._sinal = threading.Event()
+
+    def aceita(self, evento):
+        datas = {evento.get('data_agendamento')}
+        if evento.get('anterior'):
+            datas.add(evento['anterior'].get('data_agendamento'))
+        return self.data is None or self.data in datas
+
+    def entregar(self, evento):
+        if len(self._fila) >= self.max_pendentes:
+            return False
+        self._fila.append(evento)
+        self._sinal.set()
+        return True
+
+    def encerrar(self):
+        self.encerrada = True
+        self._sinal.set()
+
+    def aguardar(self, timeout):
+        """Espera até `timeout` segundos e retorna os eventos pendentes (pode ser vazio)."""
+        self._sinal.wait(timeout)
+        self._sinal.clear()
+        eventos = []
+        while self._fila:
+            eventos.append(self._fila.popleft())
+        return eventos
+
+
+class AssinaturaAsync(Assinatura):
+    """Assinatura para o modo ASGI; `entregar` deve ser chamado no loop de eventos."""
+
+    __slots__ = ('_fila_async',)
+
+    def __init__(self, id_laboratorio=None, data=None, max_pendentes=100):
+        # Não usa a fila e o Event da versão com threads
+        self.id_laboratorio = id_laboratorio
+        self.data = data
+        self.max_pendentes = max_pendentes
+        self.encerrada = False
+        self._fila_async = asyncio.Queue(maxsize=max_pendentes)
+
+    def entregar(self, evento):
+        try:
+            self._fila_async.put_nowait(evento)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def encerrar(self):
+        self.encerrada = True
+        # Acorda quem está esperando; o None sinaliza o fim
+        try:
+            self._fila_async.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+    async def aguardar(self, timeout):
+        try:
+            evento = await asyncio.wait_for(self._fila_async.get(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        eventos = [evento] if evento is not None else []
+        while not self._fila_async.empty():
+            evento = self._fila_async.get_nowait()
+            if evento is not None:
+                eventos.append(evento)
+        return eventos
+
+
+class DistribuidorEventos:
+    """Repassa cada evento de agendamento às assinaturas interessadas.
+
+    As assinaturas ficam indexadas por laboratório, então um evento só é
+    oferecido aos clientes daquele laboratório (e aos sem filtro).
+    """
+
+    def __init__(self, max_assinantes=1000, max_pendentes=100, metrics=None):
+        self.max_assinantes = max_assinantes
+        self.max_pendentes = max_pendentes
+        self._lock = threading.Lock()
+        self._por_laboratorio = {}
+        self._total = 0
+        self._publicados = 0
+        self._entregues = 0
+        self._desconectados = 0
+        self._observadores = []
+        if metrics is not None:
+            metrics.gauge_callback('eventos', 'Assinaturas de eventos de agendamento', self.stats)
+
+    def observar(self, funcao):
+        """Registra `funcao(evento)`, chamada para todo evento publicado (p.ex. o índice de disponibilidade)."""
+        self._observadores.append(funcao)
+
+    def assinar(self, id_laboratorio=None, data=None, classe=Assinatura):
+        assinatura = classe(id_laboratorio, data, self.max_pendentes)
+        with self._lock:
+            if self._total >= self.max_assinantes:
+                raise CustomException(ErrorType.SERVICE_UNAVAILABLE,
+                                      "Limite de conexões de eventos atingido, tente novamente em instantes.")
+            self._por_laboratorio.setdefault(id_laboratorio, set()).add(assinatura)
+            self._total += 1
+        return assinatura
+
+    def cancelar(self, assinatura):
+        with self._lock:
+            assinaturas = self._por_laboratorio.get(assinatura.id_laboratorio)
+            if assinaturas is not None and assinatura in assinaturas:
+                assinaturas.remove(assinatura)
+                self._total -= 1
+                if not assinaturas:
+                    del self._por_laboratorio[assinatura.id_laboratorio]
+
+    def publicar(self, evento):
+        laboratorios = {evento.get('id_laboratorio'), None}
+        if evento.get('anterior'):
+            laboratorios.add(evento['anterior'].get('id_laboratorio'))
+
+        for observador in self._observadores:
+            observador(evento)
+
+        with self._lock:
+            self._publicados += 1
+            candidatas = [assinatura for laboratorio in laboratorios
+                          for assinatura in self._por_laboratorio.get(laboratorio, ())]
+
+        lentas = []
+        entregues = 0
+        for assinatura in candidatas:
+            if not assinatura.aceita(evento):
+                continue
+            if assinatura.entregar(evento):
+                entregues += 1
+            else:
+                lentas.append(assinatura)
+
+        # Clientes que não acompanham são desconectados e devem recarregar ao reconectar
+        for assinatura in lentas:
+            self.cancelar(assinatura)
+            assinatura.encerrar()
+        with self._lock:
+            self._entregues += entregues
+            self._desconectados += len(lentas)
+
+    def encerrar_todas(self):
+        with self._lock:
+            assinaturas = [a for grupo in self._por_laboratorio.values() for a in grupo]
+            self._por_laboratorio.clear()
+            self._total = 0
+        for assinatura in assinaturas:
+            assinatura.encerrar()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'assinantes': self._total,
+                'max_assinantes': self.max_assinantes,
+                'publicados': self._publicados,
+                'entregues': self._entregues,
+                'desconectados': self._desconectados,
+            }
@@ -0,0 +1,141 @@
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice, repeat
+
+from src.auth.senha_hasher import SenhaHasher
+from src.exceptions.custom_exception import CustomException
+from src.enums.enum import ErrorType
+from src.service.validarEmail import emails_invalidos
+
+# Colunas esperadas em cada planilha
+COLUNAS = {
+    'professores': ('nome', 'email', 'senha'),
+    'laboratorios': ('nome', 'capacidade'),
+}
+TAMANHO_MAXIMO = 255
+
+
+def _linhas(arquivo, colunas):
+    # Gera (número da linha no arquivo, dict) sem ler o arquivo inteiro
+    leitor = csv.DictReader(arquivo)
+    faltando = [coluna for coluna in colunas if coluna not in (leitor.fieldnames or ())]
+    if faltando:
+        raise CustomException(ErrorType.INVALID_OPERATION, f"Colunas ausentes no CSV: {', '.join(faltando)}")
+    for linha in leitor:
+        yield leitor.line_num, {coluna: (linha.get(coluna) or '').strip() for coluna in colunas}
+
+
+def _lotes(linhas, tamanho):
+    while True:
+        lote = list(islice(linhas, tamanho))
+        if not lote:
+            return
+        yield lote
+
+
+class ImportacaoService:
+    """Importação de professores e laboratórios a partir de CSV e exportação em CSV.
+
+    Linhas inválidas ou já cadastradas não interrompem a importação: cada uma
+    volta como {'linha', 'erro'}, com o número da linha no arquivo. Os hashes
+    bcrypt de cada lote são calculados em `processos` processos.
+    """
+
+    def __init__(self, importacao_repository, rounds=12, processos=None, lote=1000):
+        self.importacao_repository = importacao_repository
+        self.rounds = rounds
+        self.processos = processos or os.cpu_count() or 1
+        self.lote = lote
+
+    def importar_professores(self, arquivo):
+        resumo = {'linhas': 0, 'inseridos': 0, 'erros': []}
+        vistos = set()
+        with ProcessPoolExecutor(max_workers=self.processos) as executor:
+            for lote in _lotes(_linhas(arquivo, COLUNAS['professores']), self.lote):
+                resumo['linhas'] += len(lote)
+                invalidos = set(emails_invalidos([campos['email'] for _, campos in lote]))
+                validos = []
+                for indice, (linha, campos) in enumerate(lote):
+                    erro = None
+                    if not campos['nome'] or not campos['email'] or not campos['senha']:
+                        erro = "Nome, email e senha são obrigatórios."
+                    elif indice in invalidos:
+                        erro = "Email não está correto"
+                    elif len(campos['nome']) > TAMANHO_MAXIMO or len(campos['email']) > TAMANHO_MAXIMO:
+                        erro = f"Nome e email devem ter até {TAMANHO_MAXIMO} caracteres."
+                    elif campos['email'] in vistos:
+                        erro = "Email repetido no arquivo."
+                    if erro:
+                        resumo['erros'].append({'linha': linha, 'erro': erro})
+                        continue
+                    vistos.add(campos['email'])
+                    validos.append((linha, campos))
+                if not validos:
+                    continue
+
+                # Só as linhas válidas chegam ao bcrypt
+                hashes = executor.map(SenhaHasher._hash, [campos['senha'] for _, campos in validos],
+                                      repeat(self.rounds), chunksize=max(1, len(validos) // (self.processos * 4)))
+                inseridos = self.importacao_repository.inserir_professores([
+                    (linha, campos['nome'], campos['email'], senha_hash)
+                    for (linha, campos), senha_hash in zip(validos, hashes)
+                ])
+                resumo['inseridos'] += len(inseridos)
+                resumo['erros'].extend({'linha': linha, 'erro': "Email já cadastrado."}
+                                       for linha, campos in validos if campos['email'] not in inseridos)
+        resumo['erros'].sort(key=lambda erro: erro['linha'])
+        return resumo
+
+    def importar_laboratorios(self, arquivo):
+        resumo = {'linhas': 0, 'inseridos': 0, 'erros': []}
+        vistos = set()
+        for lote in _lotes(_linhas(arquivo, COLUNAS['laboratorios']), self.lote):
+            resumo['linhas'] += len(lote)
+            validos = []
+            for linha, campos in lote:
+                try:
+                    capacidade = int(campos['capacidade'])
+                except ValueError:
+                    capacidade = -1
+                erro = None
+                if not campos['nome']:
+                    erro = "Nome é obrigatório."
+                elif len(campos['nome']) > TAMANHO_MAXIMO:
+                    erro = f"Nome deve ter até {TAMANHO_MAXIMO} caracteres."
+                elif capacidade < 0:
+                    erro = "Capacidade deve ser um inteiro não negativo."
+                elif campos['nome'] in vistos:
+                    erro = "Laboratório repetido no arquivo."
+                if erro:
+                    resumo['erros'].append({'linha': linha, 'erro': erro})
+                    continue
+                vistos.add(campos['nome'])
+                validos.append((linha, campos['nome'], capacidade))
+            if not validos:
+                continue
+
+            inseridos = self.importacao_repository.inserir_laboratorios(validos)
+            resumo['inseridos'] += len(inseridos)
+            resumo['erros'].extend({'linha': linha, 'erro': "Laboratório já cadastrado."}
+                                   for linha, _, _ in validos if linha not in inseridos)
+        resumo['erros'].sort(key=lambda erro: erro['linha'])
+        return resumo
+
+    def _data(self, texto, nome):
+        if not texto:
+            return None
+        try:
+            return datetime.strptime(texto, '%Y-%m-%d').date()
+        except ValueError:
+            raise CustomException(ErrorType.INVALID_OPERATION, f"{nome} must use the YYYY-MM-DD format")
+
+    def exportar(self, tabela, arquivo, de=None, ate=None):
+        """Exporta a tabela em CSV; para agendamentos, aceita o período `de`/`ate` (AAAA-MM-DD)."""
+        de, ate = self._data(de, 'de'), self._data(ate, 'ate')
+        if (de or ate) and tabela != 'agendamentos':
+            raise CustomException(ErrorType.INVALID_OPERATION, "de and ate apply only to agendamentos")
+        if de and ate and ate < de:
+            raise CustomException(ErrorType.INVALID_OPERATION, "ate must not be before de")
+        return self.importacao_repository.exportar(tabela, arquivo, de, ate)
@@ -0,0 +1,73 @@
+import logging
+import os
+import smtplib
+import time
+from datetime import datetime
+from email.message import EmailMessage
+
+logger = logging.getLogger(__name__)
+
+
+def mensagem_confirmacao(remetente, professor, laboratorio, evento):
+    """E-mail de confirmação de um agendamento criado (o mesmo conteúdo da tela de confirmação)."""
+    data = datetime.strptime(evento['data_agendamento'], '%Y-%m-%d').strftime('%d/%m/%Y')
+    inicio, fim = evento['hora_inicio'][:5], evento['hora_fim'][:5]
+    mensagem = EmailMessage()
+    mensagem['From'] = remetente
+    mensagem['To'] = professor.email
+    mensagem['Subject'] = f"Agendamento confirmado: {laboratorio.nome} em {data}"
+    # Reenvios da mesma tarefa têm o mesmo Message-ID
+    mensagem['Message-ID'] = f"<agendamento-{evento['id']}@{remetente.split('@')[-1]}>"
+    mensagem.set_content(
+        f"Olá, {professor.nome}.\n\n"
+        f"Seu agendamento foi confirmado:\n\n"
+        f"  Laboratório: {laboratorio.nome}\n"
+        f"  Data: {data}\n"
+        f"  Horário: {inicio} às {fim}\n"
+        f"  Código: {evento['id']}\n"
+    )
+    return mensagem
+
+
+class EnviadorSMTP:
+    """Envia por um servidor SMTP; uma conexão por envio."""
+
+    def __init__(self, host, port=587, usuario=None, senha=None, starttls=True, timeout=10.0):
+        self.host = host
+        self.port = port
+        self.usuario = usuario
+        self.senha = senha
+        self.starttls = starttls
+        self.timeout = timeout
+
+    def enviar(self, mensagem):
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.usuario:
+                smtp.login(self.usuario, self.senha)
+            smtp.send_message(mensagem)
+
+
+class EnviadorArquivo:
+    """Substituto local do SMTP: grava cada mensagem como .eml em `diretorio`."""
+
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+
+    def enviar(self, mensagem):
+        os.makedirs(self.diretorio, exist_ok=True)
+        nome = f"{time.time_ns()}-{os.getpid()}.eml"
+        with open(os.path.join(self.diretorio, nome), 'wb') as arquivo:
+            arquivo.write(bytes(mensagem))
+
+
+def enviador_from_env():
+    """SMTP_HOST definido usa o servidor SMTP; sem ele, grava os e-mails em EMAIL_DIRETORIO."""
+    host = os.getenv('SMTP_HOST')
+    if not host:
+        diretorio = os.getenv('EMAIL_DIRETORIO', 'emails')
+        logger.info("SMTP_HOST não definido; e-mails gravados em %s", diretorio)
+        return EnviadorArquivo(diretorio)
+    return EnviadorSMTP(host, int(os.getenv('SMTP_PORT', '587')), os.getenv('SMTP_USUARIO'),
+                        os.getenv('SMTP_SENHA'), os.getenv('SMTP_STARTTLS', '1') == '1')
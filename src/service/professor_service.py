@@ -1,4 +1,4 @@
-import bcrypt
+from src.auth.senha_hasher import SenhaHasher
 from src.models.professor_model import Professor
 from src.enums.enum import ErrorType
 from src.exceptions.custom_exception import CustomException
@@ -6,23 +6,30 @@ from src.service.validarEmail import validate_email
 from datetime import datetime
 
 class ProfessorService:
-    def __init__(self, professor_repository):
+    def __init__(self, professor_repository, senha_hasher=None):
         self.professor_repository = professor_repository
+        self.senha_hasher = senha_hasher or SenhaHasher()
 
     def hash_password(self, senha):
-        salt = bcrypt.gensalt()
-        return bcrypt.hashpw(senha.encode('utf-8'), salt).decode('utf-8')
+        return self.senha_hasher.hash(senha)
 
-    def criar_professor(self, nome, email, senha):
+    def _validar_novo_professor(self, nome, email, senha):
         if not nome or not email or not senha:
             raise CustomException(ErrorType.INVALID_EMAIL, "Nome, email e senha são obrigatórios.")
+        # Valida antes do hash para não gastar bcrypt com dados inválidos
+        validate_email(email)
+
+    def _professor_publico(self, professor):
+        return professor.to_dict()
+
+    def criar_professor(self, nome, email, senha):
+        self._validar_novo_professor(nome, email, senha)
 
         senha_hash = self.hash_password(senha)
         
         criado_em = datetime.now()
         
         try:
-            validate_email(email)
             id = self.professor_repository.create(Professor(None, nome, email, senha_hash, criado_em)) 
             return id
         
@@ -33,31 +40,41 @@ class ProfessorService:
         try:
             professor =  self.professor_repository.get_by_id(id)
             
-            return {
-                "id": professor.id,
-                "nome": professor.nome,
-                "email": professor.email
-            }
+            return self._professor_publico(professor)
 
         except Exception:
             raise CustomException(ErrorType.NOT_FOUND, f"Professor com ID {id} não encontrado.")
 
-    def listar_professores(self):
+    def buscar_professores(self, ids):
+        # Uma consulta para todos os ids; os inexistentes são omitidos
+        professores = self.professor_repository.get_by_ids(ids)
+        return [self._professor_publico(professores[id]) for id in ids if id in professores]
+
+    def listar_professores(self, primario=False):
         try:
-            return self.professor_repository.get_all()
+            return self.professor_repository.get_all(primario=primario)
         
         except Exception:
             raise CustomException(ErrorType.DATABASE_ERROR, "Erro ao listar os professores, erro genérico na busca destes elementos")
 
 
+    def listar_professores_json(self):
+        try:
+            return self.professor_repository.get_all_json()
+        
+        except Exception:
+            raise CustomException(ErrorType.DATABASE_ERROR, "Erro ao listar os professores, erro genérico na busca destes elementos")
+
     def atualizar_professor(self, id, nome, email, senha):
 
         if not self.professor_repository.get_by_id(id):
 
             raise CustomException(ErrorType.NOT_FOUND, f"Professor com ID {id} não encontrado.")
         
+        senha_hash = self.hash_password(senha)
+
         try:
-            return self.professor_repository.update(Professor(id, nome, email, senha))
+            return self.professor_repository.update(Professor(id, nome, email, senha_hash))
 
         except Exception:
             raise CustomException(ErrorType.DATABASE_ERROR, f"Erro ao atualizar o professor com o ID {id}")
@@ -73,18 +90,11 @@ class ProfessorService:
 
     def login_professor(self, email, senha):
         professor = self.professor_repository.get_by_email(email)
-        if professor: 
-            try:
-                is_valid = bcrypt.checkpw(
-                    senha.encode('utf-8'), 
-                    professor.senha.encode('utf-8')
-                )
-                if is_valid:
-                    return professor
-                else: 
-                    raise None
-            except ValueError:
-                return None
-        else:
+        if not professor or not self.senha_hasher.verificar(senha, professor.senha):
             return None
 
+        # Atualiza o hash quando o custo configurado mudou desde que ele foi gerado
+        if self.senha_hasher.precisa_rehash(professor.senha):
+            professor.senha = self.hash_password(senha)
+            self.professor_repository.update_senha(professor.id, professor.senha)
+        return professor
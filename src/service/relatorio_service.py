@@ -0,0 +1,161 @@
+from datetime import datetime, timedelta
+
+from src.exceptions.custom_exception import CustomException
+from src.enums.enum import ErrorType
+
+DIAS_SEMANA = ('segunda', 'terca', 'quarta', 'quinta', 'sexta', 'sabado', 'domingo')
+
+# Colunas de cada relatório, na ordem do CSV
+COLUNAS = {
+    'dia': ('periodo', 'agendamentos', 'horas', 'utilizacao'),
+    'semana': ('periodo', 'agendamentos', 'horas', 'utilizacao'),
+    'laboratorio': ('id_laboratorio', 'laboratorio', 'agendamentos', 'horas', 'utilizacao'),
+    'professor': ('id_professor', 'professor', 'agendamentos', 'horas', 'participacao'),
+    'horarios_pico': ('dia_semana', 'nome_dia', 'hora', 'horas', 'utilizacao'),
+    'top_professores': ('id_laboratorio', 'laboratorio', 'posicao', 'id_professor', 'professor',
+                        'agendamentos', 'horas'),
+}
+
+
+def _mes(data):
+    return data.replace(day=1)
+
+
+def _fim_do_mes(data):
+    return (data.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+
+
+def _percentual(parte, total):
+    return round(parte * 100 / total, 2) if total else 0.0
+
+
+def _horas(minutos):
+    return round(minutos / 60, 2)
+
+
+class RelatorioService:
+    """Relatórios de ocupação dos laboratórios.
+
+    A utilização é a fração do horário de funcionamento (`abertura` a
+    `fechamento`, em todos os dias do período) ocupada por agendamentos,
+    considerando os laboratórios cadastrados hoje. Os relatórios por professor
+    e de horários usam agregados mensais: o período é estendido aos meses inteiros.
+    """
+    AGRUPAMENTOS = ('dia', 'semana', 'laboratorio', 'professor')
+    MAX_DIAS = 3660
+    MAX_TOP = 50
+
+    def __init__(self, relatorio_repository, abertura='07:00', fechamento='23:00'):
+        self.relatorio_repository = relatorio_repository
+        self.abertura = datetime.strptime(abertura, '%H:%M')
+        self.fechamento = datetime.strptime(fechamento, '%H:%M')
+        self.minutos_por_dia = int((self.fechamento - self.abertura).total_seconds() // 60)
+
+    def _periodo(self, inicio, fim):
+        if not inicio or not fim:
+            raise CustomException(ErrorType.INVALID_OPERATION, "inicio and fim are required")
+        try:
+            inicio = datetime.strptime(inicio, '%Y-%m-%d').date()
+            fim = datetime.strptime(fim, '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            raise CustomException(ErrorType.INVALID_OPERATION, "Dates must use the YYYY-MM-DD format")
+        if fim < inicio:
+            raise CustomException(ErrorType.INVALID_OPERATION, "fim must not be before inicio")
+        if (fim - inicio).days >= self.MAX_DIAS:
+            raise CustomException(ErrorType.INVALID_OPERATION, f"The period may span at most {self.MAX_DIAS} days")
+        return inicio, fim
+
+    def _inteiro(self, valor, nome):
+        try:
+            return int(valor) if valor not in (None, '') else None
+        except (TypeError, ValueError):
+            raise CustomException(ErrorType.INVALID_OPERATION, f"{nome} must be an integer")
+
+    def _laboratorios(self, id_laboratorio):
+        return 1 if id_laboratorio is not None else self.relatorio_repository.contar_laboratorios()
+
+    def utilizacao(self, inicio, fim, agrupar='dia', id_laboratorio=None):
+        """Retorna (periodo, linhas) da utilização agrupada por dia, semana, laboratório ou professor."""
+        agrupar = agrupar or 'dia'
+        if agrupar not in self.AGRUPAMENTOS:
+            raise CustomException(ErrorType.INVALID_OPERATION,
+                                  f"agrupar accepts only: {', '.join(self.AGRUPAMENTOS)}")
+        inicio, fim = self._periodo(inicio, fim)
+        id_laboratorio = self._inteiro(id_laboratorio, 'id_laboratorio')
+
+        if agrupar == 'professor':
+            inicio, fim = _mes(inicio), _fim_do_mes(fim)
+            linhas = self.relatorio_repository.utilizacao_por_professor(inicio, fim, id_laboratorio)
+            total = sum(minutos for _, _, minutos, _ in linhas)
+            return (inicio, fim), [
+                {'id_professor': id_professor, 'professor': nome, 'agendamentos': agendamentos,
+                 'horas': _horas(minutos), 'participacao': _percentual(minutos, total)}
+                for id_professor, nome, minutos, agendamentos in linhas
+            ]
+
+        dias = (fim - inicio).days + 1
+        if agrupar == 'laboratorio':
+            linhas = self.relatorio_repository.utilizacao_por_laboratorio(inicio, fim, id_laboratorio)
+            return (inicio, fim), [
+                {'id_laboratorio': lab, 'laboratorio': nome, 'agendamentos': agendamentos,
+                 'horas': _horas(minutos), 'utilizacao': _percentual(minutos, dias * self.minutos_por_dia)}
+                for lab, nome, minutos, agendamentos in linhas
+            ]
+
+        # Por dia ou semana: dias sem agendamentos aparecem com zero
+        por_dia = {dia: (minutos, agendamentos)
+                   for dia, minutos, agendamentos in self.relatorio_repository.utilizacao_por_dia(inicio, fim, id_laboratorio)}
+        disponivel_por_dia = self._laboratorios(id_laboratorio) * self.minutos_por_dia
+        grupos = {}
+        for deslocamento in range(dias):
+            dia = inicio + timedelta(days=deslocamento)
+            chave = dia if agrupar == 'dia' else dia - timedelta(days=dia.weekday())
+            minutos, agendamentos = por_dia.get(dia, (0, 0))
+            grupo = grupos.setdefault(chave, [0, 0, 0])
+            grupo[0] += minutos
+            grupo[1] += agendamentos
+            grupo[2] += disponivel_por_dia
+        return (inicio, fim), [
+            {'periodo': chave.isoformat(), 'agendamentos': agendamentos, 'horas': _horas(minutos),
+             'utilizacao': _percentual(minutos, disponivel)}
+            for chave, (minutos, agendamentos, disponivel) in grupos.items()
+        ]
+
+    def horarios_pico(self, inicio, fim, id_laboratorio=None):
+        """Mapa de calor (dia da semana x hora) da utilização, nos meses do período."""
+        inicio, fim = self._periodo(inicio, fim)
+        id_laboratorio = self._inteiro(id_laboratorio, 'id_laboratorio')
+        inicio, fim = _mes(inicio), _fim_do_mes(fim)
+
+        # Quantas vezes cada dia da semana ocorre no período
+        ocorrencias = [0] * 7
+        for deslocamento in range((fim - inicio).days + 1):
+            ocorrencias[(inicio + timedelta(days=deslocamento)).weekday()] += 1
+        laboratorios = self._laboratorios(id_laboratorio)
+        ocupados = {(dia_semana, hora): minutos for dia_semana, hora, minutos
+                    in self.relatorio_repository.horarios_pico(inicio, fim, id_laboratorio)}
+
+        linhas = []
+        for dia_semana, nome_dia in enumerate(DIAS_SEMANA):
+            for hora in range(self.abertura.hour, self.fechamento.hour + (self.fechamento.minute > 0)):
+                minutos = ocupados.get((dia_semana, hora), 0)
+                linhas.append({'dia_semana': dia_semana, 'nome_dia': nome_dia, 'hora': hora,
+                               'horas': _horas(minutos),
+                               'utilizacao': _percentual(minutos, ocorrencias[dia_semana] * laboratorios * 60)})
+        return (inicio, fim), linhas
+
+    def top_professores(self, inicio, fim, top=None, id_laboratorio=None):
+        """Os `top` professores com mais horas em cada laboratório, nos meses do período."""
+        inicio, fim = self._periodo(inicio, fim)
+        id_laboratorio = self._inteiro(id_laboratorio, 'id_laboratorio')
+        top = self._inteiro(top, 'top')
+        top = 5 if top is None else top
+        if not 1 <= top <= self.MAX_TOP:
+            raise CustomException(ErrorType.INVALID_OPERATION, f"top must be between 1 and {self.MAX_TOP}")
+        inicio, fim = _mes(inicio), _fim_do_mes(fim)
+        linhas = self.relatorio_repository.top_professores(inicio, fim, top, id_laboratorio)
+        return (inicio, fim), [
+            {'id_laboratorio': lab, 'laboratorio': laboratorio, 'posicao': posicao, 'id_professor': id_professor,
+             'professor': professor, 'agendamentos': agendamentos, 'horas': _horas(minutos)}
+            for lab, laboratorio, posicao, id_professor, professor, minutos, agendamentos in linhas
+        ]
@@ -0,0 +1,164 @@
+import logging
+import random
+import select
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.exceptions.custom_exception import CustomException
+from src.enums.enum import ErrorType
+from src.repository.tarefa_repository import CANAL_TAREFAS
+from src.service.notificacao_email import mensagem_confirmacao
+
+logger = logging.getLogger(__name__)
+
+
+class TarefaDescartada(Exception):
+    """Erro permanente: a tarefa vai direto para `tarefas_falhas`, sem novas tentativas."""
+
+
+class TarefasAgendamento:
+    """Efeitos colaterais das escritas em agendamentos, executados pelo worker.
+
+    A entrega é ao menos uma vez: uma tarefa pode rodar de novo se o worker
+    cair antes de concluí-la. A auditoria é idempotente pelo id da tarefa; o
+    e-mail repetido leva o mesmo Message-ID.
+    """
+
+    def __init__(self, tarefa_repository, agendamento_repository, professor_repository, laboratorio_repository,
+                 versoes, enviador, remetente='agendamentos@fecaf.com.br'):
+        self.tarefa_repository = tarefa_repository
+        self.agendamento_repository = agendamento_repository
+        self.professor_repository = professor_repository
+        self.laboratorio_repository = laboratorio_repository
+        self.versoes = versoes
+        self.enviador = enviador
+        self.remetente = remetente
+
+    def handlers(self):
+        return {
+            'confirmacao_email': self.confirmacao_email,
+            'auditoria': self.auditoria,
+            'invalidar_cache': self.invalidar_cache,
+        }
+
+    def confirmacao_email(self, tarefa_id, evento):
+        try:
+            # Agendamento removido antes do envio: não há o que confirmar
+            self.agendamento_repository.get_by_id(evento['id'])
+            professor = self.professor_repository.get_by_id(evento['id_professor'])
+            laboratorio = self.laboratorio_repository.get_by_id(evento['id_laboratorio'])
+        except CustomException as e:
+            if e.error_type == ErrorType.NOT_FOUND:
+                logger.info("Confirmação do agendamento %s ignorada: %s", evento['id'], e.message)
+                return
+            raise
+        self.enviador.enviar(mensagem_confirmacao(self.remetente, professor, laboratorio, evento))
+
+    def auditoria(self, tarefa_id, evento):
+        self.tarefa_repository.registrar_auditoria(tarefa_id, evento)
+
+    def invalidar_cache(self, tarefa_id, evento):
+        # A versão já mudou na transação da escrita; o incremento extra descarta também as
+        # respostas comprimidas montadas entre o commit e a execução da tarefa
+        self.versoes.incrementar('agendamentos')
+
+
+class ProcessadorTarefas:
+    """Retira tarefas em lotes e as executa em um pool de threads.
+
+    Falhas voltam à fila com espera exponencial (com jitter), até
+    `max_tentativas`; depois vão para `tarefas_falhas`. Entre lotes, espera
+    um NOTIFY no canal `tarefas` ou, no máximo, `intervalo` segundos (para as
+    tarefas reagendadas).
+    """
+
+    def __init__(self, database, tarefa_repository, handlers, lote=50, workers=4, max_tentativas=8,
+                 espera_base=2.0, espera_maxima=600.0, reserva=300.0, intervalo=5.0):
+        self.database = database
+        self.tarefa_repository = tarefa_repository
+        self.handlers = handlers
+        self.lote = lote
+        self.max_tentativas = max_tentativas
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        # Tempo que um lote fica reservado; deve cobrir a execução do lote inteiro
+        self.reserva = reserva
+        self.intervalo = intervalo
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tarefa')
+        self._parar = threading.Event()
+
+    def parar(self):
+        self._parar.set()
+
+    def _espera(self, tentativas):
+        espera = min(self.espera_maxima, self.espera_base * 2 ** (tentativas - 1))
+        return espera * random.uniform(0.5, 1.0)
+
+    def _executar_tarefa(self, tarefa_id, tipo, dados):
+        handler = self.handlers.get(tipo)
+        if handler is None:
+            raise TarefaDescartada(f"Tipo de tarefa desconhecido: {tipo}")
+        handler(tarefa_id, dados)
+
+    def processar_lote(self):
+        """Executa um lote e retorna quantas tarefas foram retiradas."""
+        tarefas = self.tarefa_repository.reservar(self.lote, self.reserva)
+        futuros = [(tarefa, self._executor.submit(self._executar_tarefa, tarefa[0], tarefa[1], tarefa[2]))
+                   for tarefa in tarefas]
+        concluidas = []
+        for (tarefa_id, tipo, _, tentativas), futuro in futuros:
+            erro = futuro.exception()
+            if erro is None:
+                concluidas.append(tarefa_id)
+                continue
+            mensagem = f"{type(erro).__name__}: {erro}"
+            if isinstance(erro, TarefaDescartada) or tentativas >= self.max_tentativas:
+                logger.error("Tarefa %s (%s) falhou após %d tentativas: %s", tarefa_id, tipo, tentativas, mensagem)
+                self.tarefa_repository.mover_para_falhas(tarefa_id, mensagem)
+            else:
+                espera = self._espera(tentativas)
+                logger.warning("Tarefa %s (%s) falhou, nova tentativa em %.0fs: %s", tarefa_id, tipo, espera, mensagem)
+                self.tarefa_repository.reagendar(tarefa_id, espera, mensagem)
+        # Uma remoção para todas as tarefas concluídas do lote
+        self.tarefa_repository.concluir(concluidas)
+        return len(tarefas)
+
+    def esvaziar(self):
+        """Processa lotes até a fila não ter tarefas disponíveis; retorna o total."""
+        total = 0
+        while not self._parar.is_set():
+            retiradas = self.processar_lote()
+            total += retiradas
+            if retiradas < self.lote:
+                break
+        return total
+
+    def executar(self):
+        """Laço do worker, até `parar()`; reconecta com espera crescente se o banco cair."""
+        espera = 1.0
+        try:
+            while not self._parar.is_set():
+                try:
+                    self._ouvir()
+                    espera = 1.0
+                except Exception as e:
+                    logger.error("Worker de tarefas sem conexão: %s; tentando de novo em %.0fs", e, espera)
+                    self._parar.wait(espera)
+                    espera = min(espera * 2, 30.0)
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def _ouvir(self):
+        conn = self.database.connect()
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {CANAL_TAREFAS}")
+            while not self._parar.is_set():
+                # O LISTEN vem antes: tarefas gravadas durante o lote geram uma notificação pendente
+                self.esvaziar()
+                if select.select([conn], [], [], self.intervalo) != ([], [], []):
+                    conn.poll()
+                    conn.notifies.clear()
+        finally:
+            conn.close()
@@ -2,7 +2,14 @@ import re
 from src.enums.enum import ErrorType
 from src.exceptions.custom_exception import CustomException
 
+EMAIL_VALIDO = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
     
 def validate_email(email):
-    if not re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', email):
+    if not EMAIL_VALIDO.match(email):
         raise CustomException(ErrorType.INVALID_EMAIL, "Email não está correto")
+
+
+def emails_invalidos(emails):
+    # Mesma regra de validate_email para uma lista inteira, sem uma exceção por item
+    return [indice for indice, valido in enumerate(map(EMAIL_VALIDO.match, emails)) if valido is None]
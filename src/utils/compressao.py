@@ -0,0 +1,61 @@
+import zlib
+
+try:
+    # Opcional: sem o pacote, só gzip é oferecido
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def codificacoes_disponiveis():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def escolher_codificacao(accept_encoding):
+    """Escolhe a codificação da resposta a partir do cabeçalho Accept-Encoding.
+
+    Respeita os pesos (q=0 recusa); em empate prefere brotli. Retorna
+    'identity' quando nenhuma codificação suportada é aceita.
+    """
+    pesos = {}
+    for parte in (accept_encoding or '').split(','):
+        nome, _, parametros = parte.strip().partition(';')
+        nome = nome.strip().lower()
+        if not nome:
+            continue
+        q = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith('q='):
+            try:
+                q = float(parametros[2:])
+            except ValueError:
+                q = 0.0
+        pesos[nome] = q
+
+    melhor, melhor_q = 'identity', 0.0
+    for codificacao in codificacoes_disponiveis():
+        q = pesos.get(codificacao, pesos.get('*', 0.0))
+        if q > melhor_q:
+            melhor, melhor_q = codificacao, q
+    return melhor
+
+
+def comprimir_stream(pedacos, codificacao):
+    # Comprime incrementalmente pedaços de texto/bytes, sem juntar o corpo inteiro
+    if codificacao == 'br':
+        compressor = brotli.Compressor(quality=5)
+        comprimir, finalizar = compressor.process, compressor.finish
+    elif codificacao == 'gzip':
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        comprimir, finalizar = compressor.compress, compressor.flush
+    else:
+        comprimir, finalizar = None, None
+
+    for pedaco in pedacos:
+        if isinstance(pedaco, str):
+            pedaco = pedaco.encode('utf-8')
+        saida = pedaco if comprimir is None else comprimir(pedaco)
+        if saida:
+            yield saida
+    if finalizar is not None:
+        yield finalizar()
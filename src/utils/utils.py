@@ -0,0 +1,73 @@
+import csv
+import io
+import json
+from datetime import date, time
+
+from src.exceptions.custom_exception import CustomException
+from src.enums.enum import ErrorType
+
+try:
+    # Opcional: usado quando instalado, com o mesmo resultado do json padrão
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def json_default(valor):
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if isinstance(valor, time):
+        return valor.strftime('%H:%M:%S')
+    raise TypeError(f'Object of type {type(valor).__name__} is not JSON serializable')
+
+
+_encoder = json.JSONEncoder(default=json_default, ensure_ascii=False, separators=(',', ':'))
+
+
+def json_dumps(valor):
+    """Serializa para texto JSON tratando date/datetime/time em formato ISO."""
+    if orjson is not None:
+        return orjson.dumps(valor, default=json_default).decode('utf-8')
+    return _encoder.encode(valor)
+
+
+def ids_da_consulta(texto, maximo=100):
+    """Converte `?ids=1,2,3` em uma lista de inteiros sem repetição, na ordem pedida."""
+    try:
+        ids = list(dict.fromkeys(int(parte) for parte in texto.split(',') if parte.strip()))
+    except ValueError:
+        raise CustomException(ErrorType.INVALID_OPERATION, "ids must be a comma-separated list of integers")
+    if not 1 <= len(ids) <= maximo:
+        raise CustomException(ErrorType.INVALID_OPERATION, f"ids must contain between 1 and {maximo} values")
+    return ids
+
+
+def stream_json_array(itens, serializar=None, chunk_size=100):
+    # Gera um array JSON em pedaços, agrupando `chunk_size` itens por escrita.
+    # Sem `serializar`, os itens já são textos JSON (por exemplo, gerados pelo PostgreSQL).
+    yield '['
+    buffer = []
+    primeiro = True
+    for item in itens:
+        buffer.append(item if serializar is None else json_dumps(serializar(item)))
+        if len(buffer) >= chunk_size:
+            yield ('' if primeiro else ',') + ','.join(buffer)
+            primeiro = False
+            buffer = []
+    if buffer:
+        yield ('' if primeiro else ',') + ','.join(buffer)
+    yield ']'
+
+
+def stream_csv(linhas, colunas, chunk_size=100):
+    # Gera um CSV com cabeçalho a partir de dicts, agrupando `chunk_size` linhas por escrita
+    buffer = io.StringIO()
+    escritor = csv.DictWriter(buffer, fieldnames=colunas, extrasaction='ignore', lineterminator='\n')
+    escritor.writeheader()
+    for indice, linha in enumerate(linhas, 1):
+        escritor.writerow(linha)
+        if indice % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
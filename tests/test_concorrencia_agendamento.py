@@ -0,0 +1,71 @@
+"""Escritores concorrentes no mesmo horário, contra um PostgreSQL real.
+
+Roda só com DB_NAME (e DB_USER, DB_PASSWORD, DB_HOST, DB_PORT) apontando para um banco
+carregado com infra/db/schema.SQL; sem ele, o teste é ignorado.
+"""
+import os
+import threading
+import unittest
+from datetime import date, timedelta
+
+import pytest
+
+ESCRITORES = 16
+
+
+@unittest.skipUnless(os.getenv('DB_NAME'), "DB_NAME não configurado")
+class ConcorrenciaAgendamentoTest(unittest.TestCase):
+
+    def setUp(self):
+        pytest.importorskip('psycopg2')
+        from benchmarks.concorrencia_agendamento import criar_database, preparar
+        from src.repository.agendamento_repository import AgendamentoRepository
+
+        self.database = criar_database(ESCRITORES)
+        self.repository = AgendamentoRepository(self.database)
+        ids_laboratorios, self.id_professor = preparar(self.database)
+        self.id_laboratorio = ids_laboratorios[0]
+
+    def tearDown(self):
+        with self.database.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("DELETE FROM laboratorios WHERE id = %s", (self.id_laboratorio,))
+                cursor.execute("DELETE FROM professores WHERE id = %s", (self.id_professor,))
+        self.database.close()
+
+    def test_mesmo_horario_tem_um_unico_agendamento(self):
+        from src.exceptions.custom_exception import CustomException
+        from src.models.agendamento_model import Agendamento
+
+        dia = date.today() + timedelta(days=365)
+        barreira = threading.Barrier(ESCRITORES)
+        sucessos, conflitos, erros = [], [], []
+
+        def escritor():
+            agendamento = Agendamento(None, self.id_laboratorio, self.id_professor, dia, '10:00', '11:00')
+            barreira.wait()
+            try:
+                sucessos.append(self.repository.fazer_agendamento(agendamento)['id'])
+            except CustomException:
+                conflitos.append(agendamento)
+            except Exception as e:
+                erros.append(e)
+
+        threads = [threading.Thread(target=escritor) for _ in range(ESCRITORES)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(erros, [])
+        self.assertEqual(len(sucessos), 1)
+        self.assertEqual(len(conflitos), ESCRITORES - 1)
+        with self.database.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT id FROM agendamentos WHERE id_laboratorio = %s AND data_agendamento = %s",
+                               (self.id_laboratorio, dia))
+                self.assertEqual([linha[0] for linha in cursor.fetchall()], sucessos)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+
+import pytest
+
+# consultas.py estende a conexão do psycopg2
+errors = pytest.importorskip('psycopg2.errors')
+
+from src.repository.consultas import Consulta, RegistroConsultas  # noqa: E402
+
+
+class ConexaoFalsa:
+    def __init__(self):
+        self.preparadas = set()
+        # Comandos preparados do lado do servidor, que podem sumir sem a conexão saber
+        self.no_servidor = set()
+
+
+class CursorFalso:
+    """Cursor que só entende PREPARE/EXECUTE e falha como o PostgreSQL."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.executados = []
+
+    def execute(self, sql, params=None):
+        self.executados.append(sql)
+        nome = sql.split()[1].split('(')[0]
+        if sql.startswith('PREPARE'):
+            if nome in self.connection.no_servidor:
+                raise errors.DuplicatePreparedStatement(f'prepared statement "{nome}" already exists')
+            self.connection.no_servidor.add(nome)
+        elif sql.startswith('EXECUTE') and nome not in self.connection.no_servidor:
+            raise errors.InvalidSqlStatementName(f'prepared statement "{nome}" does not exist')
+
+
+class ConsultaTest(unittest.TestCase):
+
+    def test_parametros_viram_posicionais(self):
+        consulta = Consulta('por_id', "SELECT id FROM agendamentos WHERE id = %s AND data_agendamento = %s")
+
+        self.assertEqual(consulta.sql_prepare,
+                         "PREPARE por_id AS SELECT id FROM agendamentos WHERE id = $1 AND data_agendamento = $2")
+        self.assertEqual(consulta.sql_execute, "EXECUTE por_id(%s, %s)")
+
+    def test_parametro_com_cast_e_no_fim(self):
+        consulta = Consulta('ids', "SELECT id FROM professores WHERE id = ANY(%s::bigint[]) LIMIT %s")
+
+        self.assertEqual(consulta.sql_prepare,
+                         "PREPARE ids AS SELECT id FROM professores WHERE id = ANY($1::bigint[]) LIMIT $2")
+        self.assertEqual(consulta.sql_execute, "EXECUTE ids(%s, %s)")
+
+    def test_sem_parametros(self):
+        consulta = Consulta('todos', "SELECT id FROM laboratorios")
+
+        self.assertEqual(consulta.sql_prepare, "PREPARE todos AS SELECT id FROM laboratorios")
+        self.assertEqual(consulta.sql_execute, "EXECUTE todos")
+
+
+class RegistroConsultasTest(unittest.TestCase):
+
+    def setUp(self):
+        self.registro = RegistroConsultas()
+        self.cursor = CursorFalso(ConexaoFalsa())
+        self.consulta = Consulta('por_id', "SELECT id FROM professores WHERE id = %s")
+
+    def test_prepara_uma_vez_por_conexao(self):
+        self.registro.executar(self.cursor, self.consulta, (1,))
+        self.registro.executar(self.cursor, self.consulta, (2,))
+
+        self.assertEqual(self.cursor.executados, [self.consulta.sql_prepare, self.consulta.sql_execute,
+                                                  self.consulta.sql_execute])
+        self.assertEqual(self.registro.stats()['por_id']['preparacoes'], 1)
+
+    def test_comando_perdido_no_servidor_e_preparado_de_novo(self):
+        self.registro.executar(self.cursor, self.consulta, (1,))
+        # DISCARD ALL (ou uma conexão reiniciada pelo pooler) apaga os comandos preparados
+        self.cursor.connection.no_servidor.clear()
+
+        with self.assertRaises(errors.InvalidSqlStatementName):
+            self.registro.executar(self.cursor, self.consulta, (2,))
+        self.assertNotIn('por_id', self.cursor.connection.preparadas)
+
+        self.cursor.executados.clear()
+        self.registro.executar(self.cursor, self.consulta, (3,))
+
+        self.assertEqual(self.cursor.executados, [self.consulta.sql_prepare, self.consulta.sql_execute])
+        estatistica = self.registro.stats()['por_id']
+        self.assertEqual((estatistica['execucoes'], estatistica['preparacoes'], estatistica['erros']), (3, 2, 1))
+
+    def test_comando_ja_preparado_no_servidor_nao_e_preparado_de_novo(self):
+        self.cursor.connection.no_servidor.add('por_id')
+
+        with self.assertRaises(errors.DuplicatePreparedStatement):
+            self.registro.executar(self.cursor, self.consulta, (1,))
+
+        self.cursor.executados.clear()
+        self.registro.executar(self.cursor, self.consulta, (2,))
+        self.assertEqual(self.cursor.executados, [self.consulta.sql_execute])
+
+    def test_sem_preparar_envia_o_texto(self):
+        RegistroConsultas(preparar=False).executar(self.cursor, self.consulta, (1,))
+
+        self.assertEqual(self.cursor.executados, [self.consulta.sql])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,218 @@
+import threading
+import unittest
+from datetime import date, time
+
+from src.enums.enum import ErrorType
+from src.exceptions.custom_exception import CustomException
+from src.models.agendamento_model import Agendamento
+from src.service.agendamento_service import AgendamentoService
+from src.service.disponibilidade_index import DisponibilidadeIndex
+
+DIA = date(2030, 3, 4)
+
+
+class BancoFalso:
+    """Repositório em memória com a mesma regra de sobreposição da restrição de exclusão."""
+
+    def __init__(self):
+        self.linhas = {}
+        self.proximo_id = 1
+
+    def _conflita(self, agendamento):
+        inicio, fim = _minutos(agendamento.hora_inicio), _minutos(agendamento.hora_fim)
+        return any(a.id_laboratorio == agendamento.id_laboratorio and str(a.data_agendamento) == str(agendamento.data_agendamento)
+                   and inicio < _minutos(a.hora_fim) + 15 and _minutos(a.hora_inicio) < fim + 15
+                   for a in self.linhas.values())
+
+    def inserir(self, agendamento):
+        agendamento_id = self.proximo_id
+        self.proximo_id += 1
+        self.linhas[agendamento_id] = Agendamento(agendamento_id, agendamento.id_laboratorio, agendamento.id_professor,
+                                                  DIA, agendamento.hora_inicio, agendamento.hora_fim)
+        return agendamento_id
+
+    def fazer_agendamento(self, agendamento, tarefas=()):
+        if self._conflita(agendamento):
+            raise CustomException(ErrorType.INVALID_OPERATION, "O horário especificado não está disponível")
+        return {'id': self.inserir(agendamento), 'mensagem': "Agendamento criado com sucesso."}
+
+    def create_em_lote(self, agendamentos, tarefas=()):
+        return [None if self._conflita(a) else self.inserir(a) for a in agendamentos]
+
+    def update(self, agendamento, tarefas=()):
+        if agendamento.id not in self.linhas:
+            raise CustomException(ErrorType.NOT_FOUND, f"Agendamento with id {agendamento.id} not found")
+        self.linhas[agendamento.id] = agendamento
+
+    def iter_filtrados(self, primario=False, id_laboratorio=None, data_inicio=None, data_fim=None):
+        return iter([a for a in self.linhas.values() if id_laboratorio is None or a.id_laboratorio == id_laboratorio])
+
+
+def _minutos(hora):
+    if isinstance(hora, time):
+        return hora.hour * 60 + hora.minute
+    return int(hora[:2]) * 60 + int(hora[3:5])
+
+
+class DisponibilidadeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.banco = BancoFalso()
+        self.indice = DisponibilidadeIndex()
+        self.servico = AgendamentoService(self.banco, self.indice)
+
+    def test_horario_liberado_por_outro_processo_pode_ser_agendado(self):
+        criado = self.servico.create_agendamento(1, 7, DIA.isoformat(), '10:00', '11:00')
+        # Outro processo (ou uma remoção em cascata) apaga o agendamento sem passar por este índice
+        del self.banco.linhas[criado['id']]
+        self.assertTrue(self.indice.conflita(1, DIA, '10:00', '11:00'))
+
+        novo = self.servico.create_agendamento(1, 8, DIA.isoformat(), '10:00', '11:00')
+
+        self.assertNotEqual(novo['id'], criado['id'])
+        self.indice.remover(novo['id'])
+        self.assertFalse(self.indice.conflita(1, DIA, '10:00', '11:00'))
+
+    def test_lote_nao_recusa_horario_liberado_por_outro_processo(self):
+        criado = self.servico.create_agendamento(1, 7, DIA.isoformat(), '10:00', '11:00')
+        del self.banco.linhas[criado['id']]
+
+        resultado = self.servico.create_agendamentos_em_lote(8, [
+            {'id_laboratorio': 1, 'data': DIA.isoformat(), 'hora_inicio': '10:00', 'hora_fim': '11:00'}])
+
+        self.assertEqual(resultado['criados'], 1)
+
+    def test_lote_com_horario_repetido_cria_um_so(self):
+        item = {'id_laboratorio': 1, 'data': DIA.isoformat(), 'hora_inicio': '10:00', 'hora_fim': '11:00'}
+
+        resultado = self.servico.create_agendamentos_em_lote(8, [item, dict(item)])
+
+        self.assertEqual(resultado['criados'], 1)
+        self.assertEqual(resultado['conflitos'], 1)
+        self.assertEqual(len(self.banco.linhas), 1)
+
+    def test_atualizar_agendamento_inexistente_nao_ocupa_o_indice(self):
+        with self.assertRaises(CustomException) as erro:
+            self.servico.update_agendamento(42, 1, 7, DIA.isoformat(), '10:00', '11:00')
+
+        self.assertEqual(erro.exception.error_type, ErrorType.NOT_FOUND)
+        self.assertFalse(self.indice.conflita(1, DIA, '10:00', '11:00'))
+
+    def test_conflito_desconhecido_pelo_indice_atualiza_o_indice(self):
+        # Agendamento gravado por outro processo
+        self.banco.inserir(Agendamento(None, 1, 7, DIA, '14:00', '15:00'))
+
+        with self.assertRaises(CustomException):
+            self.servico.create_agendamento(1, 8, DIA.isoformat(), '14:00', '15:00')
+        self.assertTrue(self.indice.conflita(1, DIA, '14:00', '15:00'))
+
+    def test_aquecimento_nao_restaura_agendamento_removido_durante_a_leitura(self):
+        def cursor():
+            yield Agendamento(5, 1, 7, DIA, '10:00', '11:00')
+            # A remoção chega depois de a linha ser lida e antes de o índice ser preenchido
+            self.indice.remover(5)
+
+        self.indice.aquecer(cursor(), DIA)
+
+        self.assertFalse(self.indice.conflita(1, DIA, '10:00', '11:00'))
+
+    def test_leitura_do_banco_nao_bloqueia_o_indice(self):
+        def cursor():
+            # Outra thread consegue consultar e registrar enquanto as linhas são lidas
+            consulta = threading.Thread(target=self.indice.adicionar, args=(9, 1, DIA, '14:00', '15:00'))
+            consulta.start()
+            consulta.join(timeout=1)
+            self.assertFalse(consulta.is_alive())
+            yield Agendamento(5, 1, 7, DIA, '10:00', '11:00')
+
+        self.indice.recarregar(1, DIA, cursor())
+
+        self.assertTrue(self.indice.conflita(1, DIA, '10:00', '11:00'))
+        # Registrado durante a leitura: não é apagado pela recarga
+        self.assertTrue(self.indice.conflita(1, DIA, '14:00', '15:00'))
+
+
+class DisponibilidadeAtualizacaoTest(unittest.TestCase):
+
+    def setUp(self):
+        self.agora = 0.0
+        self.banco = BancoFalso()
+        self.indice = DisponibilidadeIndex(validade=60, relogio=lambda: self.agora)
+        self.servico = AgendamentoService(self.banco, self.indice)
+        self.servico.aquecer_disponibilidade()
+
+    def _livre(self, hora_inicio):
+        return any(janela['hora_inicio'] == hora_inicio for janela in self.servico.horarios_livres(1, DIA.isoformat()))
+
+    def test_eventos_de_outro_processo_atualizam_as_janelas(self):
+        evento = {'id': 3, 'id_laboratorio': 1, 'id_professor': 7, 'data_agendamento': DIA.isoformat(),
+                  'hora_inicio': '10:00:00', 'hora_fim': '11:00:00'}
+
+        self.indice.aplicar_evento(dict(evento, operacao='criado'))
+        self.assertFalse(self._livre('10:00'))
+
+        self.indice.aplicar_evento(dict(evento, operacao='removido'))
+        self.assertTrue(self._livre('10:00'))
+
+    def test_dia_vencido_e_relido_do_banco(self):
+        self.assertTrue(self._livre('10:00'))
+        # Gravado sem notificação (p.ex. fora da aplicação)
+        self.banco.inserir(Agendamento(None, 1, 7, DIA, '10:00', '11:00'))
+        self.assertTrue(self._livre('10:00'))
+
+        self.agora = 61.0
+
+        self.assertFalse(self._livre('10:00'))
+
+
+class RepositorioIdsFalso:
+    def __init__(self, *ids):
+        self.ids = set(ids)
+
+    def get_by_ids(self, ids, primario=False):
+        return {i: object() for i in ids if i in self.ids}
+
+
+class LoteReferenciasTest(unittest.TestCase):
+
+    def setUp(self):
+        self.banco = BancoFalso()
+        self.servico = AgendamentoService(self.banco, DisponibilidadeIndex(), RepositorioIdsFalso(8),
+                                          RepositorioIdsFalso(1))
+
+    def _item(self, id_laboratorio, hora_inicio='10:00', hora_fim='11:00'):
+        return {'id_laboratorio': id_laboratorio, 'data': DIA.isoformat(), 'hora_inicio': hora_inicio,
+                'hora_fim': hora_fim}
+
+    def test_laboratorio_inexistente_nao_derruba_o_lote(self):
+        resultado = self.servico.create_agendamentos_em_lote(8, [self._item(1), self._item(99)])
+
+        self.assertEqual(resultado['criados'], 1)
+        self.assertEqual(resultado['invalidos'], 1)
+        self.assertEqual(resultado['resultados'][1],
+                         {'indice': 1, 'status': 'invalido', 'mensagem': "Laboratório inexistente."})
+        self.assertEqual(len(self.banco.linhas), 1)
+
+    def test_professor_inexistente_invalida_os_itens(self):
+        resultado = self.servico.create_agendamentos_em_lote(42, [self._item(1)])
+
+        self.assertEqual(resultado['criados'], 0)
+        self.assertEqual(resultado['resultados'][0]['mensagem'], "Professor inexistente.")
+        self.assertEqual(self.banco.linhas, {})
+
+    def test_filtros_de_eventos(self):
+        self.assertEqual(self.servico.filtros_eventos('3', DIA.isoformat()), (3, DIA.isoformat()))
+        self.assertEqual(self.servico.filtros_eventos(), (None, None))
+        for filtros in (('lab', None), (None, '04/03/2030')):
+            with self.assertRaises(CustomException):
+                self.servico.filtros_eventos(*filtros)
+
+    def test_recorrencia_que_nao_e_objeto(self):
+        with self.assertRaises(CustomException) as erro:
+            self.servico.expandir_recorrencia(['segunda'])
+
+        self.assertEqual(erro.exception.error_type, ErrorType.INVALID_OPERATION)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import threading
+import unittest
+
+from src.cache.cache import TTLCache
+from src.cache.idempotencia import MAX_TAMANHO_CHAVE, ArmazemIdempotencia
+from src.enums.enum import ErrorType
+from src.exceptions.custom_exception import CustomException
+
+
+class FuncaoFalsa:
+    """Rota falsa: conta as execuções e, com `liberar`, só responde quando o evento é sinalizado."""
+
+    def __init__(self, status=201, corpo='{"id": 1}', liberar=None):
+        self.status = status
+        self.corpo = corpo
+        self.liberar = liberar
+        self.iniciada = threading.Event()
+        self.chamadas = 0
+
+    def __call__(self):
+        self.chamadas += 1
+        self.iniciada.set()
+        if self.liberar is not None:
+            self.liberar.wait(5)
+        return self.status, self.corpo, 'application/json'
+
+
+class ArmazemIdempotenciaTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = TTLCache(max_itens=100, ttl=60)
+        self.armazem = ArmazemIdempotencia(self.cache, ttl=60, espera=5, intervalo=0.01)
+
+    def _em_segundo_plano(self, chave, impressao, funcao):
+        resultado = {}
+
+        def executar():
+            try:
+                resultado['valor'] = self.armazem.executar(chave, impressao, funcao)
+            except CustomException as e:
+                resultado['erro'] = e
+
+        thread = threading.Thread(target=executar)
+        thread.start()
+        return thread, resultado
+
+    def test_repeticao_recebe_o_resultado_guardado(self):
+        funcao = FuncaoFalsa()
+
+        primeira = self.armazem.executar('chave', 'pedido', funcao)
+        segunda = self.armazem.executar('chave', 'pedido', funcao)
+
+        self.assertEqual(primeira, (201, '{"id": 1}', 'application/json', False))
+        self.assertEqual(segunda, (201, '{"id": 1}', 'application/json', True))
+        self.assertEqual(funcao.chamadas, 1)
+        self.assertEqual(self.armazem.stats()['repetidas'], 1)
+
+    def test_repeticao_durante_a_execucao_espera_pela_primeira(self):
+        liberar = threading.Event()
+        funcao = FuncaoFalsa(liberar=liberar)
+        primeira, resultado_primeira = self._em_segundo_plano('chave', 'pedido', funcao)
+        self.assertTrue(funcao.iniciada.wait(5))
+
+        segunda, resultado_segunda = self._em_segundo_plano('chave', 'pedido', funcao)
+        segunda.join(0.05)
+        self.assertTrue(segunda.is_alive())
+        liberar.set()
+        primeira.join(5)
+        segunda.join(5)
+
+        self.assertEqual(resultado_primeira['valor'][3], False)
+        self.assertEqual(resultado_segunda['valor'], (201, '{"id": 1}', 'application/json', True))
+        self.assertEqual(funcao.chamadas, 1)
+        self.assertEqual(self.armazem.stats()['aguardadas'], 1)
+
+    def test_espera_esgotada_responde_conflito(self):
+        liberar = threading.Event()
+        funcao = FuncaoFalsa(liberar=liberar)
+        primeira, _ = self._em_segundo_plano('chave', 'pedido', funcao)
+        self.assertTrue(funcao.iniciada.wait(5))
+        # A reserva dura `espera`; só a repetição desiste cedo
+        self.armazem.espera = 0.05
+
+        try:
+            with self.assertRaises(CustomException) as erro:
+                self.armazem.executar('chave', 'pedido', funcao)
+        finally:
+            liberar.set()
+            primeira.join(5)
+
+        self.assertEqual(erro.exception.error_type, ErrorType.CONFLICT)
+        self.assertEqual(funcao.chamadas, 1)
+
+    def test_resposta_5xx_libera_a_reserva(self):
+        falha = FuncaoFalsa(status=503, corpo='{"message": "indisponível"}')
+
+        self.assertEqual(self.armazem.executar('chave', 'pedido', falha)[0], 503)
+
+        self.assertEqual(self.cache.get('chave'), (False, None))
+        sucesso = FuncaoFalsa()
+        self.assertEqual(self.armazem.executar('chave', 'pedido', sucesso), (201, '{"id": 1}', 'application/json', False))
+        self.assertEqual(sucesso.chamadas, 1)
+
+    def test_excecao_libera_a_reserva(self):
+        def funcao():
+            raise RuntimeError("falha na rota")
+
+        with self.assertRaises(RuntimeError):
+            self.armazem.executar('chave', 'pedido', funcao)
+
+        self.assertEqual(self.cache.get('chave'), (False, None))
+        self.assertEqual(self.armazem.stats()['em_andamento'], 0)
+
+    def test_chave_reutilizada_em_outro_pedido(self):
+        funcao = FuncaoFalsa()
+        self.armazem.executar('chave', 'pedido', funcao)
+
+        with self.assertRaises(CustomException) as erro:
+            self.armazem.executar('chave', 'outro pedido', funcao)
+
+        self.assertEqual(erro.exception.error_type, ErrorType.INVALID_OPERATION)
+        self.assertEqual(funcao.chamadas, 1)
+        self.assertEqual(self.armazem.stats()['chaves_reutilizadas'], 1)
+
+    def test_chave_longa_demais(self):
+        with self.assertRaises(CustomException):
+            self.armazem.executar('x' * (MAX_TAMANHO_CHAVE + 1), 'pedido', FuncaoFalsa())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+
+from src.auth.limitador import BaldesMemoria, LimitadorLogin
+
+
+class RelogioFalso:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def __call__(self):
+        return self.agora
+
+    def avancar(self, segundos):
+        self.agora += segundos
+
+
+class BaldesMemoriaTest(unittest.TestCase):
+
+    def setUp(self):
+        self.relogio = RelogioFalso()
+        self.baldes = BaldesMemoria(relogio=self.relogio)
+
+    def test_balde_cheio_permite_a_capacidade_e_depois_informa_a_espera(self):
+        esperas = [self.baldes.consumir('a', 3, 1.0) for _ in range(4)]
+
+        self.assertEqual(esperas, [0.0, 0.0, 0.0, 1.0])
+
+    def test_tokens_se_recompoem_com_o_tempo(self):
+        for _ in range(3):
+            self.baldes.consumir('a', 3, 2.0)
+
+        self.relogio.avancar(0.25)
+        self.assertAlmostEqual(self.baldes.consumir('a', 3, 2.0), 0.25)
+        self.relogio.avancar(0.25)
+        self.assertEqual(self.baldes.consumir('a', 3, 2.0), 0.0)
+
+    def test_recomposicao_nao_passa_da_capacidade(self):
+        self.baldes.consumir('a', 3, 1.0)
+        self.relogio.avancar(3600)
+
+        esperas = [self.baldes.consumir('a', 3, 1.0) for _ in range(4)]
+
+        self.assertEqual(esperas, [0.0, 0.0, 0.0, 1.0])
+
+    def test_custo_maior_que_um(self):
+        self.assertEqual(self.baldes.consumir('a', 5, 1.0, custo=4), 0.0)
+        self.assertEqual(self.baldes.consumir('a', 5, 1.0, custo=4), 3.0)
+
+    def test_descarta_o_balde_menos_usado(self):
+        baldes = BaldesMemoria(max_chaves=2, relogio=self.relogio)
+        baldes.consumir('a', 1, 0.001)
+        baldes.consumir('b', 1, 0.001)
+        baldes.consumir('a', 1, 0.001)  # 'a' passa a ser o mais recente
+
+        baldes.consumir('c', 1, 0.001)
+
+        self.assertEqual(len(baldes), 2)
+        # 'a' continua vazio; 'b' foi descartado e volta cheio
+        self.assertGreater(baldes.consumir('a', 1, 0.001), 0.0)
+        self.assertEqual(baldes.consumir('b', 1, 0.001), 0.0)
+
+
+class LimitadorLoginTest(unittest.TestCase):
+
+    def setUp(self):
+        self.relogio = RelogioFalso()
+        self.limitador = LimitadorLogin(BaldesMemoria(relogio=self.relogio), por_ip=(2, 60.0), por_email=(3, 300.0))
+
+    def test_ip_bloqueado_nao_consome_as_tentativas_do_email(self):
+        self.assertEqual(self.limitador.tentar('prof@fecaf.com.br', '10.0.0.1'), 0.0)
+        self.assertEqual(self.limitador.tentar('prof@fecaf.com.br', '10.0.0.1'), 0.0)
+        for _ in range(5):
+            self.assertEqual(self.limitador.tentar('prof@fecaf.com.br', '10.0.0.1'), 30.0)
+
+        # O e-mail gastou só 2 das 3 tentativas, as que passaram pelo balde do IP
+        self.assertEqual(self.limitador.tentar('prof@fecaf.com.br', '10.0.0.2'), 0.0)
+        self.assertEqual(self.limitador.tentar('prof@fecaf.com.br', '10.0.0.3'), 100.0)
+
+    def test_email_e_normalizado(self):
+        for ip in ('10.0.0.1', '10.0.0.2', '10.0.0.3'):
+            self.assertEqual(self.limitador.tentar(' Prof@FECAF.com.br ', ip), 0.0)
+
+        self.assertGreater(self.limitador.tentar('prof@fecaf.com.br', '10.0.0.4'), 0.0)
+
+    def test_janela_recompoe_o_limite_do_ip(self):
+        self.limitador.tentar('a@fecaf.com.br', '10.0.0.1')
+        self.limitador.tentar('b@fecaf.com.br', '10.0.0.1')
+        self.assertGreater(self.limitador.tentar('c@fecaf.com.br', '10.0.0.1'), 0.0)
+
+        self.relogio.avancar(30)
+
+        self.assertEqual(self.limitador.tentar('c@fecaf.com.br', '10.0.0.1'), 0.0)
+
+    def test_capacidade_zero_desliga_o_limite(self):
+        limitador = LimitadorLogin(BaldesMemoria(relogio=self.relogio), por_ip=(0, 60.0), por_email=(0, 300.0))
+
+        self.assertTrue(all(limitador.tentar('prof@fecaf.com.br', '10.0.0.1') == 0.0 for _ in range(100)))
+
+
+if __name__ == '__main__':
+    unittest.main()
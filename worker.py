@@ -0,0 +1,75 @@
+"""Worker da fila de tarefas (outbox) dos agendamentos.
+
+    python worker.py
+    python worker.py --workers 8 --lote 100
+    python worker.py --uma-vez
+
+Executa o e-mail de confirmação, a auditoria e a invalidação de cache das
+escritas em agendamentos. Pode rodar em vários processos ao mesmo tempo.
+Usa as mesmas variáveis de ambiente de credenciais da aplicação; sem
+SMTP_HOST, os e-mails são gravados como .eml em EMAIL_DIRETORIO.
+"""
+import argparse
+import json
+import logging
+import os
+import signal
+
+from dotenv import load_dotenv
+
+from src.cache.cache import TTLCache
+from src.repository.agendamento_repository import AgendamentoRepository
+from src.repository.database import Database
+from src.repository.laboratorio_repository import LaboratorioRepository
+from src.repository.professor_repository import ProfessorRepository
+from src.repository.tarefa_repository import TarefaRepository
+from src.repository.versao_repository import VersaoRepository
+from src.secret.credentials import credentials_provider_from_env
+from src.service.notificacao_email import enviador_from_env
+from src.service.tarefas import ProcessadorTarefas, TarefasAgendamento
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=int(os.getenv('TAREFAS_WORKERS', '4')),
+                        help='threads que executam as tarefas')
+    parser.add_argument('--lote', type=int, default=int(os.getenv('TAREFAS_LOTE', '50')),
+                        help='tarefas retiradas por vez')
+    parser.add_argument('--max-tentativas', type=int, default=int(os.getenv('TAREFAS_MAX_TENTATIVAS', '8')))
+    parser.add_argument('--uma-vez', action='store_true', help='esvazia a fila e sai')
+    args = parser.parse_args()
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    # Só o primário: o worker precisa enxergar o agendamento que acabou de ser gravado
+    database = Database(credenciais=credentials_provider_from_env(), minconn=0, maxconn=args.workers + 1)
+    cache = TTLCache(max_itens=1024, ttl=float(os.getenv('CACHE_TTL', '60')))
+    tarefa_repository = TarefaRepository(database)
+    tarefas = TarefasAgendamento(
+        tarefa_repository,
+        AgendamentoRepository(database),
+        ProfessorRepository(database, cache),
+        LaboratorioRepository(database, cache),
+        VersaoRepository(database),
+        enviador_from_env(),
+        remetente=os.getenv('EMAIL_REMETENTE', 'agendamentos@fecaf.com.br')
+    )
+    processador = ProcessadorTarefas(database, tarefa_repository, tarefas.handlers(), lote=args.lote,
+                                     workers=args.workers, max_tentativas=args.max_tentativas)
+    try:
+        if args.uma_vez:
+            print(json.dumps({'processadas': processador.esvaziar(), **tarefa_repository.stats()},
+                             indent=2, ensure_ascii=False))
+        else:
+            # SIGTERM termina as tarefas em andamento antes de sair
+            signal.signal(signal.SIGTERM, lambda *_: processador.parar())
+            try:
+                processador.executar()
+            except KeyboardInterrupt:
+                processador.parar()
+    finally:
+        database.close()
+
+
+if __name__ == '__main__':
+    main()